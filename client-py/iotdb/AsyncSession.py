@@ -0,0 +1,352 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import asyncio
+import logging
+import struct
+
+from thrift.protocol import TBinaryProtocol, TCompactProtocol
+from thrift.transport import TTransport
+
+from .Session import Session
+from .thrift.rpc.TSIService import (
+    Client,
+    TSCloseSessionReq,
+    TSExecuteStatementReq,
+    TSOpenSessionReq,
+)
+from .thrift.rpc.ttypes import TSProtocolVersion, TSSetTimeZoneReq
+from .utils.AsyncSessionDataSet import AsyncSessionDataSet
+
+logger = logging.getLogger("IoTDB")
+
+
+class AsyncSession(object):
+    __FRAME_HEADER = struct.Struct(">i")
+    # insertions of at least this many rows are serialized in the default executor of the event loop
+    EXECUTOR_SERIALIZATION_MIN_ROWS = 10000
+
+    def __init__(
+        self,
+        host,
+        port,
+        user=Session.DEFAULT_USER,
+        password=Session.DEFAULT_PASSWORD,
+        fetch_size=Session.DEFAULT_FETCH_SIZE,
+        zone_id=Session.DEFAULT_ZONE_ID,
+        enable_records_auto_convert_tablet=False,
+    ):
+        """
+        a session for asyncio applications, it speaks the framed Thrift protocol of Session over asyncio streams
+            the methods are coroutines, requests of concurrent tasks take turns on the connection, so that one
+            event loop can keep many requests in flight through several sessions (see AsyncSessionPool) without
+            a thread per call, insertions of at least EXECUTOR_SERIALIZATION_MIN_ROWS rows are serialized in the
+            default executor so that they do not stall the event loop
+        :param enable_records_auto_convert_tablet: Boolean, send the records of insert_records as tablets when
+                                                   they share measurements, see Session
+        """
+        self.__host = host
+        self.__port = port
+        self.__user = user
+        self.__password = password
+        self.__fetch_size = fetch_size
+        self.__zone_id = zone_id
+        self.__enable_records_auto_convert_tablet = enable_records_auto_convert_tablet
+        self.__is_close = True
+        self.__reader = None
+        self.__writer = None
+        self.__protocol_class = TBinaryProtocol.TBinaryProtocol
+        # created by open, inside the event loop of the session
+        self.__lock = None
+        self.protocol_version = TSProtocolVersion.IOTDB_SERVICE_PROTOCOL_V3
+        self.__session_id = None
+        self.__statement_id = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self, enable_rpc_compression=False):
+        if not self.__is_close:
+            return
+        if enable_rpc_compression:
+            self.__protocol_class = TCompactProtocol.TCompactProtocol
+        else:
+            self.__protocol_class = TBinaryProtocol.TBinaryProtocol
+        self.__lock = asyncio.Lock()
+        self.__reader, self.__writer = await asyncio.open_connection(
+            self.__host, self.__port
+        )
+        self.__is_close = False
+        try:
+            open_resp = await self.__call_rpc(
+                "openSession",
+                TSOpenSessionReq(
+                    client_protocol=self.protocol_version,
+                    username=self.__user,
+                    password=self.__password,
+                    zoneId=self.__zone_id,
+                    configuration={"version": "V_0_13"},
+                ),
+            )
+            if self.protocol_version != open_resp.serverProtocolVersion:
+                logger.warning(
+                    "Protocol differ, Client version is {}, but Server version is {}".format(
+                        self.protocol_version, open_resp.serverProtocolVersion
+                    )
+                )
+                # version is less than 0.10
+                if open_resp.serverProtocolVersion == 0:
+                    raise TTransport.TException(message="Protocol not supported.")
+            self.__session_id = open_resp.sessionId
+            self.__statement_id = await self.__call_rpc(
+                "requestStatementId", self.__session_id
+            )
+            if self.__zone_id is not None:
+                await self.set_time_zone(self.__zone_id)
+        except BaseException:
+            self.__close_connection()
+            raise
+
+    def is_open(self):
+        return not self.__is_close
+
+    async def close(self):
+        if self.__is_close:
+            return
+        try:
+            await self.__call_rpc("closeSession", TSCloseSessionReq(self.__session_id))
+        except (TTransport.TException, OSError, asyncio.IncompleteReadError) as e:
+            logger.exception(
+                "Error occurs when closing session at server. Maybe server is down. Error message: ",
+                exc_info=e,
+            )
+        finally:
+            self.__close_connection()
+
+    async def set_time_zone(self, zone_id):
+        status = await self.__call_rpc(
+            "setTimeZone", TSSetTimeZoneReq(self.__session_id, zone_id)
+        )
+        logger.debug(
+            "setting time zone_id as {}, message: {}".format(zone_id, status.message)
+        )
+        self.__zone_id = zone_id
+
+    async def insert_tablet(self, tablet):
+        """
+        insert one tablet, see Session.insert_tablet
+        :param tablet: Tablet, NumpyTablet or MutableTablet
+        """
+        return await self.__insert(
+            "insertTablet",
+            lambda: Session.build_insert_tablet_req(self.__session_id, tablet),
+            tablet.get_row_number(),
+        )
+
+    async def insert_aligned_tablet(self, tablet):
+        return await self.__insert(
+            "insertTablet",
+            lambda: Session.build_insert_tablet_req(self.__session_id, tablet, True),
+            tablet.get_row_number(),
+        )
+
+    async def insert_tablets(self, tablet_lst):
+        """
+        insert multiple tablets, tablets are independent to each other
+        :param tablet_lst: List of tablets
+        """
+        return await self.__insert(
+            "insertTablets",
+            lambda: Session.build_insert_tablets_req(self.__session_id, tablet_lst),
+            sum(tablet.get_row_number() for tablet in tablet_lst),
+        )
+
+    async def insert_aligned_tablets(self, tablet_lst):
+        return await self.__insert(
+            "insertTablets",
+            lambda: Session.build_insert_tablets_req(
+                self.__session_id, tablet_lst, True
+            ),
+            sum(tablet.get_row_number() for tablet in tablet_lst),
+        )
+
+    async def insert_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst
+    ):
+        """
+        insert multiple rows of data, see Session.insert_records
+        :param device_ids: List of String, time series paths for device
+        :param times: List of Integer, timestamps for records
+        :param measurements_lst: 2-D List of String, each element of outer list indicates measurements of a device
+        :param types_lst: 2-D List of TSDataType, each element of outer list indicates sensor data types of a device
+        :param values_lst: 2-D List, values to be inserted, for each device
+        """
+        return await self.__insert_records(
+            device_ids, times, measurements_lst, types_lst, values_lst, False
+        )
+
+    async def insert_aligned_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst
+    ):
+        return await self.__insert_records(
+            device_ids, times, measurements_lst, types_lst, values_lst, True
+        )
+
+    async def execute_non_query_statement(self, sql):
+        """
+        execute non-query sql statement
+        :param sql: String, non-query sql statement
+        """
+        resp = await self.__call_rpc(
+            "executeUpdateStatement",
+            TSExecuteStatementReq(self.__session_id, sql, self.__statement_id),
+        )
+        logger.debug(
+            "execute non-query statement {} message: {}".format(
+                sql, resp.status.message
+            )
+        )
+        return Session.verify_success(resp.status)
+
+    async def execute_query_statement(self, sql, timeout=0):
+        """
+        execute query sql statement
+        :param sql: String, query sql statement
+        :return: AsyncSessionDataSet, iterate it with "async for" to get the rows fetch by fetch
+        """
+        resp = await self.__call_rpc(
+            "executeQueryStatement",
+            TSExecuteStatementReq(
+                self.__session_id, sql, self.__statement_id, self.__fetch_size, timeout
+            ),
+        )
+        if Session.verify_success(resp.status) != 0:
+            raise RuntimeError(
+                "execution of query statement fails because: {}".format(
+                    resp.status.message
+                )
+            )
+        return AsyncSessionDataSet(
+            self.__call_rpc,
+            sql,
+            resp.columns,
+            resp.dataTypeList,
+            resp.columnNameIndexMap,
+            resp.queryId,
+            self.__statement_id,
+            self.__session_id,
+            resp.queryDataSet,
+            resp.ignoreTimeStamp,
+            self.__fetch_size,
+        )
+
+    async def __insert_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst, is_aligned
+    ):
+        if self.__enable_records_auto_convert_tablet:
+            tablet_lst = Session.records_to_tablets(
+                device_ids, times, measurements_lst, types_lst, values_lst
+            )
+            if tablet_lst is not None:
+                if is_aligned:
+                    return await self.insert_aligned_tablets(tablet_lst)
+                return await self.insert_tablets(tablet_lst)
+        type_values_lst = [
+            [data_type.value for data_type in types] for types in types_lst
+        ]
+        return await self.__insert(
+            "insertRecords",
+            lambda: Session.build_insert_records_req(
+                self.__session_id,
+                device_ids,
+                times,
+                measurements_lst,
+                type_values_lst,
+                values_lst,
+                is_aligned,
+            ),
+            len(times),
+        )
+
+    async def __insert(self, rpc_name, gen_request, rows):
+        """
+        :param gen_request: function() -> request
+        :param rows: Integer, number of rows of the insertion
+        """
+        if self.__is_close:
+            raise RuntimeError("AsyncSession is not open")
+        if rows >= AsyncSession.EXECUTOR_SERIALIZATION_MIN_ROWS:
+            # building and serializing a large insertion takes long enough to hold up the other tasks
+            payload = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.__serialize(rpc_name, gen_request())
+            )
+        else:
+            payload = self.__serialize(rpc_name, gen_request())
+        status = await self.__exchange(rpc_name, payload)
+        logger.debug("{} message: {}".format(rpc_name, status.message))
+        return Session.verify_success(status)
+
+    async def __call_rpc(self, rpc_name, *args):
+        """
+        send a request and wait for its response
+        """
+        if self.__is_close:
+            raise RuntimeError("AsyncSession is not open")
+        return await self.__exchange(rpc_name, self.__serialize(rpc_name, *args))
+
+    def __serialize(self, rpc_name, *args):
+        """
+        serialize a request with the send_ method of the generated client into a memory buffer
+        :return: bytes, the payload of the frame
+        """
+        out_buffer = TTransport.TMemoryBuffer()
+        getattr(Client(self.__protocol_class(out_buffer)), "send_" + rpc_name)(*args)
+        return out_buffer.getvalue()
+
+    async def __exchange(self, rpc_name, payload):
+        """
+        write the framed request to the stream, read the frame of the response back and deserialize it with the
+        recv_ method of the generated client
+        """
+        async with self.__lock:
+            if self.__is_close:
+                raise RuntimeError("AsyncSession is not open")
+            try:
+                self.__writer.write(
+                    AsyncSession.__FRAME_HEADER.pack(len(payload)) + payload
+                )
+                await self.__writer.drain()
+                header = await self.__reader.readexactly(4)
+                frame = await self.__reader.readexactly(
+                    AsyncSession.__FRAME_HEADER.unpack(header)[0]
+                )
+            except BaseException:
+                # a request interrupted halfway, e.g. by a cancellation, leaves the stream out of step
+                self.__close_connection()
+                raise
+        in_buffer = TTransport.TMemoryBuffer(frame)
+        return getattr(Client(self.__protocol_class(in_buffer)), "recv_" + rpc_name)()
+
+    def __close_connection(self):
+        self.__is_close = True
+        if self.__writer is not None:
+            self.__writer.close()
+            self.__writer = None
+            self.__reader = None
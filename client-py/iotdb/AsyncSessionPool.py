@@ -0,0 +1,230 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import asyncio
+import logging
+import time
+
+from .AsyncSession import AsyncSession
+from .SessionPool import SessionPool
+
+logger = logging.getLogger("IoTDB")
+
+
+class AsyncSessionPool(object):
+    def __init__(
+        self,
+        pool_config,
+        max_pool_size=SessionPool.DEFAULT_MAX_POOL_SIZE,
+        wait_timeout_in_ms=SessionPool.DEFAULT_WAIT_TIMEOUT_IN_MS,
+    ):
+        """
+        a pool of AsyncSessions for one event loop, the asyncio counterpart of SessionPool
+            sessions are opened lazily up to max_pool_size, get_session waits until one is free, and the
+            pass-through coroutines (insert_tablet, insert_records, ...) borrow and put back a session themselves,
+            so that concurrent tasks spread their requests over the connections of the pool
+        :param pool_config: PoolConfig, settings of the sessions
+        :param max_pool_size: Integer, maximum number of open sessions
+        :param wait_timeout_in_ms: Integer, how long get_session waits for a free session
+        """
+        if max_pool_size <= 0:
+            raise RuntimeError("max_pool_size of AsyncSessionPool must be positive")
+        self.__config = pool_config
+        self.__max_pool_size = max_pool_size
+        self.__wait_timeout_in_ms = wait_timeout_in_ms
+        self.__idle_sessions = []
+        self.__session_number = 0
+        # created on first use, inside the event loop of the pool
+        self.__condition = None
+        self.__is_close = False
+        # data sets of execute_query_statement, by id, with the session they hold
+        self.__data_sets = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def get_session(self):
+        """
+        borrow a session, it must be given back by put_back
+        :return: an opened AsyncSession
+        """
+        condition = self.__get_condition()
+        deadline = time.monotonic() + self.__wait_timeout_in_ms / 1000.0
+        async with condition:
+            while True:
+                if self.__is_close:
+                    raise RuntimeError("AsyncSessionPool has been closed")
+                if self.__idle_sessions:
+                    return self.__idle_sessions.pop()
+                if self.__session_number < self.__max_pool_size:
+                    self.__session_number += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(
+                        "Wait to get session timeout in AsyncSessionPool, current pool size: {}".format(
+                            self.__session_number
+                        )
+                    )
+                try:
+                    await asyncio.wait_for(condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        config = self.__config
+        session = AsyncSession(
+            config.host,
+            config.port,
+            config.user_name,
+            config.password,
+            config.fetch_size,
+            config.time_zone,
+        )
+        try:
+            await session.open(config.enable_compression)
+        except BaseException:
+            async with condition:
+                self.__session_number -= 1
+                condition.notify()
+            raise
+        return session
+
+    async def put_back(self, session, broken=False):
+        """
+        give back a borrowed session, it is closed instead if it is not open or broken
+        :param broken: Boolean, the session failed and may be in an inconsistent state
+        """
+        condition = self.__get_condition()
+        async with condition:
+            if broken or self.__is_close or not session.is_open():
+                self.__session_number -= 1
+                session_to_close = session
+            else:
+                self.__idle_sessions.append(session)
+                session_to_close = None
+            condition.notify()
+        if session_to_close is not None:
+            await AsyncSessionPool.__close_sessions([session_to_close])
+
+    async def close(self):
+        """
+        close the idle sessions, the borrowed ones are closed when they are put back
+        """
+        condition = self.__get_condition()
+        async with condition:
+            self.__is_close = True
+            sessions = self.__idle_sessions
+            self.__session_number -= len(sessions)
+            self.__idle_sessions = []
+            condition.notify_all()
+        await AsyncSessionPool.__close_sessions(sessions)
+
+    def get_current_size(self):
+        return self.__session_number
+
+    def get_idle_size(self):
+        return len(self.__idle_sessions)
+
+    async def execute_query_statement(self, sql, timeout=0):
+        """
+        execute a query on a borrowed session, the session is held by the returned data set until
+        close_result_set is called
+        :return: AsyncSessionDataSet
+        """
+        session = await self.get_session()
+        try:
+            data_set = await session.execute_query_statement(sql, timeout)
+        except BaseException:
+            await self.put_back(session, True)
+            raise
+        self.__data_sets[id(data_set)] = session
+        return data_set
+
+    async def close_result_set(self, data_set):
+        """
+        close a data set of execute_query_statement and give back its session
+        """
+        session = self.__data_sets.pop(id(data_set), None)
+        if session is None:
+            raise RuntimeError("The data set does not belong to this AsyncSessionPool")
+        try:
+            await data_set.close_operation_handle()
+        except BaseException:
+            await self.put_back(session, True)
+            raise
+        await self.put_back(session)
+
+    async def insert_tablet(self, tablet):
+        return await self.__call("insert_tablet", tablet)
+
+    async def insert_aligned_tablet(self, tablet):
+        return await self.__call("insert_aligned_tablet", tablet)
+
+    async def insert_tablets(self, tablet_lst):
+        return await self.__call("insert_tablets", tablet_lst)
+
+    async def insert_aligned_tablets(self, tablet_lst):
+        return await self.__call("insert_aligned_tablets", tablet_lst)
+
+    async def insert_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst
+    ):
+        return await self.__call(
+            "insert_records", device_ids, times, measurements_lst, types_lst, values_lst
+        )
+
+    async def insert_aligned_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst
+    ):
+        return await self.__call(
+            "insert_aligned_records",
+            device_ids,
+            times,
+            measurements_lst,
+            types_lst,
+            values_lst,
+        )
+
+    async def execute_non_query_statement(self, sql):
+        return await self.__call("execute_non_query_statement", sql)
+
+    async def __call(self, method_name, *args):
+        session = await self.get_session()
+        try:
+            result = await getattr(session, method_name)(*args)
+        except BaseException:
+            # the connection may be left in the middle of a request, do not reuse the session
+            await self.put_back(session, True)
+            raise
+        await self.put_back(session)
+        return result
+
+    def __get_condition(self):
+        if self.__condition is None:
+            self.__condition = asyncio.Condition()
+        return self.__condition
+
+    @staticmethod
+    async def __close_sessions(sessions):
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception:
+                logger.exception("failed to close a session of AsyncSessionPool")
@@ -0,0 +1,259 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import logging
+import threading
+import time
+
+from .utils.IoTDBConstants import TSDataType
+from .utils.Tablet import Tablet
+
+logger = logging.getLogger("IoTDB")
+
+
+class BufferedWriter(object):
+    """
+    buffer record style inserts of a session and write them as tablets
+        records are grouped by device, measurements and data types, each group becomes one tablet,
+        all tablets are sent in one insert_tablets request (one more for aligned devices) when
+            the buffered rows reach max_rows, or
+            the estimated size of the buffered rows reaches max_bytes, or
+            the oldest buffered row has waited max_latency seconds, or
+            flush() or close() is called
+        the background thread of max_latency uses the session while the caller may use it too, give
+        the writer a SessionPool, whose insert_tablets borrows a session per flush, or hold
+        get_session_lock() around every own call on a shared Session
+    """
+
+    DEFAULT_MAX_ROWS = 10000
+    DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+    # estimated bytes of one value on the wire, TEXT is 4 bytes of length plus the text itself
+    VALUE_SIZE = {
+        TSDataType.BOOLEAN: 1,
+        TSDataType.INT32: 4,
+        TSDataType.INT64: 8,
+        TSDataType.FLOAT: 4,
+        TSDataType.DOUBLE: 8,
+        TSDataType.TEXT: 4,
+    }
+
+    def __init__(
+        self,
+        session,
+        max_rows=DEFAULT_MAX_ROWS,
+        max_bytes=DEFAULT_MAX_BYTES,
+        max_latency=None,
+    ):
+        """
+        :param session: Session or SessionPool, opened, it stays open after the writer is closed
+        :param max_rows: Integer, flush when this many rows are buffered
+        :param max_bytes: Integer, flush when the buffered rows are estimated to take this many bytes
+        :param max_latency: Float, optional, seconds a row may wait in the buffer, a background thread
+                            flushes the rows in time, None to flush only on the other thresholds
+        """
+        if max_rows <= 0 or max_bytes <= 0:
+            raise RuntimeError(
+                "max_rows and max_bytes of BufferedWriter must be positive"
+            )
+        if max_latency is not None and max_latency <= 0:
+            raise RuntimeError("max_latency of BufferedWriter must be positive")
+        self.__session = session
+        self.__max_rows = max_rows
+        self.__max_bytes = max_bytes
+        self.__max_latency = max_latency
+        # (device_id, measurements, data_types, is_aligned) -> [timestamps, rows]
+        self.__buffers = {}
+        self.__row_number = 0
+        self.__byte_size = 0
+        self.__oldest_time = None
+        self.__lock = threading.Lock()
+        # session is not thread safe, the requests of concurrent flushes are sent one by one,
+        # reentrant so that a caller holding get_session_lock() can still trigger flushes
+        self.__flush_lock = threading.RLock()
+        self.__is_close = False
+        self.__closed = threading.Event()
+        self.__flush_thread = None
+        if max_latency is not None:
+            self.__flush_thread = threading.Thread(
+                target=self.__flush_on_latency, name="iotdb-buffered-writer"
+            )
+            self.__flush_thread.daemon = True
+            self.__flush_thread.start()
+
+    def insert_record(self, device_id, timestamp, measurements, data_types, values):
+        """
+        buffer one row of record, arguments are the same as Session.insert_record
+        :return: 0 if the row is buffered or flushed successfully, -1 if a triggered flush failed
+        """
+        return self.__buffer(
+            device_id, timestamp, measurements, data_types, values, False
+        )
+
+    def insert_aligned_record(
+        self, device_id, timestamp, measurements, data_types, values
+    ):
+        """
+        buffer one row of record of aligned time series, arguments are the same as
+        Session.insert_aligned_record
+        """
+        return self.__buffer(
+            device_id, timestamp, measurements, data_types, values, True
+        )
+
+    def insert_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst
+    ):
+        """
+        buffer multiple rows of data, arguments are the same as Session.insert_records
+        """
+        result = 0
+        for i in range(len(device_ids)):
+            if (
+                self.__buffer(
+                    device_ids[i],
+                    times[i],
+                    measurements_lst[i],
+                    types_lst[i],
+                    values_lst[i],
+                    False,
+                )
+                != 0
+            ):
+                result = -1
+        return result
+
+    def flush(self):
+        """
+        write all buffered rows
+        :return: 0 if all rows are written, -1 otherwise, the rows of a failed request are dropped
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                buffers = self.__buffers
+                self.__buffers = {}
+                self.__row_number = 0
+                self.__byte_size = 0
+                self.__oldest_time = None
+            if not buffers:
+                return 0
+
+            tablets = []
+            aligned_tablets = []
+            for key, (timestamps, rows) in buffers.items():
+                device_id, measurements, data_types, is_aligned = key
+                tablet = Tablet(
+                    device_id, list(measurements), list(data_types), rows, timestamps
+                )
+                if is_aligned:
+                    aligned_tablets.append(tablet)
+                else:
+                    tablets.append(tablet)
+
+            result = 0
+            if tablets and self.__session.insert_tablets(tablets) != 0:
+                result = -1
+            if (
+                aligned_tablets
+                and self.__session.insert_aligned_tablets(aligned_tablets) != 0
+            ):
+                result = -1
+            return result
+
+    def close(self):
+        """
+        stop the background flushing and write the remaining rows, the session is not closed
+        """
+        if self.__is_close:
+            return 0
+        self.__is_close = True
+        self.__closed.set()
+        if self.__flush_thread is not None:
+            self.__flush_thread.join()
+        return self.flush()
+
+    def is_open(self):
+        return not self.__is_close
+
+    def get_buffered_row_number(self):
+        return self.__row_number
+
+    def get_session_lock(self):
+        """
+        the lock the writer holds while it sends requests on the session, a caller that shares a Session
+        with a writer of max_latency must hold it around its own calls on the session
+        :return: threading.RLock
+        """
+        return self.__flush_lock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __buffer(
+        self, device_id, timestamp, measurements, data_types, values, is_aligned
+    ):
+        if self.__is_close:
+            raise RuntimeError("BufferedWriter is closed")
+        if len(measurements) != len(data_types) or len(measurements) != len(values):
+            raise RuntimeError(
+                "length of data types does not equal to length of values!"
+            )
+        row_size = 8
+        for data_type, value in zip(data_types, values):
+            row_size += BufferedWriter.VALUE_SIZE[data_type]
+            if data_type == TSDataType.TEXT and value is not None:
+                row_size += len(
+                    value.encode("utf-8") if isinstance(value, str) else value
+                )
+
+        key = (device_id, tuple(measurements), tuple(data_types), is_aligned)
+        with self.__lock:
+            buffer = self.__buffers.get(key)
+            if buffer is None:
+                buffer = self.__buffers[key] = [[], []]
+            buffer[0].append(timestamp)
+            buffer[1].append(list(values))
+            self.__row_number += 1
+            self.__byte_size += row_size
+            if self.__oldest_time is None:
+                self.__oldest_time = time.monotonic()
+            is_full = (
+                self.__row_number >= self.__max_rows
+                or self.__byte_size >= self.__max_bytes
+            )
+        if is_full:
+            return self.flush()
+        return 0
+
+    def __flush_on_latency(self):
+        while not self.__closed.is_set():
+            with self.__lock:
+                oldest_time = self.__oldest_time
+            if oldest_time is None:
+                timeout = self.__max_latency
+            else:
+                timeout = oldest_time + self.__max_latency - time.monotonic()
+            if timeout > 0:
+                self.__closed.wait(timeout)
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("background flush of BufferedWriter failed")
@@ -0,0 +1,168 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .Session import Session
+
+logger = logging.getLogger("IoTDB")
+
+
+class ParallelWriter(object):
+    """
+    write tablets over several sessions at the same time
+        a session is used by one worker thread at a time, also when several submits run concurrently, the tablets
+        of a submit are sharded round robin over the sessions, so serialization of one tablet overlaps the network
+        round trips of the others
+    """
+
+    def __init__(
+        self,
+        hosts,
+        n_sessions=4,
+        user=Session.DEFAULT_USER,
+        password=Session.DEFAULT_PASSWORD,
+        fetch_size=Session.DEFAULT_FETCH_SIZE,
+        zone_id=Session.DEFAULT_ZONE_ID,
+    ):
+        """
+        :param hosts: List of (host, port) tuples or "host:port" strings, sessions are spread over them
+        :param n_sessions: Integer, number of sessions and worker threads
+        """
+        if n_sessions <= 0:
+            raise RuntimeError("n_sessions of ParallelWriter must be positive")
+        if isinstance(hosts, str) or isinstance(hosts, tuple):
+            hosts = [hosts]
+        if len(hosts) == 0:
+            raise RuntimeError("hosts of ParallelWriter can not be empty")
+        self.__sessions = []
+        for i in range(n_sessions):
+            host, port = ParallelWriter.__parse_host(hosts[i % len(hosts)])
+            self.__sessions.append(
+                Session(host, port, user, password, fetch_size, zone_id)
+            )
+        # held by the worker writing a shard through the session
+        self.__session_locks = [threading.Lock() for _ in self.__sessions]
+        self.__executor = None
+
+    def open(self, enable_rpc_compression=False):
+        opened = []
+        try:
+            for session in self.__sessions:
+                session.open(enable_rpc_compression)
+                opened.append(session)
+        except Exception:
+            for session in opened:
+                session.close()
+            raise
+        self.__executor = ThreadPoolExecutor(
+            max_workers=len(self.__sessions), thread_name_prefix="iotdb-parallel-writer"
+        )
+
+    def close(self):
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+        for session in self.__sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, tablets, is_aligned=False, tablets_per_request=1):
+        """
+        insert the tablets in parallel and wait until all of them are written
+        :param tablets: List of Tablet or NumpyTablet
+        :param is_aligned: Boolean, insert into aligned time series
+        :param tablets_per_request: Integer, tablets of one session sent together in one insert_tablets request
+        :return: (0, []) if all tablets are written, otherwise (-1, failures), failures is a list of
+                 (index of the tablet in tablets, error message)
+        """
+        if self.__executor is None:
+            raise RuntimeError("ParallelWriter is not opened")
+        if tablets_per_request <= 0:
+            raise RuntimeError("tablets_per_request must be positive")
+        n_sessions = len(self.__sessions)
+        futures = [
+            self.__executor.submit(
+                ParallelWriter.__write_shard,
+                self.__sessions[i],
+                self.__session_locks[i],
+                tablets,
+                list(range(i, len(tablets), n_sessions)),
+                is_aligned,
+                tablets_per_request,
+            )
+            for i in range(min(n_sessions, len(tablets)))
+        ]
+        failures = []
+        for future in futures:
+            failures.extend(future.result())
+        if failures:
+            failures.sort()
+            return -1, failures
+        return 0, failures
+
+    def get_sessions(self):
+        return self.__sessions
+
+    @staticmethod
+    def __write_shard(
+        session, session_lock, tablets, indexes, is_aligned, tablets_per_request
+    ):
+        with session_lock:
+            return ParallelWriter.__insert_shard(
+                session, tablets, indexes, is_aligned, tablets_per_request
+            )
+
+    @staticmethod
+    def __insert_shard(session, tablets, indexes, is_aligned, tablets_per_request):
+        failures = []
+        for start in range(0, len(indexes), tablets_per_request):
+            batch = indexes[start : start + tablets_per_request]
+            try:
+                if len(batch) == 1:
+                    if is_aligned:
+                        result = session.insert_aligned_tablet(tablets[batch[0]])
+                    else:
+                        result = session.insert_tablet(tablets[batch[0]])
+                elif is_aligned:
+                    result = session.insert_aligned_tablets(
+                        [tablets[index] for index in batch]
+                    )
+                else:
+                    result = session.insert_tablets([tablets[index] for index in batch])
+                message = None if result == 0 else "error status returned by the server"
+            except Exception as e:
+                logger.exception("parallel insertion of tablets failed")
+                message = str(e)
+            if message is not None:
+                failures.extend((index, message) for index in batch)
+        return failures
+
+    @staticmethod
+    def __parse_host(host):
+        if isinstance(host, str):
+            host, port = host.rsplit(":", 1)
+            return host, int(port)
+        return host[0], host[1]
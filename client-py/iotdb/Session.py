@@ -15,13 +15,22 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+import itertools
 import logging
+import random
 import struct
+import threading
 import time
+
+import numpy as np
+import pandas as pd
 from thrift.protocol import TBinaryProtocol, TCompactProtocol
 from thrift.transport import TSocket, TTransport
 
 from iotdb.utils.SessionDataSet import SessionDataSet
+from iotdb.utils.NumpyTablet import NumpyTablet
+from iotdb.utils.SortUtil import SortUtil
+from iotdb.utils.Tablet import Tablet
 from .template.Template import Template
 from .template.TemplateQueryType import TemplateQueryType
 from .thrift.rpc.TSIService import (
@@ -45,6 +54,7 @@ from .thrift.rpc.TSIService import (
     TSSetSchemaTemplateReq,
     TSUnsetSchemaTemplateReq,
     TSQueryTemplateReq,
+    TSCloseOperationReq,
 )
 from .thrift.rpc.ttypes import (
     TSDeleteDataReq,
@@ -70,12 +80,65 @@ from .utils.IoTDBConstants import TSDataType
 logger = logging.getLogger("IoTDB")
 
 
+class _SynchronizedClient(object):
+    """
+    a Thrift client whose rpcs hold one lock, the prefetch thread of a data set shares the connection of its
+    session, and a frame must be answered before the next one is sent
+    """
+
+    def __init__(self, client):
+        self.__client = client
+        self.__lock = threading.RLock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.__client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self.__lock:
+                return attribute(*args, **kwargs)
+
+        return call
+
+
 class Session(object):
     SUCCESS_CODE = 200
+    MULTIPLE_ERROR_CODE = 506
+    NEED_REDIRECTION_CODE = 707
     DEFAULT_FETCH_SIZE = 10000
     DEFAULT_USER = "root"
     DEFAULT_PASSWORD = "root"
     DEFAULT_ZONE_ID = time.strftime("%z")
+    DEFAULT_MAX_REQUEST_BYTES = 16 * 1024 * 1024
+    # orders in which init_from_node_urls sessions try the nodes
+    SELECT_RANDOM = "random"
+    SELECT_ROUND_ROBIN = "round_robin"
+    SELECT_LATENCY = "latency"
+    DEFAULT_NODE_COOL_DOWN_IN_MS = 30000
+    # how long opening a connection to a node the server redirects to may take
+    REDIRECTION_CONNECTION_TIMEOUT_IN_MS = 3000
+    # ip of a redirection to a node the server does not know an address of, it is not followed
+    __UNKNOWN_NODE_IP = "0.0.0.0"
+    # records are sent as tablets only if they make this many rows per tablet on average
+    RECORDS_PER_TABLET_TO_CONVERT = 2
+    # struct format of each fixed-width data type in a record, by TSDataType value
+    __VALUE_FORMATS = {
+        TSDataType.BOOLEAN.value: "?",
+        TSDataType.INT32.value: "i",
+        TSDataType.INT64.value: "q",
+        TSDataType.FLOAT.value: "f",
+        TSDataType.DOUBLE.value: "d",
+    }
+    __TEXT_HEADER = struct.Struct(">Bi")
+    # compiled serialization plans of value_to_bytes, by record signature
+    __VALUE_PLANS = {}
+    __MAX_VALUE_PLANS = 1024
+    # (host, port) -> [monotonic time until which the node is unhealthy, latency of opening a session],
+    # shared by all sessions of the process
+    __NODE_STATES = {}
+    __NODE_LOCK = threading.Lock()
+    __ROUND_ROBIN_COUNTER = itertools.count()
 
     def __init__(
         self,
@@ -85,6 +148,9 @@ class Session(object):
         password=DEFAULT_PASSWORD,
         fetch_size=DEFAULT_FETCH_SIZE,
         zone_id=DEFAULT_ZONE_ID,
+        enable_records_auto_convert_tablet=False,
+        enable_redirection=True,
+        enable_query_redirection=False,
     ):
         self.__host = host
         self.__port = port
@@ -93,29 +159,123 @@ class Session(object):
         self.__fetch_size = fetch_size
         self.__is_close = True
         self.__transport = None
+        self.__socket = None
         self.__client = None
         self.protocol_version = TSProtocolVersion.IOTDB_SERVICE_PROTOCOL_V3
         self.__session_id = None
         self.__statement_id = None
         self.__zone_id = zone_id
+        # send the records of insert_records (of one device) as tablets when they share measurements
+        self.__enable_records_auto_convert_tablet = enable_records_auto_convert_tablet
+        self.__endpoints = [(host, port)]
+        self.__node_select_policy = Session.SELECT_RANDOM
+        self.__node_cool_down_in_ms = Session.DEFAULT_NODE_COOL_DOWN_IN_MS
+        self.__enable_rpc_compression = False
+        # timeout of connecting and opening the session, None to wait as long as the system does
+        self.__connection_timeout_in_ms = None
+        # send the insertions of a device to the node the server redirects it to
+        self.__enable_redirection = enable_redirection
+        self.__device_id_to_endpoint = {}
+        self.__endpoint_to_connection = {}
+        # run a query on the node the server redirects it to, where its data lives
+        self.__enable_query_redirection = enable_query_redirection
+
+    @classmethod
+    def init_from_node_urls(
+        cls,
+        node_urls,
+        user=DEFAULT_USER,
+        password=DEFAULT_PASSWORD,
+        fetch_size=DEFAULT_FETCH_SIZE,
+        zone_id=DEFAULT_ZONE_ID,
+        enable_records_auto_convert_tablet=False,
+        node_select_policy=SELECT_RANDOM,
+        node_cool_down_in_ms=DEFAULT_NODE_COOL_DOWN_IN_MS,
+        enable_redirection=True,
+        enable_query_redirection=False,
+    ):
+        """
+        create a session that can connect to any node of a cluster
+            open() tries the nodes in the order of node_select_policy and uses the first one that works,
+            a node that fails is skipped by all sessions for node_cool_down_in_ms, and inserts and queries
+            that fail because the connection broke are sent again through another node
+        :param node_urls: List of String, "host:port" of the nodes
+        :param node_select_policy: String, Session.SELECT_RANDOM, Session.SELECT_ROUND_ROBIN (spread the
+                                   sessions over the nodes in turn) or Session.SELECT_LATENCY (the node that
+                                   opened sessions the fastest first)
+        :param node_cool_down_in_ms: Integer, how long a failed node is tried only after the others
+        """
+        if not node_urls:
+            raise RuntimeError("node_urls can not be empty")
+        if node_select_policy not in (
+            Session.SELECT_RANDOM,
+            Session.SELECT_ROUND_ROBIN,
+            Session.SELECT_LATENCY,
+        ):
+            raise RuntimeError("Unknown node select policy: " + str(node_select_policy))
+        endpoints = []
+        for node_url in node_urls:
+            host, port = node_url.rsplit(":", 1)
+            endpoints.append((host, int(port)))
+        session = cls(
+            endpoints[0][0],
+            endpoints[0][1],
+            user,
+            password,
+            fetch_size,
+            zone_id,
+            enable_records_auto_convert_tablet,
+            enable_redirection,
+            enable_query_redirection,
+        )
+        session.__endpoints = endpoints
+        session.__node_select_policy = node_select_policy
+        session.__node_cool_down_in_ms = node_cool_down_in_ms
+        return session
 
     def open(self, enable_rpc_compression):
         if not self.__is_close:
             return
-        self.__transport = TTransport.TFramedTransport(
-            TSocket.TSocket(self.__host, self.__port)
-        )
+        self.__enable_rpc_compression = enable_rpc_compression
+        errors = []
+        for host, port in self.__ordered_endpoints():
+            start_time = time.monotonic()
+            try:
+                self.__open_endpoint(host, port, enable_rpc_compression)
+            except Exception as e:
+                logger.warning("can not open a session to %s:%s: %s", host, port, e)
+                errors.append("{}:{} {}".format(host, port, e))
+                self.__mark_node(host, port, False)
+                if self.__transport is not None:
+                    self.__transport.close()
+                continue
+            self.__mark_node(host, port, True, time.monotonic() - start_time)
+            self.__is_close = False
+            return
+        raise RuntimeError("Can not connect to any node: " + "; ".join(errors))
+
+    def get_endpoint(self):
+        """
+        :return: (host, port) of the node the session is connected to
+        """
+        return self.__host, self.__port
+
+    def __open_endpoint(self, host, port, enable_rpc_compression):
+        self.__host = host
+        self.__port = port
+        socket = TSocket.TSocket(self.__host, self.__port)
+        socket.setTimeout(self.__connection_timeout_in_ms)
+        self.__socket = socket
+        self.__transport = TTransport.TFramedTransport(socket)
 
         if not self.__transport.isOpen():
-            try:
-                self.__transport.open()
-            except TTransport.TTransportException as e:
-                logger.exception("TTransportException!", exc_info=e)
+            self.__transport.open()
 
         if enable_rpc_compression:
-            self.__client = Client(TCompactProtocol.TCompactProtocol(self.__transport))
+            client = Client(TCompactProtocol.TCompactProtocol(self.__transport))
         else:
-            self.__client = Client(TBinaryProtocol.TBinaryProtocol(self.__transport))
+            client = Client(TBinaryProtocol.TBinaryProtocol(self.__transport))
+        self.__client = _SynchronizedClient(client)
 
         open_req = TSOpenSessionReq(
             client_protocol=self.protocol_version,
@@ -144,17 +304,262 @@ class Session(object):
         except Exception as e:
             self.__transport.close()
             logger.exception("session closed because: ", exc_info=e)
+            raise
 
         if self.__zone_id is not None:
             self.set_time_zone(self.__zone_id)
         else:
             self.__zone_id = self.get_time_zone()
+        # the timeout only bounds opening, requests may take as long as they need
+        socket.setTimeout(None)
+
+    def __ordered_endpoints(self):
+        """
+        the nodes to try, the healthy ones in the order of the node select policy, then the ones cooling
+        down, the soonest to recover first
+        """
+        now = time.monotonic()
+        with Session.__NODE_LOCK:
+            states = [
+                Session.__NODE_STATES.get(endpoint) for endpoint in self.__endpoints
+            ]
+        healthy = []
+        cooling_down = []
+        for endpoint, state in zip(self.__endpoints, states):
+            if state is None or state[0] <= now:
+                healthy.append((endpoint, state))
+            else:
+                cooling_down.append((endpoint, state))
+        if self.__node_select_policy == Session.SELECT_ROUND_ROBIN and healthy:
+            start = next(Session.__ROUND_ROBIN_COUNTER) % len(healthy)
+            healthy = healthy[start:] + healthy[:start]
+        elif self.__node_select_policy == Session.SELECT_LATENCY:
+            # nodes without a measurement yet come first, so that they get one
+            healthy.sort(
+                key=lambda item: 0
+                if item[1] is None or item[1][1] is None
+                else item[1][1]
+            )
+        else:
+            random.shuffle(healthy)
+        cooling_down.sort(key=lambda item: item[1][0])
+        return [endpoint for endpoint, _ in healthy + cooling_down]
+
+    def __mark_node(self, host, port, healthy, latency=None):
+        with Session.__NODE_LOCK:
+            state = Session.__NODE_STATES.setdefault((host, port), [0, None])
+            if healthy:
+                state[0] = 0
+                # smooth the latency of opening sessions to the node
+                state[1] = (
+                    latency if state[1] is None else 0.8 * state[1] + 0.2 * latency
+                )
+            else:
+                state[0] = time.monotonic() + self.__node_cool_down_in_ms / 1000.0
+
+    def __reconnect(self):
+        """
+        drop the broken connection and open a session to another node (or the same one if it is the only one
+        left)
+        """
+        self.__mark_node(self.__host, self.__port, False)
+        if self.__transport is not None:
+            self.__transport.close()
+        self.__is_close = True
+        self.open(self.__enable_rpc_compression)
+
+    def __call_with_failover(self, rpc_name, request):
+        """
+        call an idempotent rpc (insert or query), when the connection breaks, reconnect and send the
+        request again with the new session, up to once per node
+        """
+        retry = 0
+        while True:
+            try:
+                return getattr(self.__client, rpc_name)(request)
+            except (TTransport.TTransportException, OSError) as e:
+                if retry >= len(self.__endpoints):
+                    raise
+                retry += 1
+                logger.warning(
+                    "%s failed on %s:%s because %s, sending it through another node",
+                    rpc_name,
+                    self.__host,
+                    self.__port,
+                    e,
+                )
+                self.__reconnect()
+                request.sessionId = self.__session_id
+                if hasattr(request, "statementId"):
+                    request.statementId = self.__statement_id
+
+    def __insert_to_device(self, device_id, rpc_name, gen_request):
+        """
+        send an insertion of one device to the node owning it
+        :param gen_request: function(session) -> request, builds the request for the connection it is sent through
+        :return: the status of the insertion
+        """
+        return self.__insert_to_devices(
+            rpc_name, [device_id], lambda session, indexes: gen_request(session)
+        )[0]
+
+    def __insert_to_devices(self, rpc_name, device_ids, gen_request):
+        """
+        send an insertion to the nodes owning its devices, one request per node
+        :param device_ids: List of String, the device of every record / tablet of the insertion
+        :param gen_request: function(session, indexes) -> request, builds the request of the records / tablets at
+                            indexes (None for all of them) for the connection it is sent through
+        :return: List of the statuses of the requests
+        """
+        groups = {}
+        if self.__device_id_to_endpoint:
+            for i, device_id in enumerate(device_ids):
+                groups.setdefault(self.__get_connection(device_id), []).append(i)
+        if len(groups) <= 1:
+            groups = {next(iter(groups), self): None}
+
+        statuses = []
+        for connection, indexes in groups.items():
+            status = None
+            if connection is not self:
+                try:
+                    status = connection.__call_with_failover(
+                        rpc_name, gen_request(connection, indexes)
+                    )
+                except (TTransport.TException, OSError, RuntimeError) as e:
+                    logger.warning(
+                        "can not insert through %s:%s because %s, inserting through %s:%s",
+                        connection.__host,
+                        connection.__port,
+                        e,
+                        self.__host,
+                        self.__port,
+                    )
+                    self.__remove_connection(connection)
+            if status is None:
+                status = self.__call_with_failover(rpc_name, gen_request(self, indexes))
+            self.__update_redirection(status, Session.__pick(device_ids, indexes))
+            statuses.append(status)
+        return statuses
+
+    def __get_connection(self, device_id):
+        endpoint = self.__device_id_to_endpoint.get(device_id)
+        if endpoint is None:
+            return self
+        return self.__endpoint_to_connection.get(endpoint, self)
+
+    def __update_redirection(self, status, device_ids):
+        """
+        remember the nodes the server redirects the devices of an insertion to
+        :param device_ids: List of String, the device of every record / tablet of the request
+        """
+        if not self.__enable_redirection:
+            return
+        if status.subStatus:
+            # one status per record / tablet
+            for device_id, sub_status in zip(device_ids, status.subStatus):
+                if sub_status.redirectNode is not None:
+                    self.__handle_redirection(device_id, sub_status.redirectNode)
+        elif status.redirectNode is not None:
+            for device_id in set(device_ids):
+                self.__handle_redirection(device_id, status.redirectNode)
+
+    def __handle_redirection(self, device_id, end_point):
+        if end_point.ip == Session.__UNKNOWN_NODE_IP:
+            return
+        endpoint = (end_point.ip, end_point.port)
+        if endpoint == (self.__host, self.__port):
+            self.__device_id_to_endpoint.pop(device_id, None)
+            return
+        if self.__get_endpoint_connection(end_point) is None:
+            self.__device_id_to_endpoint.pop(device_id, None)
+            return
+        self.__device_id_to_endpoint[device_id] = endpoint
+
+    def __get_endpoint_connection(self, end_point):
+        """
+        :return: the cached connection to end_point, opened on first use, None if the node can not be reached
+                 or failed to be reached within the last node_cool_down_in_ms
+        """
+        endpoint = (end_point.ip, end_point.port)
+        connection = self.__endpoint_to_connection.get(endpoint)
+        if connection is None:
+            with Session.__NODE_LOCK:
+                state = Session.__NODE_STATES.get(endpoint)
+            if state is not None and state[0] > time.monotonic():
+                return None
+            connection = Session(
+                end_point.ip,
+                end_point.port,
+                self.__user,
+                self.__password,
+                self.__fetch_size,
+                self.__zone_id,
+                enable_redirection=False,
+            )
+            connection.__node_cool_down_in_ms = self.__node_cool_down_in_ms
+            connection.__connection_timeout_in_ms = (
+                Session.REDIRECTION_CONNECTION_TIMEOUT_IN_MS
+            )
+            try:
+                connection.open(self.__enable_rpc_compression)
+            except Exception as e:
+                logger.warning(
+                    "can not connect to redirected node %s:%s: %s",
+                    end_point.ip,
+                    end_point.port,
+                    e,
+                )
+                return None
+            self.__endpoint_to_connection[endpoint] = connection
+        return connection
+
+    def __remove_connection(self, connection):
+        """
+        forget a broken connection and the devices redirected to it, the node is not connected to again
+        for node_cool_down_in_ms
+        """
+        endpoint = (connection.__host, connection.__port)
+        self.__mark_node(connection.__host, connection.__port, False)
+        self.__endpoint_to_connection.pop(endpoint, None)
+        self.__device_id_to_endpoint = {
+            device_id: device_endpoint
+            for device_id, device_endpoint in self.__device_id_to_endpoint.items()
+            if device_endpoint != endpoint
+        }
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug("can not close the connection to %s:%s: %s", *endpoint, e)
 
-        self.__is_close = False
+    @staticmethod
+    def __pick(lst, indexes):
+        return lst if indexes is None else [lst[i] for i in indexes]
 
     def is_open(self):
         return not self.__is_close
 
+    def is_alive(self, timeout_in_ms=None):
+        """
+        send a cheap request to find out whether the connection and the session are still usable,
+        is_open() only knows whether close() has been called
+        :param timeout_in_ms: Integer, optional, how long to wait for the answer, None to wait without limit,
+                              the connection is closed when it fails or does not answer in time
+        :return: Boolean
+        """
+        if self.__is_close:
+            return False
+        self.__socket.setTimeout(timeout_in_ms)
+        try:
+            resp = self.__client.getTimeZone(self.__session_id)
+        except (TTransport.TException, OSError) as e:
+            logger.debug("session is not alive: %s", e)
+            # a late answer would be read by the next request, close() only cleans up after this
+            self.__transport.close()
+            return False
+        self.__socket.setTimeout(None)
+        return resp.status.code == Session.SUCCESS_CODE
+
     def close(self):
         if self.__is_close:
             return
@@ -170,6 +575,10 @@ class Session(object):
             self.__is_close = True
             if self.__transport is not None:
                 self.__transport.close()
+            for connection in self.__endpoint_to_connection.values():
+                connection.close()
+            self.__endpoint_to_connection.clear()
+            self.__device_id_to_endpoint.clear()
 
     def set_storage_group(self, group_name):
         """
@@ -373,10 +782,13 @@ class Session(object):
         if type(measurements) == str:
             measurements = [measurements]
         data_types = [TSDataType.TEXT.value for _ in string_values]
-        request = self.gen_insert_str_record_req(
-            device_id, timestamp, measurements, data_types, string_values
+        status = self.__insert_to_device(
+            device_id,
+            "insertStringRecord",
+            lambda session: session.gen_insert_str_record_req(
+                device_id, timestamp, measurements, data_types, string_values
+            ),
         )
-        status = self.__client.insertStringRecord(request)
         logger.debug(
             "insert one record to device {} message: {}".format(
                 device_id, status.message
@@ -394,10 +806,13 @@ class Session(object):
         if type(measurements) == str:
             measurements = [measurements]
         data_types = [TSDataType.TEXT.value for _ in string_values]
-        request = self.gen_insert_str_record_req(
-            device_id, timestamp, measurements, data_types, string_values, True
+        status = self.__insert_to_device(
+            device_id,
+            "insertStringRecord",
+            lambda session: session.gen_insert_str_record_req(
+                device_id, timestamp, measurements, data_types, string_values, True
+            ),
         )
-        status = self.__client.insertStringRecord(request)
         logger.debug(
             "insert one record to device {} message: {}".format(
                 device_id, status.message
@@ -419,10 +834,13 @@ class Session(object):
         :param values: List, values to be inserted, for each sensor
         """
         data_types = [data_type.value for data_type in data_types]
-        request = self.gen_insert_record_req(
-            device_id, timestamp, measurements, data_types, values
+        status = self.__insert_to_device(
+            device_id,
+            "insertRecord",
+            lambda session: session.gen_insert_record_req(
+                device_id, timestamp, measurements, data_types, values
+            ),
         )
-        status = self.__client.insertRecord(request)
         logger.debug(
             "insert one record to device {} message: {}".format(
                 device_id, status.message
@@ -443,21 +861,34 @@ class Session(object):
         :param types_lst: 2-D List of TSDataType, each element of outer list indicates sensor data types of a device
         :param values_lst: 2-D List, values to be inserted, for each device
         """
+        if self.__enable_records_auto_convert_tablet:
+            result = self.__insert_records_as_tablets(
+                device_ids, times, measurements_lst, types_lst, values_lst, False
+            )
+            if result is not None:
+                return result
         type_values_lst = []
         for types in types_lst:
             data_types = [data_type.value for data_type in types]
             type_values_lst.append(data_types)
-        request = self.gen_insert_records_req(
-            device_ids, times, measurements_lst, type_values_lst, values_lst
+        statuses = self.__insert_to_devices(
+            "insertRecords",
+            device_ids,
+            lambda session, indexes: session.gen_insert_records_req(
+                Session.__pick(device_ids, indexes),
+                Session.__pick(times, indexes),
+                Session.__pick(measurements_lst, indexes),
+                Session.__pick(type_values_lst, indexes),
+                Session.__pick(values_lst, indexes),
+            ),
         )
-        status = self.__client.insertRecords(request)
         logger.debug(
             "insert multiple records to devices {} message: {}".format(
-                device_ids, status.message
+                device_ids, [status.message for status in statuses]
             )
         )
 
-        return Session.verify_success(status)
+        return Session.__verify_all_success(statuses)
 
     def insert_aligned_record(
         self, device_id, timestamp, measurements, data_types, values
@@ -474,10 +905,13 @@ class Session(object):
         :param values: List, values to be inserted, for each sensor
         """
         data_types = [data_type.value for data_type in data_types]
-        request = self.gen_insert_record_req(
-            device_id, timestamp, measurements, data_types, values, True
+        status = self.__insert_to_device(
+            device_id,
+            "insertRecord",
+            lambda session: session.gen_insert_record_req(
+                device_id, timestamp, measurements, data_types, values, True
+            ),
         )
-        status = self.__client.insertRecord(request)
         logger.debug(
             "insert one record to device {} message: {}".format(
                 device_id, status.message
@@ -498,21 +932,94 @@ class Session(object):
         :param types_lst: 2-D List of TSDataType, each element of outer list indicates sensor data types of a device
         :param values_lst: 2-D List, values to be inserted, for each device
         """
+        if self.__enable_records_auto_convert_tablet:
+            result = self.__insert_records_as_tablets(
+                device_ids, times, measurements_lst, types_lst, values_lst, True
+            )
+            if result is not None:
+                return result
         type_values_lst = []
         for types in types_lst:
             data_types = [data_type.value for data_type in types]
             type_values_lst.append(data_types)
-        request = self.gen_insert_records_req(
-            device_ids, times, measurements_lst, type_values_lst, values_lst, True
+        statuses = self.__insert_to_devices(
+            "insertRecords",
+            device_ids,
+            lambda session, indexes: session.gen_insert_records_req(
+                Session.__pick(device_ids, indexes),
+                Session.__pick(times, indexes),
+                Session.__pick(measurements_lst, indexes),
+                Session.__pick(type_values_lst, indexes),
+                Session.__pick(values_lst, indexes),
+                True,
+            ),
         )
-        status = self.__client.insertRecords(request)
         logger.debug(
             "insert multiple records to devices {} message: {}".format(
-                device_ids, status.message
+                device_ids, [status.message for status in statuses]
             )
         )
 
-        return Session.verify_success(status)
+        return Session.__verify_all_success(statuses)
+
+    def __insert_records_as_tablets(
+        self, device_ids, times, measurements_lst, types_lst, values_lst, is_aligned
+    ):
+        """
+        insert the records as tablets, see records_to_tablets
+        :return: None if the records are not worth converting, otherwise the result of insert_tablets
+        """
+        tablet_lst = Session.records_to_tablets(
+            device_ids, times, measurements_lst, types_lst, values_lst
+        )
+        if tablet_lst is None:
+            return None
+        if is_aligned:
+            return self.insert_aligned_tablets(tablet_lst)
+        return self.insert_tablets(tablet_lst)
+
+    @staticmethod
+    def records_to_tablets(device_ids, times, measurements_lst, types_lst, values_lst):
+        """
+        group the records by device, measurements and data types, every group becomes a tablet,
+        shared by Session and AsyncSession
+        :return: List of Tablet, or None if the records are too heterogeneous to be worth converting (less than
+                 RECORDS_PER_TABLET_TO_CONVERT records per tablet on average)
+        """
+        if (
+            (len(device_ids) != len(measurements_lst))
+            or (len(times) != len(types_lst))
+            or (len(device_ids) != len(times))
+            or (len(times) != len(values_lst))
+        ):
+            raise RuntimeError(
+                "deviceIds, times, measurementsList and valuesList's size should be equal"
+            )
+        groups = {}
+        for device_id, timestamp, measurements, data_types, values in zip(
+            device_ids, times, measurements_lst, types_lst, values_lst
+        ):
+            if (len(values) != len(data_types)) or (len(values) != len(measurements)):
+                raise RuntimeError(
+                    "deviceIds, times, measurementsList and valuesList's size should be equal"
+                )
+            key = (device_id, tuple(measurements), tuple(data_types))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = ([], [])
+            group[0].append(timestamp)
+            group[1].append(values)
+        if len(groups) * Session.RECORDS_PER_TABLET_TO_CONVERT > len(times):
+            return None
+
+        tablet_lst = []
+        for (device_id, measurements, data_types), (timestamps, rows) in groups.items():
+            tablet_lst.append(
+                Tablet(
+                    device_id, list(measurements), list(data_types), rows, timestamps
+                )
+            )
+        return tablet_lst
 
     def test_insert_record(
         self, device_id, timestamp, measurements, data_types, values
@@ -602,6 +1109,30 @@ class Session(object):
         values_lst,
         is_aligned=False,
     ):
+        return Session.build_insert_records_req(
+            self.__session_id,
+            device_ids,
+            times,
+            measurements_lst,
+            types_lst,
+            values_lst,
+            is_aligned,
+        )
+
+    @staticmethod
+    def build_insert_records_req(
+        session_id,
+        device_ids,
+        times,
+        measurements_lst,
+        types_lst,
+        values_lst,
+        is_aligned=False,
+    ):
+        """
+        build the insertRecords request of a session, shared by Session and AsyncSession
+        :param types_lst: 2-D List of Integer, the values of the TSDataTypes
+        """
         if (
             (len(device_ids) != len(measurements_lst))
             or (len(times) != len(types_lst))
@@ -624,7 +1155,7 @@ class Session(object):
             value_lst.append(values_in_bytes)
 
         return TSInsertRecordsReq(
-            self.__session_id,
+            session_id,
             device_ids,
             measurements_lst,
             value_lst,
@@ -644,7 +1175,11 @@ class Session(object):
                 The tablet itself is sorted (see docs of Tablet.py)
         :param tablet: a tablet specified above
         """
-        status = self.__client.insertTablet(self.gen_insert_tablet_req(tablet))
+        status = self.__insert_to_device(
+            tablet.get_device_id(),
+            "insertTablet",
+            lambda session: session.gen_insert_tablet_req(tablet),
+        )
         logger.debug(
             "insert one tablet to device {} message: {}".format(
                 tablet.get_device_id(), status.message
@@ -658,10 +1193,20 @@ class Session(object):
         insert multiple tablets, tablets are independent to each other
         :param tablet_lst: List of tablets
         """
-        status = self.__client.insertTablets(self.gen_insert_tablets_req(tablet_lst))
-        logger.debug("insert multiple tablets, message: {}".format(status.message))
+        statuses = self.__insert_to_devices(
+            "insertTablets",
+            [tablet.get_device_id() for tablet in tablet_lst],
+            lambda session, indexes: session.gen_insert_tablets_req(
+                Session.__pick(tablet_lst, indexes)
+            ),
+        )
+        logger.debug(
+            "insert multiple tablets, message: {}".format(
+                [status.message for status in statuses]
+            )
+        )
 
-        return Session.verify_success(status)
+        return Session.__verify_all_success(statuses)
 
     def insert_aligned_tablet(self, tablet):
         """
@@ -675,7 +1220,11 @@ class Session(object):
                 The tablet itself is sorted (see docs of Tablet.py)
         :param tablet: a tablet specified above
         """
-        status = self.__client.insertTablet(self.gen_insert_tablet_req(tablet, True))
+        status = self.__insert_to_device(
+            tablet.get_device_id(),
+            "insertTablet",
+            lambda session: session.gen_insert_tablet_req(tablet, True),
+        )
         logger.debug(
             "insert one tablet to device {} message: {}".format(
                 tablet.get_device_id(), status.message
@@ -689,24 +1238,230 @@ class Session(object):
         insert multiple aligned tablets, tablets are independent to each other
         :param tablet_lst: List of tablets
         """
-        status = self.__client.insertTablets(
-            self.gen_insert_tablets_req(tablet_lst, True)
+        statuses = self.__insert_to_devices(
+            "insertTablets",
+            [tablet.get_device_id() for tablet in tablet_lst],
+            lambda session, indexes: session.gen_insert_tablets_req(
+                Session.__pick(tablet_lst, indexes), True
+            ),
+        )
+        logger.debug(
+            "insert multiple tablets, message: {}".format(
+                [status.message for status in statuses]
+            )
         )
-        logger.debug("insert multiple tablets, message: {}".format(status.message))
 
-        return Session.verify_success(status)
+        return Session.__verify_all_success(statuses)
+
+    def insert_dataframe(
+        self,
+        df,
+        device_id=None,
+        device_column=None,
+        time_column="Time",
+        aligned=False,
+        max_request_bytes=DEFAULT_MAX_REQUEST_BYTES,
+    ):
+        """
+        insert a pandas DataFrame, it is converted to NumpyTablets per device and sent by insert_tablets
+            the columns of the DataFrame can be laid out in three ways:
+                device_id given: every column except the time column is a measurement of the device
+                device_column given: rows are grouped by the device in that column, the other
+                                     columns are measurements
+                neither: every column except the time column is a full path (e.g. root.sg1.d1.s1,
+                         as returned by todf) and is split into device and measurement
+            data types are inferred from the dtypes, NA cells (None, NaN, pd.NA) are inserted as empty
+            cells and rows without any value of a device are skipped
+        :param df: pandas DataFrame
+        :param device_id: String, optional, the device of all columns
+        :param device_column: String, optional, name of the column holding the device of each row
+        :param time_column: String, name of the timestamp column, integer milliseconds or datetime64,
+                            None to use the index of the DataFrame
+        :param aligned: Boolean, insert into aligned time series
+        :param max_request_bytes: Int, upper bound of the estimated size of one insert_tablets request,
+                                  larger devices are split into several tablets
+        """
+        tablet_lst = []
+        request_bytes = 0
+        for tablet, tablet_bytes in self.__dataframe_to_tablets(
+            df, device_id, device_column, time_column, max_request_bytes
+        ):
+            if tablet_lst and request_bytes + tablet_bytes > max_request_bytes:
+                if self.__insert_tablet_batch(tablet_lst, aligned) != 0:
+                    return -1
+                tablet_lst = []
+                request_bytes = 0
+            tablet_lst.append(tablet)
+            request_bytes += tablet_bytes
+        if tablet_lst:
+            return self.__insert_tablet_batch(tablet_lst, aligned)
+        return 0
+
+    def __insert_tablet_batch(self, tablet_lst, aligned):
+        if aligned:
+            return self.insert_aligned_tablets(tablet_lst)
+        return self.insert_tablets(tablet_lst)
+
+    @staticmethod
+    def __dataframe_to_tablets(
+        df, device_id, device_column, time_column, max_request_bytes
+    ):
+        """
+        yield (NumpyTablet, estimated bytes) covering the DataFrame, each at most max_request_bytes
+        unless a single row is larger
+        """
+        for device, times, columns in Session.__split_dataframe_by_device(
+            df, device_id, device_column, time_column
+        ):
+            if not columns:
+                continue
+            is_none = [series.isna().to_numpy() for _, series in columns]
+            has_value = ~np.logical_and.reduce(is_none)
+            if not has_value.all():
+                times = times[has_value]
+                columns = [(m, series[has_value]) for m, series in columns]
+                is_none = [none[has_value] for none in is_none]
+            # an all-NA column has no inferable type and nothing to insert
+            columns = [
+                column for column, none in zip(columns, is_none) if not none.all()
+            ]
+            if len(times) == 0:
+                continue
+
+            measurements = []
+            data_types = []
+            values = []
+            row_bytes = 8
+            for measurement, series in columns:
+                data_type = Session.__infer_data_type(series)
+                measurements.append(measurement)
+                data_types.append(data_type)
+                if data_type == TSDataType.TEXT:
+                    # 4 bytes of length per cell, plus the average length of the text
+                    row_bytes += 4 + Session.__mean_text_length(series)
+                    if series.hasnans or series.dtype != object:
+                        values.append(series.array)
+                    else:
+                        values.append(series.to_numpy())
+                else:
+                    row_bytes += data_type.np_dtype().itemsize
+                    if series.hasnans:
+                        values.append(series.array)
+                    else:
+                        values.append(
+                            series.to_numpy(
+                                dtype=data_type.np_dtype().newbyteorder("=")
+                            )
+                        )
+
+            rows_per_tablet = max(1, int(max_request_bytes // row_bytes))
+            for start in range(0, len(times), rows_per_tablet):
+                end = min(start + rows_per_tablet, len(times))
+                tablet = NumpyTablet(
+                    device,
+                    measurements,
+                    data_types,
+                    [value[start:end] for value in values],
+                    times[start:end],
+                )
+                yield tablet, int((end - start) * row_bytes)
+
+    @staticmethod
+    def __mean_text_length(series):
+        """
+        average length of the non-NA cells of a TEXT column, cells other than str / bytes are
+        measured by their str()
+        """
+        if pd.api.types.infer_dtype(series, skipna=True) not in ("string", "bytes"):
+            series = series.dropna().astype(str)
+        length = series.str.len().mean()
+        return 0 if pd.isna(length) else length
+
+    @staticmethod
+    def __split_dataframe_by_device(df, device_id, device_column, time_column):
+        """
+        yield (device, int64 timestamps ndarray, list of (measurement, pandas Series)) per device
+        """
+        if time_column is None:
+            times = df.index
+        else:
+            times = df[time_column]
+        if pd.api.types.is_datetime64_any_dtype(times.dtype):
+            times = pd.DatetimeIndex(times).asi8 // 1000000
+        else:
+            times = np.asarray(times, np.int64)
+
+        value_columns = [
+            column
+            for column in df.columns
+            if column not in (time_column, device_column)
+        ]
+        if device_id is not None:
+            yield device_id, times, [(column, df[column]) for column in value_columns]
+        elif device_column is not None:
+            for device, index in df.groupby(device_column, sort=False).indices.items():
+                group = df.iloc[index]
+                yield device, times[index], [
+                    (column, group[column]) for column in value_columns
+                ]
+        else:
+            devices = {}
+            for column in value_columns:
+                device, _, measurement = str(column).rpartition(".")
+                if not device or not measurement:
+                    raise RuntimeError(
+                        "Column {!r} is not a full path (e.g. root.sg1.d1.s1), "
+                        "give device_id or device_column to insert it".format(column)
+                    )
+                devices.setdefault(device, []).append((measurement, df[column]))
+            for device, columns in devices.items():
+                yield device, times, columns
+
+    @staticmethod
+    def __infer_data_type(series):
+        """
+        map the dtype of a pandas Series to TSDataType, object columns are inferred from their values
+        """
+        dtype = series.dtype
+        if dtype == object:
+            inferred = pd.api.types.infer_dtype(series, skipna=True)
+            if inferred == "boolean":
+                return TSDataType.BOOLEAN
+            if inferred == "integer":
+                return TSDataType.INT64
+            if inferred in ("floating", "mixed-integer-float"):
+                return TSDataType.DOUBLE
+            return TSDataType.TEXT
+        if pd.api.types.is_bool_dtype(dtype):
+            return TSDataType.BOOLEAN
+        if pd.api.types.is_integer_dtype(dtype):
+            np_dtype = np.dtype(getattr(dtype, "numpy_dtype", dtype))
+            if np_dtype.itemsize < 4 or (
+                np_dtype.itemsize == 4 and np_dtype.kind == "i"
+            ):
+                return TSDataType.INT32
+            return TSDataType.INT64
+        if pd.api.types.is_float_dtype(dtype):
+            np_dtype = np.dtype(getattr(dtype, "numpy_dtype", dtype))
+            if np_dtype.itemsize <= 4:
+                return TSDataType.FLOAT
+            return TSDataType.DOUBLE
+        if pd.api.types.is_string_dtype(dtype):
+            return TSDataType.TEXT
+        raise RuntimeError(
+            "Unsupported dtype {} of column {}".format(dtype, series.name)
+        )
 
     def insert_records_of_one_device(
         self, device_id, times_list, measurements_list, types_list, values_list
     ):
         # sort by timestamp
-        sorted_zipped = sorted(
-            zip(times_list, measurements_list, types_list, values_list)
-        )
-        result = zip(*sorted_zipped)
-        times_list, measurements_list, types_list, values_list = [
-            list(x) for x in result
-        ]
+        index = SortUtil.sort_index(times_list)
+        if index is not None:
+            times_list, measurements_list, types_list, values_list = [
+                SortUtil.reorder(x, index)
+                for x in (times_list, measurements_list, types_list, values_list)
+            ]
 
         return self.insert_records_of_one_device_sorted(
             device_id, times_list, measurements_list, types_list, values_list
@@ -744,12 +1499,26 @@ class Session(object):
                 "insert records of one device error: timestamp not sorted"
             )
 
-        request = self.gen_insert_records_of_one_device_request(
-            device_id, times_list, measurements_list, values_list, types_list
-        )
+        if self.__enable_records_auto_convert_tablet:
+            result = self.__insert_records_as_tablets(
+                [device_id] * size,
+                times_list,
+                measurements_list,
+                types_list,
+                values_list,
+                False,
+            )
+            if result is not None:
+                return result
 
         # send request
-        status = self.__client.insertRecordsOfOneDevice(request)
+        status = self.__insert_to_device(
+            device_id,
+            "insertRecordsOfOneDevice",
+            lambda session: session.gen_insert_records_of_one_device_request(
+                device_id, times_list, measurements_list, values_list, types_list
+            ),
+        )
         logger.debug("insert records of one device, message: {}".format(status.message))
 
         return Session.verify_success(status)
@@ -758,13 +1527,12 @@ class Session(object):
         self, device_id, times_list, measurements_list, types_list, values_list
     ):
         # sort by timestamp
-        sorted_zipped = sorted(
-            zip(times_list, measurements_list, types_list, values_list)
-        )
-        result = zip(*sorted_zipped)
-        times_list, measurements_list, types_list, values_list = [
-            list(x) for x in result
-        ]
+        index = SortUtil.sort_index(times_list)
+        if index is not None:
+            times_list, measurements_list, types_list, values_list = [
+                SortUtil.reorder(x, index)
+                for x in (times_list, measurements_list, types_list, values_list)
+            ]
 
         return self.insert_aligned_records_of_one_device_sorted(
             device_id, times_list, measurements_list, types_list, values_list
@@ -801,12 +1569,26 @@ class Session(object):
                 "insert records of one device error: timestamp not sorted"
             )
 
-        request = self.gen_insert_records_of_one_device_request(
-            device_id, times_list, measurements_list, values_list, types_list, True
-        )
+        if self.__enable_records_auto_convert_tablet:
+            result = self.__insert_records_as_tablets(
+                [device_id] * size,
+                times_list,
+                measurements_list,
+                types_list,
+                values_list,
+                True,
+            )
+            if result is not None:
+                return result
 
         # send request
-        status = self.__client.insertRecordsOfOneDevice(request)
+        status = self.__insert_to_device(
+            device_id,
+            "insertRecordsOfOneDevice",
+            lambda session: session.gen_insert_records_of_one_device_request(
+                device_id, times_list, measurements_list, values_list, types_list, True
+            ),
+        )
         logger.debug("insert records of one device, message: {}".format(status.message))
 
         return Session.verify_success(status)
@@ -872,9 +1654,21 @@ class Session(object):
         return Session.verify_success(status)
 
     def gen_insert_tablet_req(self, tablet, is_aligned=False):
+        return Session.build_insert_tablet_req(self.__session_id, tablet, is_aligned)
+
+    def gen_insert_tablets_req(self, tablet_lst, is_aligned=False):
+        return Session.build_insert_tablets_req(
+            self.__session_id, tablet_lst, is_aligned
+        )
+
+    @staticmethod
+    def build_insert_tablet_req(session_id, tablet, is_aligned=False):
+        """
+        build the insertTablet request of a session, shared by Session and AsyncSession
+        """
         data_type_values = [data_type.value for data_type in tablet.get_data_types()]
         return TSInsertTabletReq(
-            self.__session_id,
+            session_id,
             tablet.get_device_id(),
             tablet.get_measurements(),
             tablet.get_binary_values(),
@@ -884,7 +1678,11 @@ class Session(object):
             is_aligned,
         )
 
-    def gen_insert_tablets_req(self, tablet_lst, is_aligned=False):
+    @staticmethod
+    def build_insert_tablets_req(session_id, tablet_lst, is_aligned=False):
+        """
+        build the insertTablets request of a session, shared by Session and AsyncSession
+        """
         device_id_lst = []
         measurements_lst = []
         values_lst = []
@@ -902,7 +1700,7 @@ class Session(object):
             type_lst.append(data_type_values)
             size_lst.append(tablet.get_row_number())
         return TSInsertTabletsReq(
-            self.__session_id,
+            session_id,
             device_id_lst,
             measurements_lst,
             values_lst,
@@ -918,21 +1716,86 @@ class Session(object):
         :param sql: String, query sql statement
         :return: SessionDataSet, contains query results and relevant info (see SessionDataSet.py)
         """
-        request = TSExecuteStatementReq(
-            self.__session_id, sql, self.__statement_id, self.__fetch_size, timeout
+        return self.__execute_query(
+            "executeQueryStatement",
+            lambda session, enable_redirect_query: TSExecuteStatementReq(
+                session.__session_id,
+                sql,
+                session.__statement_id,
+                session.__fetch_size,
+                timeout,
+                enableRedirectQuery=enable_redirect_query,
+            ),
+            sql,
+        )
+
+    def __execute_query(self, rpc_name, gen_request, sql=""):
+        """
+        run a query, when query redirection is enabled and the server answers that the data of the query lives on
+        another node, run it again through the cached connection to that node
+        :param gen_request: function(session, enable_redirect_query) -> request, builds the request for the
+                            connection it is sent through
+        :return: SessionDataSet
+        """
+        connection = self
+        resp = self.__call_with_failover(
+            rpc_name, gen_request(self, self.__enable_query_redirection)
         )
-        resp = self.__client.executeQueryStatement(request)
+        if (
+            self.__enable_query_redirection
+            and resp.status is not None
+            and resp.status.code == Session.NEED_REDIRECTION_CODE
+            and resp.status.redirectNode is not None
+            and resp.status.redirectNode.ip != Session.__UNKNOWN_NODE_IP
+        ):
+            end_point = resp.status.redirectNode
+            # the server keeps the redirected query open, release it
+            try:
+                self.__client.closeOperation(
+                    TSCloseOperationReq(
+                        self.__session_id, resp.queryId, self.__statement_id
+                    )
+                )
+            except TTransport.TException as e:
+                logger.debug("can not close redirected query: %s", e)
+            resp = None
+            target = self.__get_endpoint_connection(end_point)
+            if target is not None:
+                logger.debug(
+                    "redirect %s from %s:%s to %s:%s",
+                    sql or rpc_name,
+                    self.__host,
+                    self.__port,
+                    end_point.ip,
+                    end_point.port,
+                )
+                try:
+                    resp = target.__call_with_failover(
+                        rpc_name, gen_request(target, False)
+                    )
+                    connection = target
+                except (TTransport.TException, OSError, RuntimeError) as e:
+                    logger.warning(
+                        "can not query through %s:%s because %s",
+                        end_point.ip,
+                        end_point.port,
+                        e,
+                    )
+                    self.__remove_connection(target)
+            if resp is None:
+                resp = self.__call_with_failover(rpc_name, gen_request(self, False))
         return SessionDataSet(
             sql,
             resp.columns,
             resp.dataTypeList,
             resp.columnNameIndexMap,
             resp.queryId,
-            self.__client,
-            self.__statement_id,
-            self.__session_id,
+            connection.__client,
+            connection.__statement_id,
+            connection.__session_id,
             resp.queryDataSet,
             resp.ignoreTimeStamp,
+            connection.__fetch_size,
         )
 
     def execute_non_query_statement(self, sql):
@@ -953,47 +1816,66 @@ class Session(object):
 
     @staticmethod
     def value_to_bytes(data_types, values):
+        """
+        serialize the values of one record, each value is prefixed with the byte of its data type
+        :param data_types: List of TSDataType values
+        :param values: List, values of the record
+        """
+        signature = tuple(data_types)
+        plan = Session.__VALUE_PLANS.get(signature)
+        if plan is None:
+            plan = Session.__compile_value_plan(signature)
+        parts = []
+        for value_struct, args, start, end in plan:
+            if value_struct is None:
+                # TEXT, the length is only known with the value
+                value_bytes = bytes(values[start], "utf-8")
+                parts.append(Session.__TEXT_HEADER.pack(args, len(value_bytes)))
+                parts.append(value_bytes)
+            else:
+                args = args.copy()
+                args[1::2] = values[start:end]
+                parts.append(value_struct.pack(*args))
+        if len(parts) == 1:
+            return parts[0]
+        return b"".join(parts)
+
+    @staticmethod
+    def __compile_value_plan(signature):
+        """
+        split a record signature into runs of fixed-width values, each packed by one precompiled struct
+        with the type bytes prefilled in its argument list, and TEXT values
+        :return: List of (struct.Struct, arguments, start, end) or (None, type byte, index, index + 1)
+        """
+        plan = []
         format_str_list = [">"]
-        values_tobe_packed = []
-        for data_type, value in zip(data_types, values):
-            if data_type == TSDataType.BOOLEAN.value:
-                format_str_list.append("c")
-                format_str_list.append("?")
-                values_tobe_packed.append(bytes([TSDataType.BOOLEAN.value]))
-                values_tobe_packed.append(value)
-            elif data_type == TSDataType.INT32.value:
-                format_str_list.append("c")
-                format_str_list.append("i")
-                values_tobe_packed.append(bytes([TSDataType.INT32.value]))
-                values_tobe_packed.append(value)
-            elif data_type == TSDataType.INT64.value:
-                format_str_list.append("c")
-                format_str_list.append("q")
-                values_tobe_packed.append(bytes([TSDataType.INT64.value]))
-                values_tobe_packed.append(value)
-            elif data_type == TSDataType.FLOAT.value:
-                format_str_list.append("c")
-                format_str_list.append("f")
-                values_tobe_packed.append(bytes([TSDataType.FLOAT.value]))
-                values_tobe_packed.append(value)
-            elif data_type == TSDataType.DOUBLE.value:
-                format_str_list.append("c")
-                format_str_list.append("d")
-                values_tobe_packed.append(bytes([TSDataType.DOUBLE.value]))
-                values_tobe_packed.append(value)
-            elif data_type == TSDataType.TEXT.value:
-                value_bytes = bytes(value, "utf-8")
-                format_str_list.append("c")
-                format_str_list.append("i")
-                format_str_list.append(str(len(value_bytes)))
-                format_str_list.append("s")
-                values_tobe_packed.append(bytes([TSDataType.TEXT.value]))
-                values_tobe_packed.append(len(value_bytes))
-                values_tobe_packed.append(value_bytes)
+        args = []
+        start = 0
+        for i, data_type in enumerate(signature):
+            if data_type == TSDataType.TEXT.value:
+                if args:
+                    plan.append(
+                        (struct.Struct("".join(format_str_list)), args, start, i)
+                    )
+                    format_str_list = [">"]
+                    args = []
+                plan.append((None, data_type, i, i + 1))
+                start = i + 1
+            elif data_type in Session.__VALUE_FORMATS:
+                format_str_list.append("B")
+                format_str_list.append(Session.__VALUE_FORMATS[data_type])
+                args.append(data_type)
+                args.append(None)
             else:
                 raise RuntimeError("Unsupported data type:" + str(data_type))
-        format_str = "".join(format_str_list)
-        return struct.pack(format_str, *values_tobe_packed)
+        if args:
+            plan.append(
+                (struct.Struct("".join(format_str_list)), args, start, len(signature))
+            )
+        if len(Session.__VALUE_PLANS) >= Session.__MAX_VALUE_PLANS:
+            Session.__VALUE_PLANS.clear()
+        Session.__VALUE_PLANS[signature] = plan
+        return plan
 
     def get_time_zone(self):
         if self.__zone_id is not None:
@@ -1019,10 +1901,7 @@ class Session(object):
 
     @staticmethod
     def check_sorted(timestamps):
-        for i in range(1, len(timestamps)):
-            if timestamps[i] < timestamps[i - 1]:
-                return False
-        return True
+        return SortUtil.check_sorted(timestamps)
 
     @staticmethod
     def verify_success(status):
@@ -1032,10 +1911,31 @@ class Session(object):
         """
         if status.code == Session.SUCCESS_CODE:
             return 0
+        # the insertion succeeded, the server only recommends another node for the device
+        if status.code == Session.NEED_REDIRECTION_CODE:
+            return 0
+        # the status of each record / tablet of a batch, some of them redirected
+        if (
+            status.code == Session.MULTIPLE_ERROR_CODE
+            and status.subStatus
+            and all(
+                sub_status.code in (Session.SUCCESS_CODE, Session.NEED_REDIRECTION_CODE)
+                for sub_status in status.subStatus
+            )
+        ):
+            return 0
 
         logger.error("error status is %s", status)
         return -1
 
+    @staticmethod
+    def __verify_all_success(statuses):
+        result = 0
+        for status in statuses:
+            if Session.verify_success(status) != 0:
+                result = -1
+        return result
+
     def execute_raw_data_query(
         self, paths: list, start_time: int, end_time: int
     ) -> SessionDataSet:
@@ -1046,27 +1946,17 @@ class Session(object):
         :param end_time: Query end time
         :return: SessionDataSet, contains query results and relevant info (see SessionDataSet.py)
         """
-        request = TSRawDataQueryReq(
-            self.__session_id,
-            paths,
-            self.__fetch_size,
-            startTime=start_time,
-            endTime=end_time,
-            statementId=self.__statement_id,
-            enableRedirectQuery=False,
-        )
-        resp = self.__client.executeRawDataQuery(request)
-        return SessionDataSet(
-            "",
-            resp.columns,
-            resp.dataTypeList,
-            resp.columnNameIndexMap,
-            resp.queryId,
-            self.__client,
-            self.__statement_id,
-            self.__session_id,
-            resp.queryDataSet,
-            resp.ignoreTimeStamp,
+        return self.__execute_query(
+            "executeRawDataQuery",
+            lambda session, enable_redirect_query: TSRawDataQueryReq(
+                session.__session_id,
+                paths,
+                session.__fetch_size,
+                startTime=start_time,
+                endTime=end_time,
+                statementId=session.__statement_id,
+                enableRedirectQuery=enable_redirect_query,
+            ),
         )
 
     def execute_last_data_query(self, paths: list, last_time: int) -> SessionDataSet:
@@ -1076,27 +1966,16 @@ class Session(object):
         :param last_time: Query last time
         :return: SessionDataSet, contains query results and relevant info (see SessionDataSet.py)
         """
-        request = TSLastDataQueryReq(
-            self.__session_id,
-            paths,
-            self.__fetch_size,
-            last_time,
-            self.__statement_id,
-            enableRedirectQuery=False,
-        )
-
-        resp = self.__client.executeLastDataQuery(request)
-        return SessionDataSet(
-            "",
-            resp.columns,
-            resp.dataTypeList,
-            resp.columnNameIndexMap,
-            resp.queryId,
-            self.__client,
-            self.__statement_id,
-            self.__session_id,
-            resp.queryDataSet,
-            resp.ignoreTimeStamp,
+        return self.__execute_query(
+            "executeLastDataQuery",
+            lambda session, enable_redirect_query: TSLastDataQueryReq(
+                session.__session_id,
+                paths,
+                session.__fetch_size,
+                last_time,
+                session.__statement_id,
+                enableRedirectQuery=enable_redirect_query,
+            ),
         )
 
     def insert_string_records_of_one_device(
@@ -1121,10 +2000,13 @@ class Session(object):
             raise RuntimeError(
                 "insert records of one device error: times, measurementsList and valuesList's size should be equal!"
             )
-        request = self.gen_insert_string_records_of_one_device_request(
-            device_id, times, measurements_list, values_list, have_sorted, False
+        status = self.__insert_to_device(
+            device_id,
+            "insertStringRecordsOfOneDevice",
+            lambda session: session.gen_insert_string_records_of_one_device_request(
+                device_id, times, measurements_list, values_list, have_sorted, False
+            ),
         )
-        status = self.__client.insertStringRecordsOfOneDevice(request)
         logger.debug(
             "insert one device {} message: {}".format(device_id, status.message)
         )
@@ -1143,10 +2025,13 @@ class Session(object):
             raise RuntimeError(
                 "insert records of one device error: times, measurementsList and valuesList's size should be equal!"
             )
-        request = self.gen_insert_string_records_of_one_device_request(
-            device_id, times, measurements_list, values, have_sorted, True
+        status = self.__insert_to_device(
+            device_id,
+            "insertStringRecordsOfOneDevice",
+            lambda session: session.gen_insert_string_records_of_one_device_request(
+                device_id, times, measurements_list, values, have_sorted, True
+            ),
         )
-        status = self.__client.insertStringRecordsOfOneDevice(request)
         logger.debug(
             "insert one device {} message: {}".format(device_id, status.message)
         )
@@ -1166,11 +2051,13 @@ class Session(object):
             raise RuntimeError(
                 "insert records of one device error: times, measurementsList and valuesList's size should be equal!"
             )
-        if not Session.check_sorted(times):
-            # sort by timestamp
-            sorted_zipped = sorted(zip(times, measurements_list, values_list))
-            result = zip(*sorted_zipped)
-            times_list, measurements_list, values_list = [list(x) for x in result]
+        # sort by timestamp
+        index = SortUtil.sort_index(times)
+        if index is not None:
+            times, measurements_list, values_list = [
+                SortUtil.reorder(x, index)
+                for x in (times, measurements_list, values_list)
+            ]
         request = TSInsertStringRecordsOfOneDeviceReq(
             self.__session_id,
             device_id,
@@ -1233,6 +2120,7 @@ class Session(object):
                         self.__session_id,
                         resp.queryDataSet,
                         resp.ignoreTimeStamp,
+                        self.__fetch_size,
                     )
                 else:
                     return None
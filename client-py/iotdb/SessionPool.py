@@ -0,0 +1,375 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import logging
+import threading
+import time
+from collections import deque
+
+from .Session import Session
+
+logger = logging.getLogger("IoTDB")
+
+
+class PoolConfig(object):
+    def __init__(
+        self,
+        host,
+        port,
+        user_name=Session.DEFAULT_USER,
+        password=Session.DEFAULT_PASSWORD,
+        fetch_size=Session.DEFAULT_FETCH_SIZE,
+        time_zone=Session.DEFAULT_ZONE_ID,
+        enable_compression=False,
+    ):
+        """
+        connection settings shared by all sessions of a SessionPool
+        :param host: String, host of IoTDB
+        :param port: Integer, rpc port of IoTDB
+        :param enable_compression: Boolean, open the sessions with rpc compression
+        """
+        self.host = host
+        self.port = port
+        self.user_name = user_name
+        self.password = password
+        self.fetch_size = fetch_size
+        self.time_zone = time_zone
+        self.enable_compression = enable_compression
+
+
+class SessionPool(object):
+    DEFAULT_MAX_POOL_SIZE = 5
+    DEFAULT_WAIT_TIMEOUT_IN_MS = 60000
+    DEFAULT_HEALTH_CHECK_IDLE_TIME_IN_MS = 30000
+    DEFAULT_HEALTH_CHECK_TIMEOUT_IN_MS = 3000
+
+    def __init__(
+        self,
+        pool_config,
+        max_pool_size=DEFAULT_MAX_POOL_SIZE,
+        wait_timeout_in_ms=DEFAULT_WAIT_TIMEOUT_IN_MS,
+        max_idle_time_in_ms=None,
+        health_check_idle_time_in_ms=DEFAULT_HEALTH_CHECK_IDLE_TIME_IN_MS,
+        health_check_timeout_in_ms=DEFAULT_HEALTH_CHECK_TIMEOUT_IN_MS,
+    ):
+        """
+        a thread safe pool of sessions, a session is used by one thread at a time
+            sessions are opened lazily up to max_pool_size, get_session blocks until one is free,
+            put_back closes sessions that are no longer usable, get_session checks that a session idle
+            for a while is still alive before handing it out, and the pass-through methods
+            (insert_tablet, execute_non_query_statement, ...) borrow and put back a session themselves,
+            closing it if the call raised
+            the health check runs when a session is borrowed, not when it is put back: a session is put back
+            right after its last request, and checking on return would cost a round trip per borrow
+        :param pool_config: PoolConfig, settings of the sessions
+        :param max_pool_size: Integer, maximum number of open sessions
+        :param wait_timeout_in_ms: Integer, how long get_session waits for a free session
+        :param max_idle_time_in_ms: Integer, optional, idle sessions older than this are closed
+        :param health_check_idle_time_in_ms: Integer, optional, sessions idle longer than this are checked
+                                             with a request before they are borrowed, None to never check
+        :param health_check_timeout_in_ms: Integer, how long a health check waits for the answer, a session
+                                           whose connection does not answer in time is closed
+        """
+        if max_pool_size <= 0:
+            raise RuntimeError("max_pool_size of SessionPool must be positive")
+        self.__config = pool_config
+        self.__max_pool_size = max_pool_size
+        self.__wait_timeout_in_ms = wait_timeout_in_ms
+        self.__max_idle_time_in_ms = max_idle_time_in_ms
+        self.__health_check_idle_time_in_ms = health_check_idle_time_in_ms
+        self.__health_check_timeout_in_ms = health_check_timeout_in_ms
+        # idle sessions with the time they were put back, the most recent at the right
+        self.__idle_sessions = deque()
+        self.__session_number = 0
+        self.__condition = threading.Condition()
+        self.__is_close = False
+        # data sets of execute_query_statement, by id, with the session they hold
+        self.__data_sets = {}
+
+    def get_session(self):
+        """
+        borrow a session, it must be given back by put_back
+        :return: an opened Session
+        """
+        deadline = time.monotonic() + self.__wait_timeout_in_ms / 1000.0
+        while True:
+            session, idle_since = self.__take_session(deadline)
+            if session is None:
+                break
+            if (
+                self.__health_check_idle_time_in_ms is None
+                or time.monotonic() - idle_since
+                <= self.__health_check_idle_time_in_ms / 1000.0
+                or session.is_alive(self.__health_check_timeout_in_ms)
+            ):
+                return session
+            # the server closed the session or the connection broke while it was idle
+            self.put_back(session, True)
+
+        try:
+            return self.__create_session()
+        except Exception:
+            with self.__condition:
+                self.__session_number -= 1
+                self.__condition.notify()
+            raise
+
+    def put_back(self, session, broken=False):
+        """
+        give back a borrowed session, it is closed instead if it is not open or broken
+        :param broken: Boolean, the session failed and may be in an inconsistent state
+        """
+        with self.__condition:
+            if broken or self.__is_close or not session.is_open():
+                self.__session_number -= 1
+                session_to_close = session
+            else:
+                self.__idle_sessions.append((session, time.monotonic()))
+                session_to_close = None
+            self.__condition.notify()
+        if session_to_close is not None:
+            SessionPool.__close_sessions([session_to_close])
+
+    def close(self):
+        """
+        close the idle sessions, the borrowed ones are closed when they are put back
+        """
+        with self.__condition:
+            self.__is_close = True
+            sessions = [session for session, _ in self.__idle_sessions]
+            self.__session_number -= len(sessions)
+            self.__idle_sessions.clear()
+            self.__condition.notify_all()
+        SessionPool.__close_sessions(sessions)
+
+    def get_current_size(self):
+        return self.__session_number
+
+    def get_idle_size(self):
+        return len(self.__idle_sessions)
+
+    def execute_query_statement(self, sql, timeout=0):
+        """
+        execute a query on a borrowed session, the session is held by the returned data set until
+        close_result_set is called
+        :return: SessionDataSet
+        """
+        session = self.get_session()
+        try:
+            data_set = session.execute_query_statement(sql, timeout)
+        except Exception:
+            self.put_back(session, True)
+            raise
+        with self.__condition:
+            self.__data_sets[id(data_set)] = session
+        return data_set
+
+    def close_result_set(self, data_set):
+        """
+        close a data set of execute_query_statement and give back its session
+        """
+        with self.__condition:
+            session = self.__data_sets.pop(id(data_set), None)
+        if session is None:
+            raise RuntimeError("The data set does not belong to this SessionPool")
+        try:
+            data_set.close_operation_handle()
+        except Exception:
+            self.put_back(session, True)
+            raise
+        self.put_back(session)
+
+    def set_storage_group(self, group_name):
+        return self.__call("set_storage_group", group_name)
+
+    def delete_storage_groups(self, storage_group_lst):
+        return self.__call("delete_storage_groups", storage_group_lst)
+
+    def create_time_series(self, *args, **kwargs):
+        return self.__call("create_time_series", *args, **kwargs)
+
+    def create_aligned_time_series(self, *args, **kwargs):
+        return self.__call("create_aligned_time_series", *args, **kwargs)
+
+    def create_multi_time_series(self, *args, **kwargs):
+        return self.__call("create_multi_time_series", *args, **kwargs)
+
+    def delete_time_series(self, paths_list):
+        return self.__call("delete_time_series", paths_list)
+
+    def check_time_series_exists(self, path):
+        return self.__call("check_time_series_exists", path)
+
+    def delete_data(self, paths_list, timestamp):
+        return self.__call("delete_data", paths_list, timestamp)
+
+    def insert_str_record(self, device_id, timestamp, measurements, string_values):
+        return self.__call(
+            "insert_str_record", device_id, timestamp, measurements, string_values
+        )
+
+    def insert_record(self, device_id, timestamp, measurements, data_types, values):
+        return self.__call(
+            "insert_record", device_id, timestamp, measurements, data_types, values
+        )
+
+    def insert_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst
+    ):
+        return self.__call(
+            "insert_records", device_ids, times, measurements_lst, types_lst, values_lst
+        )
+
+    def insert_aligned_record(
+        self, device_id, timestamp, measurements, data_types, values
+    ):
+        return self.__call(
+            "insert_aligned_record",
+            device_id,
+            timestamp,
+            measurements,
+            data_types,
+            values,
+        )
+
+    def insert_aligned_records(
+        self, device_ids, times, measurements_lst, types_lst, values_lst
+    ):
+        return self.__call(
+            "insert_aligned_records",
+            device_ids,
+            times,
+            measurements_lst,
+            types_lst,
+            values_lst,
+        )
+
+    def insert_records_of_one_device(
+        self, device_id, times_list, measurements_list, types_list, values_list
+    ):
+        return self.__call(
+            "insert_records_of_one_device",
+            device_id,
+            times_list,
+            measurements_list,
+            types_list,
+            values_list,
+        )
+
+    def insert_aligned_records_of_one_device(
+        self, device_id, times_list, measurements_list, types_list, values_list
+    ):
+        return self.__call(
+            "insert_aligned_records_of_one_device",
+            device_id,
+            times_list,
+            measurements_list,
+            types_list,
+            values_list,
+        )
+
+    def insert_tablet(self, tablet):
+        return self.__call("insert_tablet", tablet)
+
+    def insert_tablets(self, tablet_lst):
+        return self.__call("insert_tablets", tablet_lst)
+
+    def insert_aligned_tablet(self, tablet):
+        return self.__call("insert_aligned_tablet", tablet)
+
+    def insert_aligned_tablets(self, tablet_lst):
+        return self.__call("insert_aligned_tablets", tablet_lst)
+
+    def insert_dataframe(self, df, *args, **kwargs):
+        return self.__call("insert_dataframe", df, *args, **kwargs)
+
+    def execute_non_query_statement(self, sql):
+        return self.__call("execute_non_query_statement", sql)
+
+    def __call(self, method_name, *args, **kwargs):
+        session = self.get_session()
+        try:
+            result = getattr(session, method_name)(*args, **kwargs)
+        except Exception:
+            # the transport may be left in the middle of a request, do not reuse the session
+            self.put_back(session, True)
+            raise
+        self.put_back(session)
+        return result
+
+    def __take_session(self, deadline):
+        """
+        wait for an idle session or a free slot to open a new one
+        :return: (idle session, time it was put back), or (None, None) for a free slot
+        """
+        expired = []
+        try:
+            with self.__condition:
+                while True:
+                    if self.__is_close:
+                        raise RuntimeError("SessionPool has been closed")
+                    expired.extend(self.__evict_idle_sessions())
+                    if self.__idle_sessions:
+                        return self.__idle_sessions.pop()
+                    if self.__session_number < self.__max_pool_size:
+                        self.__session_number += 1
+                        return None, None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(
+                            "Wait to get session timeout in SessionPool, current pool size: {}".format(
+                                self.__session_number
+                            )
+                        )
+                    self.__condition.wait(remaining)
+        finally:
+            SessionPool.__close_sessions(expired)
+
+    def __create_session(self):
+        config = self.__config
+        session = Session(
+            config.host,
+            config.port,
+            config.user_name,
+            config.password,
+            config.fetch_size,
+            config.time_zone,
+        )
+        session.open(config.enable_compression)
+        return session
+
+    def __evict_idle_sessions(self):
+        """
+        take the idle sessions older than max_idle_time_in_ms out of the pool, the caller closes them
+        """
+        expired = []
+        if self.__max_idle_time_in_ms is None:
+            return expired
+        oldest_allowed = time.monotonic() - self.__max_idle_time_in_ms / 1000.0
+        while self.__idle_sessions and self.__idle_sessions[0][1] < oldest_allowed:
+            expired.append(self.__idle_sessions.popleft()[0])
+            self.__session_number -= 1
+        return expired
+
+    @staticmethod
+    def __close_sessions(sessions):
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                logger.exception("failed to close a session of SessionPool")
@@ -0,0 +1,145 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import logging
+
+import pandas as pd
+
+from iotdb.thrift.rpc.TSIService import TSCloseOperationReq, TSFetchResultsReq
+from iotdb.utils.IoTDBRpcDataSet import IoTDBRpcDataSet
+
+logger = logging.getLogger("IoTDB")
+
+
+class AsyncSessionDataSet(object):
+    def __init__(
+        self,
+        call,
+        sql,
+        column_name_list,
+        column_type_list,
+        column_name_index,
+        query_id,
+        statement_id,
+        session_id,
+        query_data_set,
+        ignore_timestamp,
+        fetch_size=1024,
+    ):
+        """
+        result set of AsyncSession.execute_query_statement, iterated with "async for" as one Pandas data frame per
+        fetch from the server, the batches are decoded by IoTDBRpcDataSet like those of SessionDataSet
+        :param call: coroutine function(rpc_name, request) sending a request through the connection of the session
+        """
+        self.__call = call
+        self.__sql = sql
+        self.__query_id = query_id
+        self.__statement_id = statement_id
+        self.__session_id = session_id
+        self.__fetch_size = fetch_size
+        self.__is_closed = False
+        self.__is_exhausted = False
+        # without a client, the data set never issues requests itself
+        self.iotdb_rpc_data_set = IoTDBRpcDataSet(
+            sql,
+            column_name_list,
+            column_type_list,
+            column_name_index,
+            ignore_timestamp,
+            query_id,
+            None,
+            statement_id,
+            session_id,
+            query_data_set,
+            fetch_size,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close_operation_handle()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        batch = await self.next_batch()
+        if batch is None:
+            raise StopAsyncIteration
+        return batch
+
+    def get_column_names(self):
+        return self.iotdb_rpc_data_set.get_column_names()
+
+    def get_column_types(self):
+        return self.iotdb_rpc_data_set.get_column_types()
+
+    def get_fetch_size(self):
+        return self.__fetch_size
+
+    def set_fetch_size(self, fetch_size):
+        self.__fetch_size = fetch_size
+
+    async def next_batch(self):
+        """
+        :return: Pandas data frame of the rows of the next fetch, None when the result set is exhausted
+        """
+        rpc_data_set = self.iotdb_rpc_data_set
+        while not rpc_data_set.has_cached_result():
+            if self.__is_exhausted or self.__is_closed:
+                return None
+            resp = await self.__call(
+                "fetchResults",
+                TSFetchResultsReq(
+                    self.__session_id,
+                    self.__sql,
+                    self.__fetch_size,
+                    self.__query_id,
+                    True,
+                ),
+            )
+            if not rpc_data_set._receive_results(resp):
+                self.__is_exhausted = True
+        _, arrays = rpc_data_set._cached_result_to_arrays()
+        return pd.DataFrame(
+            {k: arrays[k] for k in rpc_data_set.get_column_names() if k in arrays},
+            copy=False,
+        )
+
+    async def todf(self):
+        """
+        read the rest of the result set into one Pandas data frame
+        """
+        batches = [batch async for batch in self]
+        if not batches:
+            return pd.DataFrame(columns=self.get_column_names())
+        return pd.concat(batches, ignore_index=True, copy=False)
+
+    async def close_operation_handle(self):
+        if self.__is_closed:
+            return
+        self.__is_closed = True
+        status = await self.__call(
+            "closeOperation",
+            TSCloseOperationReq(
+                self.__session_id, self.__query_id, self.__statement_id
+            ),
+        )
+        logger.debug(
+            "close query {}, message: {}".format(self.__query_id, status.message)
+        )
@@ -21,17 +21,26 @@ from .IoTDBConstants import TSDataType
 
 
 class Field(object):
-    def __init__(self, data_type):
+    # only the value of the field's own data type is stored,
+    # the getters of other data types return None
+    __slots__ = ("__data_type", "__value")
+    __NUMERIC_TYPES = frozenset(
+        [
+            TSDataType.BOOLEAN,
+            TSDataType.INT32,
+            TSDataType.INT64,
+            TSDataType.FLOAT,
+            TSDataType.DOUBLE,
+        ]
+    )
+
+    def __init__(self, data_type, value=None):
         """
         :param data_type: TSDataType
+        :param value: field value corresponding to the data type
         """
         self.__data_type = data_type
-        self.__bool_value = None
-        self.__int_value = None
-        self.__long_value = None
-        self.__float_value = None
-        self.__double_value = None
-        self.__binary_value = None
+        self.__value = value
 
     @staticmethod
     def copy(field):
@@ -62,68 +71,60 @@ class Field(object):
         return self.__data_type is None
 
     def set_bool_value(self, value):
-        self.__bool_value = value
+        self.__value = value
 
     def get_bool_value(self):
         if self.__data_type is None:
             raise Exception("Null Field Exception!")
-        return self.__bool_value
+        return self.__value if self.__data_type == TSDataType.BOOLEAN else None
 
     def set_int_value(self, value):
-        self.__int_value = value
+        self.__value = value
 
     def get_int_value(self):
         if self.__data_type is None:
             raise Exception("Null Field Exception!")
-        return self.__int_value
+        return self.__value if self.__data_type == TSDataType.INT32 else None
 
     def set_long_value(self, value):
-        self.__long_value = value
+        self.__value = value
 
     def get_long_value(self):
         if self.__data_type is None:
             raise Exception("Null Field Exception!")
-        return self.__long_value
+        return self.__value if self.__data_type == TSDataType.INT64 else None
 
     def set_float_value(self, value):
-        self.__float_value = value
+        self.__value = value
 
     def get_float_value(self):
         if self.__data_type is None:
             raise Exception("Null Field Exception!")
-        return self.__float_value
+        return self.__value if self.__data_type == TSDataType.FLOAT else None
 
     def set_double_value(self, value):
-        self.__double_value = value
+        self.__value = value
 
     def get_double_value(self):
         if self.__data_type is None:
             raise Exception("Null Field Exception!")
-        return self.__double_value
+        return self.__value if self.__data_type == TSDataType.DOUBLE else None
 
     def set_binary_value(self, value):
-        self.__binary_value = value
+        self.__value = value
 
     def get_binary_value(self):
         if self.__data_type is None:
             raise Exception("Null Field Exception!")
-        return self.__binary_value
+        return self.__value if self.__data_type == TSDataType.TEXT else None
 
     def get_string_value(self):
         if self.__data_type is None:
             return "None"
-        elif self.__data_type == TSDataType.BOOLEAN:
-            return str(self.__bool_value)
-        elif self.__data_type == TSDataType.INT64:
-            return str(self.__long_value)
-        elif self.__data_type == TSDataType.INT32:
-            return str(self.__int_value)
-        elif self.__data_type == TSDataType.FLOAT:
-            return str(self.__float_value)
-        elif self.__data_type == TSDataType.DOUBLE:
-            return str(self.__double_value)
         elif self.__data_type == TSDataType.TEXT:
-            return self.__binary_value.decode("utf-8")
+            return self.__value.decode("utf-8")
+        elif self.__data_type in Field.__NUMERIC_TYPES:
+            return str(self.__value)
         else:
             raise Exception("unsupported data type {}".format(self.__data_type))
 
@@ -136,18 +137,8 @@ class Field(object):
         """
         if self.__data_type is None:
             return None
-        elif data_type == TSDataType.BOOLEAN:
-            return self.get_bool_value()
-        elif data_type == TSDataType.INT32:
-            return self.get_int_value()
-        elif data_type == TSDataType.INT64:
-            return self.get_long_value()
-        elif data_type == TSDataType.FLOAT:
-            return self.get_float_value()
-        elif data_type == TSDataType.DOUBLE:
-            return self.get_double_value()
-        elif data_type == TSDataType.TEXT:
-            return self.get_binary_value()
+        elif data_type == TSDataType.TEXT or data_type in Field.__NUMERIC_TYPES:
+            return self.__value if data_type == self.__data_type else None
         else:
             raise Exception("unsupported data type {}".format(data_type))
 
@@ -159,19 +150,6 @@ class Field(object):
         """
         if value is None:
             return None
-        field = Field(data_type)
-        if data_type == TSDataType.BOOLEAN:
-            field.set_bool_value(value)
-        elif data_type == TSDataType.INT32:
-            field.set_int_value(value)
-        elif data_type == TSDataType.INT64:
-            field.set_long_value(value)
-        elif data_type == TSDataType.FLOAT:
-            field.set_float_value(value)
-        elif data_type == TSDataType.DOUBLE:
-            field.set_double_value(value)
-        elif data_type == TSDataType.TEXT:
-            field.set_binary_value(value)
-        else:
+        if data_type != TSDataType.TEXT and data_type not in Field.__NUMERIC_TYPES:
             raise Exception("unsupported data type {}".format(data_type))
-        return field
+        return Field(data_type, value)
@@ -17,8 +17,13 @@
 #
 
 # for package
-import binascii
 import logging
+import queue
+import struct
+import threading
+import time
+import weakref
+from collections import deque
 
 import numpy as np
 import pandas as pd
@@ -28,12 +33,28 @@ from iotdb.utils.IoTDBConstants import TSDataType
 
 logger = logging.getLogger("IoTDB")
 
+# maps every byte to the byte with the reversed bit order
+_REVERSED_BITS = np.packbits(
+    np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder="little"),
+    axis=1,
+).ravel()
+
 
 class IoTDBRpcDataSet(object):
     TIMESTAMP_STR = "Time"
     # VALUE_IS_NULL = "The value got by %s (column name) is NULL."
     START_INDEX = 2
+    __TEXT_LENGTH_STRUCT = struct.Struct(">i")
+    # a prefetch thread whose responses are not taken for this long stops, the next fetch starts a new one
+    PREFETCH_PUT_TIMEOUT_IN_SECONDS = 60
     FLAG = 0x80
+    TYPE_SIZE = {
+        TSDataType.BOOLEAN: 1,
+        TSDataType.INT32: 4,
+        TSDataType.INT64: 8,
+        TSDataType.FLOAT: 4,
+        TSDataType.DOUBLE: 8,
+    }
 
     def __init__(
         self,
@@ -56,8 +77,22 @@ class IoTDBRpcDataSet(object):
         self.__query_id = query_id
         self.__client = client
         self.__fetch_size = fetch_size
+        # the prefetch thread adapts the fetch size while the consumer may read or set it
+        self.__fetch_size_lock = threading.Lock()
         self.__column_size = len(column_name_list)
         self.__default_time_out = 1000
+        self.__prefetch_depth = 0
+        self.__prefetch_queue = None
+        self.__prefetch_thread = None
+        self.__prefetch_stopped = threading.Event()
+        # responses the prefetch thread could not queue before it stopped
+        self.__prefetch_leftover = []
+        self.__prefetched = deque()
+        self.__target_fetch_bytes = None
+        self.__max_fetch_latency = None
+        self.__min_fetch_size = 1
+        self.__max_fetch_size = float("inf")
+        self.__bytes_per_row = None
 
         self.__column_name_list = []
         self.__column_type_list = []
@@ -107,10 +142,15 @@ class IoTDBRpcDataSet(object):
         self.__empty_resultSet = False
         self.__has_cached_record = False
         self.__rows_index = 0
+        self.__time_offset = 0
+        self.__value_offsets = [
+            0 for _ in range(len(self.__column_type_deduplicated_list))
+        ]
 
     def close(self):
         if self.__is_closed:
             return
+        self.__stop_prefetch()
         if self.__client is not None:
             try:
                 status = self.__client.closeOperation(
@@ -144,11 +184,11 @@ class IoTDBRpcDataSet(object):
 
     def has_cached_result(self):
         return (self.__query_data_set is not None) and (
-            len(self.__query_data_set.time) != 0
+            len(self.__query_data_set.time) > self.__time_offset
         )
 
     def _has_next_result_set(self):
-        if self.has_cached_result():
+        if self.has_cached_result() or self.__has_cached_record:
             return True
         if self.__empty_resultSet:
             return False
@@ -156,191 +196,635 @@ class IoTDBRpcDataSet(object):
             return True
         return False
 
-    def _to_bitstring(self, b):
-        return "{:0{}b}".format(int(binascii.hexlify(b), 16), 8 * len(b))
-
     def resultset_to_pandas(self):
+        # chunks of every column are collected per fetch and concatenated only once
         result = {}
         for column_name in self.__column_name_list:
-            result[column_name] = None
+            result[column_name] = []
         while self._has_next_result_set():
-            time_array = np.frombuffer(
-                self.__query_data_set.time, np.dtype(np.longlong).newbyteorder(">")
+            _, arrays = self._cached_result_to_arrays()
+            for column_name, data_array in arrays.items():
+                result[column_name].append(data_array)
+        for k in result:
+            # release the chunks of a column as soon as it is concatenated, so that
+            # the peak memory stays close to the size of the final data frame
+            result[k] = IoTDBRpcDataSet._concat_chunks(result[k])
+
+        df = pd.DataFrame(result, copy=False)
+        return df
+
+    def resultset_to_pandas_batches(self, batch_rows=None):
+        """
+        iterate over the result set as a sequence of Pandas data frames
+        :param batch_rows: Integer, number of rows of each data frame (the last one may be smaller),
+                           one data frame is generated per fetch of the result set by default
+        """
+        if batch_rows is not None and batch_rows <= 0:
+            raise RuntimeError(
+                "batch_rows should be positive, got {}".format(batch_rows)
+            )
+        buffered = {}
+        for column_name in self.__column_name_list:
+            buffered[column_name] = []
+        buffered_rows = 0
+        while self._has_next_result_set():
+            total_length, arrays = self._cached_result_to_arrays()
+            if batch_rows is None:
+                yield pd.DataFrame(
+                    {k: arrays[k] for k in buffered if k in arrays}, copy=False
+                )
+                continue
+            for column_name, data_array in arrays.items():
+                buffered[column_name].append(data_array)
+            buffered_rows += total_length
+            if buffered_rows < batch_rows:
+                continue
+            for k in buffered:
+                buffered[k] = IoTDBRpcDataSet._concat_chunks(buffered[k])
+            start = 0
+            while buffered_rows - start >= batch_rows:
+                yield pd.DataFrame(
+                    {k: v[start : start + batch_rows] for k, v in buffered.items()},
+                    copy=False,
+                )
+                start += batch_rows
+            for k in buffered:
+                buffered[k] = [buffered[k][start:]]
+            buffered_rows -= start
+        if buffered_rows > 0:
+            yield pd.DataFrame(
+                {k: IoTDBRpcDataSet._concat_chunks(v) for k, v in buffered.items()},
+                copy=False,
             )
-            if time_array.dtype.byteorder == ">":
-                time_array = time_array.byteswap().newbyteorder("<")
-            if (
-                self.get_ignore_timestamp() is None
-                or self.get_ignore_timestamp() is False
-            ):
-                if result[IoTDBRpcDataSet.TIMESTAMP_STR] is None:
-                    result[IoTDBRpcDataSet.TIMESTAMP_STR] = time_array
-                else:
-                    result[IoTDBRpcDataSet.TIMESTAMP_STR] = np.concatenate(
-                        (result[IoTDBRpcDataSet.TIMESTAMP_STR], time_array), axis=0
-                    )
-            self.__query_data_set.time = []
-            total_length = len(time_array)
 
-            for i in range(len(self.__query_data_set.bitmapList)):
-                if self.get_ignore_timestamp() is True:
-                    column_name = self.get_column_names()[i]
-                else:
-                    column_name = self.get_column_names()[i + 1]
+    def _cached_result_to_arrays(self):
+        """
+        decode the cached fetch into one array per column, and release the buffers of the fetch
+        :return: number of rows of the fetch, dict of column name to decoded array
+        """
+        self._skip_consumed_rows()
+        result = {}
+        time_array = np.frombuffer(
+            self.__query_data_set.time, np.dtype(np.longlong).newbyteorder(">")
+        )
+        if time_array.dtype.byteorder == ">":
+            time_array = time_array.byteswap().newbyteorder("<")
+        if self.get_ignore_timestamp() is None or self.get_ignore_timestamp() is False:
+            result[IoTDBRpcDataSet.TIMESTAMP_STR] = time_array
+        self.__query_data_set.time = []
+        total_length = len(time_array)
+
+        for i in range(len(self.__query_data_set.bitmapList)):
+            if self.get_ignore_timestamp() is True:
+                column_name = self.get_column_names()[i]
+            else:
+                column_name = self.get_column_names()[i + 1]
 
-                location = (
-                    self.__column_ordinal_dict[column_name]
-                    - IoTDBRpcDataSet.START_INDEX
+            location = (
+                self.__column_ordinal_dict[column_name] - IoTDBRpcDataSet.START_INDEX
+            )
+            if location < 0:
+                continue
+            data_type = self.__column_type_deduplicated_list[location]
+            value_buffer = self.__query_data_set.valueList[location]
+            value_buffer_len = len(value_buffer)
+
+            data_array = None
+            if data_type == TSDataType.DOUBLE:
+                data_array = np.frombuffer(
+                    value_buffer, np.dtype(np.double).newbyteorder(">")
                 )
-                if location < 0:
-                    continue
-                data_type = self.__column_type_deduplicated_list[location]
-                value_buffer = self.__query_data_set.valueList[location]
-                value_buffer_len = len(value_buffer)
-
-                data_array = None
-                if data_type == TSDataType.DOUBLE:
-                    data_array = np.frombuffer(
-                        value_buffer, np.dtype(np.double).newbyteorder(">")
-                    )
-                elif data_type == TSDataType.FLOAT:
-                    data_array = np.frombuffer(
-                        value_buffer, np.dtype(np.float32).newbyteorder(">")
+            elif data_type == TSDataType.FLOAT:
+                data_array = np.frombuffer(
+                    value_buffer, np.dtype(np.float32).newbyteorder(">")
+                )
+            elif data_type == TSDataType.BOOLEAN:
+                data_array = np.frombuffer(value_buffer, np.dtype("?"))
+            elif data_type == TSDataType.INT32:
+                data_array = np.frombuffer(
+                    value_buffer, np.dtype(np.int32).newbyteorder(">")
+                )
+            elif data_type == TSDataType.INT64:
+                data_array = np.frombuffer(
+                    value_buffer, np.dtype(np.int64).newbyteorder(">")
+                )
+            elif data_type == TSDataType.TEXT:
+                j = 0
+                offset = 0
+                data_array = []
+                while offset < value_buffer_len:
+                    length = int.from_bytes(
+                        value_buffer[offset : offset + 4],
+                        byteorder="big",
+                        signed=False,
                     )
+                    offset += 4
+                    value_bytes = value_buffer[offset : offset + length]
+                    value = value_bytes.decode("utf-8")
+                    data_array.append(value)
+                    j += 1
+                    offset += length
+                data_array = np.array(data_array, dtype=object)
+            else:
+                raise RuntimeError("unsupported data type {}.".format(data_type))
+            if data_array.dtype.byteorder == ">":
+                data_array = data_array.byteswap().newbyteorder("<")
+            self.__query_data_set.valueList[location] = None
+
+            if len(data_array) < total_length:
+                # expand the dense values to one slot per row, the bitmap marks
+                # the non-null rows from the most significant bit of each byte
+                bitmap_buffer = self.__query_data_set.bitmapList[location]
+                not_null = np.unpackbits(
+                    np.frombuffer(bitmap_buffer, np.uint8), count=total_length
+                ).astype(bool)
+                if data_type == TSDataType.INT32 or data_type == TSDataType.INT64:
+                    tmp_array = np.zeros(total_length, data_array.dtype)
+                    tmp_array[not_null] = data_array
+                    tmp_array = pd.arrays.IntegerArray(tmp_array, ~not_null)
+                elif data_type == TSDataType.FLOAT or data_type == TSDataType.DOUBLE:
+                    tmp_array = np.full(total_length, np.nan, data_array.dtype)
+                    tmp_array[not_null] = data_array
                 elif data_type == TSDataType.BOOLEAN:
-                    data_array = np.frombuffer(value_buffer, np.dtype("?"))
-                elif data_type == TSDataType.INT32:
-                    data_array = np.frombuffer(
-                        value_buffer, np.dtype(np.int32).newbyteorder(">")
-                    )
-                elif data_type == TSDataType.INT64:
-                    data_array = np.frombuffer(
-                        value_buffer, np.dtype(np.int64).newbyteorder(">")
-                    )
+                    tmp_array = np.zeros(total_length, bool)
+                    tmp_array[not_null] = data_array
+                    tmp_array = pd.arrays.BooleanArray(tmp_array, ~not_null)
                 elif data_type == TSDataType.TEXT:
-                    j = 0
-                    offset = 0
-                    data_array = []
-                    while offset < value_buffer_len:
-                        length = int.from_bytes(
-                            value_buffer[offset : offset + 4],
-                            byteorder="big",
-                            signed=False,
-                        )
-                        offset += 4
-                        value_bytes = value_buffer[offset : offset + length]
-                        value = value_bytes.decode("utf-8")
-                        data_array.append(value)
-                        j += 1
-                        offset += length
-                    data_array = np.array(data_array, dtype=object)
-                else:
-                    raise RuntimeError("unsupported data type {}.".format(data_type))
-                if data_array.dtype.byteorder == ">":
-                    data_array = data_array.byteswap().newbyteorder("<")
-                self.__query_data_set.valueList[location] = None
-
-                if len(data_array) < total_length:
-                    if data_type == TSDataType.INT32 or data_type == TSDataType.INT64:
-                        tmp_array = np.full(total_length, np.nan, np.float32)
-                        if data_array.dtype == np.int32:
-                            tmp_array = pd.Series(tmp_array).astype("Int32")
-                        else:
-                            tmp_array = pd.Series(tmp_array).astype("Int64")
-                    elif (
-                        data_type == TSDataType.FLOAT or data_type == TSDataType.DOUBLE
-                    ):
-                        tmp_array = np.full(total_length, np.nan, data_array.dtype)
-                    elif data_type == TSDataType.BOOLEAN:
-                        tmp_array = np.full(total_length, np.nan, np.float32)
-                        tmp_array = pd.Series(tmp_array).astype("boolean")
-                    elif data_type == TSDataType.TEXT:
-                        tmp_array = np.full(total_length, None, dtype=data_array.dtype)
-                    bitmap_buffer = self.__query_data_set.bitmapList[location]
-                    bitmap_str = self._to_bitstring(bitmap_buffer)
-                    j = 0
-                    for index in range(total_length):
-                        if bitmap_str[index] == "1":
-                            tmp_array[index] = data_array[j]
-                            j += 1
-                    data_array = tmp_array
-
-                if result[column_name] is None:
-                    result[column_name] = data_array
-                else:
-                    result[column_name] = np.concatenate(
-                        (result[column_name], data_array), axis=0
-                    )
-        for k, v in result.items():
-            if v is None:
-                result[k] = []
+                    tmp_array = np.full(total_length, None, dtype=data_array.dtype)
+                    tmp_array[not_null] = data_array
+                data_array = tmp_array
+
+            result[column_name] = data_array
+        return total_length, result
+
+    def resultset_to_arrow_batches(self):
+        """
+        iterate over the result set as Apache Arrow record batches, one record batch per fetch
+        :return: pyarrow.Schema of the result set, generator of pyarrow.RecordBatch
+        """
+        import pyarrow as pa
+
+        names = []
+        fields = []
+        for column_name, data_type in zip(
+            self.__column_name_list, self.__column_type_list
+        ):
+            names.append(column_name)
+            fields.append(pa.field(column_name, IoTDBRpcDataSet._arrow_type(data_type)))
+        schema = pa.schema(fields)
+
+        def batches():
+            while self._has_next_result_set():
+                yield pa.RecordBatch.from_arrays(
+                    self._cached_result_to_arrow_arrays(), schema=schema
+                )
 
-        df = pd.DataFrame(result)
-        return df
+        return schema, batches()
+
+    def _cached_result_to_arrow_arrays(self):
+        """
+        build Arrow arrays straight from the buffers of the cached fetch, and release the buffers of the fetch
+        """
+        import pyarrow as pa
+
+        self._skip_consumed_rows()
+        time_array = np.frombuffer(self.__query_data_set.time, np.dtype(">i8"))
+        total_length = len(time_array)
+        self.__query_data_set.time = []
+        decoded = {}
+        arrays = []
+        for column_name in self.__column_name_list:
+            location = (
+                self.__column_ordinal_dict[column_name] - IoTDBRpcDataSet.START_INDEX
+            )
+            if location < 0:
+                arrays.append(pa.array(time_array.astype(np.int64)))
+                continue
+            if location not in decoded:
+                decoded[location] = self._value_buffer_to_arrow_array(
+                    self.__column_type_deduplicated_list[location],
+                    self.__query_data_set.valueList[location],
+                    self.__query_data_set.bitmapList[location],
+                    total_length,
+                )
+            arrays.append(decoded[location])
+        for location in decoded:
+            self.__query_data_set.valueList[location] = None
+        return arrays
+
+    @staticmethod
+    def _value_buffer_to_arrow_array(data_type, value_buffer, bitmap_buffer, length):
+        import pyarrow as pa
+
+        arrow_type = IoTDBRpcDataSet._arrow_type(data_type)
+        if data_type == TSDataType.TEXT:
+            header_offsets = []
+            value_lengths = []
+            offset = 0
+            while offset < len(value_buffer):
+                value_length = int.from_bytes(
+                    value_buffer[offset : offset + 4], byteorder="big", signed=False
+                )
+                header_offsets.append(offset)
+                value_lengths.append(value_length)
+                offset += 4 + value_length
+            # drop the length headers, what is left are the utf-8 values back to back
+            payload = np.ones(len(value_buffer), dtype=bool)
+            payload[
+                (np.array(header_offsets, np.int64)[:, None] + np.arange(4)).ravel()
+            ] = False
+            dense = np.array(value_lengths, np.int32)
+            data = np.frombuffer(value_buffer, np.uint8)[payload]
+        else:
+            dense = np.frombuffer(value_buffer, data_type.np_dtype())
+            data = None
+        value_count = len(dense)
+        validity = None
+        if value_count < length:
+            # IoTDB marks the rows from the most significant bit of each byte, Arrow from the least
+            validity = _REVERSED_BITS[np.frombuffer(bitmap_buffer, np.uint8)]
+            not_null = np.unpackbits(validity, count=length, bitorder="little")
+            full = np.zeros(length, dense.dtype.newbyteorder("="))
+            full[not_null.astype(bool)] = dense
+            dense = full
+        else:
+            dense = dense.astype(dense.dtype.newbyteorder("="), copy=False)
+        if data_type == TSDataType.BOOLEAN:
+            buffers = [np.packbits(dense, bitorder="little")]
+        elif data_type == TSDataType.TEXT:
+            offsets = np.zeros(length + 1, np.int32)
+            np.cumsum(dense, out=offsets[1:])
+            buffers = [offsets, data]
+        else:
+            buffers = [dense]
+        return pa.Array.from_buffers(
+            arrow_type,
+            length,
+            [None if validity is None else pa.py_buffer(validity)]
+            + [pa.py_buffer(buffer) for buffer in buffers],
+            null_count=length - value_count,
+        )
+
+    @staticmethod
+    def _arrow_type(data_type):
+        import pyarrow as pa
+
+        return {
+            TSDataType.BOOLEAN: pa.bool_(),
+            TSDataType.INT32: pa.int32(),
+            TSDataType.INT64: pa.int64(),
+            TSDataType.FLOAT: pa.float32(),
+            TSDataType.DOUBLE: pa.float64(),
+            TSDataType.TEXT: pa.string(),
+        }[data_type]
+
+    @staticmethod
+    def _concat_chunks(chunks):
+        if len(chunks) == 0:
+            return []
+        if len(chunks) == 1:
+            return chunks[0]
+        if all(isinstance(chunk, np.ndarray) for chunk in chunks):
+            return np.concatenate(chunks, axis=0)
+        # some fetches contain nulls and others do not, let pandas find the
+        # common nullable dtype instead of falling back to an object array
+        return pd.concat(
+            [pd.Series(chunk, copy=False) for chunk in chunks], ignore_index=True
+        ).array
 
     def construct_one_row(self):
-        # simulating buffer, read 8 bytes from data set and discard first 8 bytes which have been read.
-        self.__time_bytes = self.__query_data_set.time[:8]
-        self.__query_data_set.time = self.__query_data_set.time[8:]
+        # read the next row at the offsets of each buffer, the buffers themselves are never copied
+        time_buffer = self.__query_data_set.time
+        self.__time_bytes = time_buffer[self.__time_offset : self.__time_offset + 8]
+        self.__time_offset += 8
+        bitmap_index = self.__rows_index // 8
         for i in range(len(self.__query_data_set.bitmapList)):
-            bitmap_buffer = self.__query_data_set.bitmapList[i]
-
             # another 8 new rows, should move the bitmap buffer position to next byte
             if self.__rows_index % 8 == 0:
-                self.__current_bitmap[i] = bitmap_buffer[0]
-                self.__query_data_set.bitmapList[i] = bitmap_buffer[1:]
+                self.__current_bitmap[i] = self.__query_data_set.bitmapList[i][
+                    bitmap_index
+                ]
             if not self.is_null(i, self.__rows_index):
                 value_buffer = self.__query_data_set.valueList[i]
                 data_type = self.__column_type_deduplicated_list[i]
+                offset = self.__value_offsets[i]
 
-                # simulating buffer
-                if data_type == TSDataType.BOOLEAN:
-                    self.__value[i] = value_buffer[:1]
-                    self.__query_data_set.valueList[i] = value_buffer[1:]
-                elif data_type == TSDataType.INT32:
-                    self.__value[i] = value_buffer[:4]
-                    self.__query_data_set.valueList[i] = value_buffer[4:]
-                elif data_type == TSDataType.INT64:
-                    self.__value[i] = value_buffer[:8]
-                    self.__query_data_set.valueList[i] = value_buffer[8:]
-                elif data_type == TSDataType.FLOAT:
-                    self.__value[i] = value_buffer[:4]
-                    self.__query_data_set.valueList[i] = value_buffer[4:]
-                elif data_type == TSDataType.DOUBLE:
-                    self.__value[i] = value_buffer[:8]
-                    self.__query_data_set.valueList[i] = value_buffer[8:]
-                elif data_type == TSDataType.TEXT:
+                if data_type == TSDataType.TEXT:
                     length = int.from_bytes(
-                        value_buffer[:4], byteorder="big", signed=False
+                        value_buffer[offset : offset + 4], byteorder="big", signed=False
                     )
-                    self.__value[i] = value_buffer[4 : 4 + length]
-                    self.__query_data_set.valueList[i] = value_buffer[4 + length :]
+                    offset += 4
+                elif data_type in IoTDBRpcDataSet.TYPE_SIZE:
+                    length = IoTDBRpcDataSet.TYPE_SIZE[data_type]
                 else:
                     raise RuntimeError("unsupported data type {}.".format(data_type))
+                self.__value[i] = value_buffer[offset : offset + length]
+                self.__value_offsets[i] = offset + length
         self.__rows_index += 1
         self.__has_cached_record = True
 
-    def fetch_results(self):
+    def next_rows(self, max_rows):
+        """
+        decode up to max_rows rows column by column, fetching from the server when the cached rows run out
+        :return: List of tuples, one value per column (see get_column_names), None for null values
+        """
+        rows = []
+        while len(rows) < max_rows and self._has_next_result_set():
+            rows.extend(self._cached_result_to_rows(max_rows - len(rows)))
+        return rows
+
+    def _cached_result_to_rows(self, max_rows):
+        self._unread_cached_record()
+        query_data_set = self.__query_data_set
+        start = self.__rows_index
+        total_length = len(query_data_set.time) // 8
+        row_count = min(max_rows, total_length - start)
+        end = start + row_count
+
+        columns = {}
+        for location, data_type in enumerate(self.__column_type_deduplicated_list):
+            value_buffer = query_data_set.valueList[location]
+            offset = self.__value_offsets[location]
+            not_null = np.unpackbits(
+                np.frombuffer(query_data_set.bitmapList[location], np.uint8),
+                count=end,
+            )[start:]
+            value_count = int(np.count_nonzero(not_null))
+            if data_type == TSDataType.TEXT:
+                values, offset = IoTDBRpcDataSet.__decode_text_values(
+                    value_buffer, offset, value_count
+                )
+            elif data_type in IoTDBRpcDataSet.TYPE_SIZE:
+                values = np.frombuffer(
+                    value_buffer, data_type.np_dtype(), value_count, offset
+                )
+                offset += value_count * IoTDBRpcDataSet.TYPE_SIZE[data_type]
+            else:
+                raise RuntimeError("unsupported data type {}.".format(data_type))
+            self.__value_offsets[location] = offset
+            if value_count < row_count:
+                # scatter the dense values to the non-null rows in one assignment
+                expanded = np.full(row_count, None, object)
+                expanded[not_null.view(bool)] = values
+                values = expanded
+            columns[location] = (
+                values.tolist() if isinstance(values, np.ndarray) else values
+            )
+
+        time_list = np.frombuffer(
+            query_data_set.time, np.dtype(">i8"), row_count, self.__time_offset
+        ).tolist()
+        self.__time_offset += row_count * 8
+        self.__rows_index = end
+        if end % 8 != 0:
+            # keep the bitmap byte of the next row for construct_one_row
+            for i in range(len(query_data_set.bitmapList)):
+                self.__current_bitmap[i] = query_data_set.bitmapList[i][end // 8]
+
+        row_columns = []
+        for column_name in self.__column_name_list:
+            location = (
+                self.__column_ordinal_dict[column_name] - IoTDBRpcDataSet.START_INDEX
+            )
+            row_columns.append(time_list if location < 0 else columns[location])
+        return list(zip(*row_columns))
+
+    @staticmethod
+    def __decode_text_values(value_buffer, offset, count):
+        """
+        decode count consecutive (big-endian int32 length, utf-8 bytes) values
+        :return: List of str, and the offset after the last value
+        """
+        unpack_length = IoTDBRpcDataSet.__TEXT_LENGTH_STRUCT.unpack_from
+        buffer = memoryview(value_buffer)
+        values = []
+        for _ in range(count):
+            (length,) = unpack_length(buffer, offset)
+            offset += 4
+            values.append(str(buffer[offset : offset + length], "utf-8"))
+            offset += length
+        return values, offset
+
+    def _unread_cached_record(self):
+        """
+        move the offsets back before the record which has been read by next() but not returned yet
+        """
+        if not self.__has_cached_record:
+            return
+        self.__has_cached_record = False
+        self.__rows_index -= 1
+        self.__time_offset -= 8
+        for i, data_type in enumerate(self.__column_type_deduplicated_list):
+            if not self.is_null(i, self.__rows_index):
+                self.__value_offsets[i] -= len(self.__value[i])
+                if data_type == TSDataType.TEXT:
+                    self.__value_offsets[i] -= 4
+
+    def _skip_consumed_rows(self):
+        """
+        drop the rows of the cached fetch which have been read by next(), so that the
+        columnar decoders only see the remaining rows
+        """
+        self._unread_cached_record()
+        if self.__rows_index == 0:
+            return
+        rows_index = self.__rows_index
+        query_data_set = self.__query_data_set
+        total_length = len(query_data_set.time) // 8
+        query_data_set.time = query_data_set.time[self.__time_offset :]
+        for i in range(len(query_data_set.bitmapList)):
+            query_data_set.valueList[i] = query_data_set.valueList[i][
+                self.__value_offsets[i] :
+            ]
+            not_null = np.unpackbits(
+                np.frombuffer(query_data_set.bitmapList[i], np.uint8),
+                count=total_length,
+            )
+            query_data_set.bitmapList[i] = np.packbits(not_null[rows_index:]).tobytes()
+        self.__reset_offsets()
+
+    def __reset_offsets(self):
+        self.__has_cached_record = False
         self.__rows_index = 0
-        request = TSFetchResultsReq(
+        self.__time_offset = 0
+        self.__value_offsets = [0 for _ in range(len(self.__value_offsets))]
+
+    def fetch_results(self):
+        if self.__prefetched or self.__prefetch_depth > 0:
+            resp = self.__next_prefetched_response()
+        else:
+            try:
+                resp = self.__fetch_results_resp()
+            except TTransport.TException as e:
+                raise RuntimeError(
+                    "Cannot fetch result from server, because of network connection: ",
+                    e,
+                )
+        return self._receive_results(resp)
+
+    def _receive_results(self, resp):
+        """
+        cache the rows of a fetch response, for callers that issue the fetch themselves (see AsyncSessionDataSet)
+        :param resp: TSFetchResultsResp
+        :return: False if the result set is exhausted
+        """
+        if not resp.hasResultSet:
+            self.__empty_resultSet = True
+        else:
+            self.__query_data_set = resp.queryDataSet
+            self.__reset_offsets()
+        return resp.hasResultSet
+
+    def __fetch_results_resp(self):
+        start = time.perf_counter()
+        resp = self.__client.fetchResults(self.__gen_fetch_results_req())
+        if resp.hasResultSet:
+            with self.__fetch_size_lock:
+                if self.__target_fetch_bytes is not None:
+                    self.__adapt_fetch_size(
+                        resp.queryDataSet, time.perf_counter() - start
+                    )
+        return resp
+
+    def __adapt_fetch_size(self, query_data_set, latency):
+        """
+        choose the fetch size of the next request from the bytes per row measured so far, so that a fetch
+        carries about target_fetch_bytes, and no more rows than can be fetched within max_fetch_latency,
+        the caller holds the fetch size lock
+        """
+        rows = len(query_data_set.time) // 8
+        if rows == 0:
+            return
+        fetch_bytes = len(query_data_set.time)
+        for value_buffer in query_data_set.valueList:
+            fetch_bytes += len(value_buffer)
+        for bitmap_buffer in query_data_set.bitmapList:
+            fetch_bytes += len(bitmap_buffer)
+        if self.__bytes_per_row is None:
+            self.__bytes_per_row = fetch_bytes / rows
+        else:
+            # smooth out single fetches of unusually wide or narrow rows
+            self.__bytes_per_row = (self.__bytes_per_row + fetch_bytes / rows) / 2
+        fetch_size = self.__target_fetch_bytes / self.__bytes_per_row
+        if self.__max_fetch_latency is not None and latency > 0:
+            fetch_size = min(fetch_size, rows * self.__max_fetch_latency / latency)
+        # change by at most a factor of 4 at a time
+        fetch_size = min(max(fetch_size, self.__fetch_size / 4), self.__fetch_size * 4)
+        self.__fetch_size = int(
+            min(max(fetch_size, self.__min_fetch_size), self.__max_fetch_size)
+        )
+
+    def __gen_fetch_results_req(self):
+        with self.__fetch_size_lock:
+            fetch_size = self.__fetch_size
+        return TSFetchResultsReq(
             self.__session_id,
             self.__sql,
-            self.__fetch_size,
+            fetch_size,
             self.__query_id,
             True,
             self.__default_time_out,
         )
-        try:
-            resp = self.__client.fetchResults(request)
-            if not resp.hasResultSet:
-                self.__empty_resultSet = True
-            else:
-                self.__query_data_set = resp.queryDataSet
-            return resp.hasResultSet
-        except TTransport.TException as e:
+
+    def __next_prefetched_response(self):
+        if self.__prefetched:
+            resp = self.__prefetched.popleft()
+        else:
+            resp = self.__take_prefetched_response()
+        if isinstance(resp, Exception):
+            # the prefetch thread ends on errors, the next fetch starts a new one
+            self.__stop_prefetch()
+        if isinstance(resp, TTransport.TException):
             raise RuntimeError(
-                "Cannot fetch result from server, because of network connection: ", e
+                "Cannot fetch result from server, because of network connection: ",
+                resp,
+            )
+        if isinstance(resp, Exception):
+            raise resp
+        return resp
+
+    def __take_prefetched_response(self):
+        if self.__prefetch_thread is None:
+            self.__prefetch_queue = queue.Queue(self.__prefetch_depth)
+            self.__prefetch_stopped.clear()
+            self.__prefetch_leftover = []
+            # the thread only holds a weak reference, so that a data set dropped without close() is collected
+            # and its thread stops
+            self.__prefetch_thread = threading.Thread(
+                target=IoTDBRpcDataSet.__prefetch,
+                args=(
+                    weakref.ref(self),
+                    self.__prefetch_queue,
+                    self.__prefetch_stopped,
+                    self.__prefetch_leftover,
+                ),
+                name="IoTDBRpcDataSet-prefetch-{}".format(self.__query_id),
+                daemon=True,
+            )
+            self.__prefetch_thread.start()
+        while True:
+            try:
+                return self.__prefetch_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.__prefetch_thread.is_alive():
+                    continue
+            # the thread gave up waiting for the consumer, take its leftover and fetch on
+            self.__stop_prefetch()
+            if self.__prefetched:
+                return self.__prefetched.popleft()
+            return self.__take_prefetched_response()
+
+    @staticmethod
+    def __prefetch(data_set_ref, responses, stopped, leftover):
+        """
+        issue the fetch requests ahead of the consumer, at most prefetch depth responses are queued
+            the thread stops when it is told to, when the data set is garbage collected, or when a response is
+            not taken within PREFETCH_PUT_TIMEOUT_IN_SECONDS
+        """
+        while not stopped.is_set():
+            data_set = data_set_ref()
+            if data_set is None:
+                return
+            try:
+                resp = data_set.__fetch_results_resp()
+            except Exception as e:
+                resp = e
+            del data_set
+            deadline = (
+                time.monotonic() + IoTDBRpcDataSet.PREFETCH_PUT_TIMEOUT_IN_SECONDS
             )
+            while True:
+                try:
+                    responses.put(resp, timeout=0.1)
+                    break
+                except queue.Full:
+                    if (
+                        stopped.is_set()
+                        or data_set_ref() is None
+                        or time.monotonic() > deadline
+                    ):
+                        # keep the response for the consumer, see __stop_prefetch
+                        leftover.append(resp)
+                        return
+            if isinstance(resp, Exception) or not resp.hasResultSet:
+                return
+
+    def __stop_prefetch(self):
+        if self.__prefetch_thread is None:
+            return
+        self.__prefetch_stopped.set()
+        # wait for the fetch in flight, the client must not be shared by two requests
+        self.__prefetch_thread.join()
+        # responses fetched ahead are still consumed in order before any new fetch
+        prefetched = list(self.__prefetched)
+        self.__prefetched.clear()
+        while not self.__prefetch_queue.empty():
+            self.__prefetched.append(self.__prefetch_queue.get_nowait())
+        self.__prefetched.extend(self.__prefetch_leftover)
+        self.__prefetched.extend(prefetched)
+        self.__prefetch_thread = None
+        self.__prefetch_queue = None
+        self.__prefetch_leftover = []
 
     def is_null(self, index, row_num):
         bitmap = self.__current_bitmap[index]
@@ -376,10 +860,47 @@ class IoTDBRpcDataSet(object):
         return self.__column_name_list[column_index - 1]
 
     def get_fetch_size(self):
-        return self.__fetch_size
+        with self.__fetch_size_lock:
+            return self.__fetch_size
 
     def set_fetch_size(self, fetch_size):
-        self.__fetch_size = fetch_size
+        with self.__fetch_size_lock:
+            self.__fetch_size = fetch_size
+
+    def set_adaptive_fetch_size(
+        self,
+        target_fetch_bytes,
+        max_fetch_latency=None,
+        min_fetch_size=1,
+        max_fetch_size=None,
+    ):
+        """
+        :param target_fetch_bytes: Integer, bytes each fetch should carry, None disables the adaptive fetch size
+        :param max_fetch_latency: Float, seconds, the fetch size is reduced when fetches take longer
+        :param min_fetch_size: Integer, lower bound of the fetch size
+        :param max_fetch_size: Integer, upper bound of the fetch size, unbounded by default
+        """
+        with self.__fetch_size_lock:
+            self.__target_fetch_bytes = target_fetch_bytes
+            self.__max_fetch_latency = max_fetch_latency
+            self.__min_fetch_size = min_fetch_size
+            self.__max_fetch_size = (
+                float("inf") if max_fetch_size is None else max_fetch_size
+            )
+            self.__bytes_per_row = None
+
+    def get_prefetch_depth(self):
+        return self.__prefetch_depth
+
+    def set_prefetch_depth(self, prefetch_depth):
+        if prefetch_depth < 0:
+            raise RuntimeError(
+                "prefetch_depth should not be negative, got {}".format(prefetch_depth)
+            )
+        if prefetch_depth != self.__prefetch_depth:
+            # responses already prefetched are kept, the new depth applies from the next batch
+            self.__stop_prefetch()
+        self.__prefetch_depth = prefetch_depth
 
     def get_column_names(self):
         return self.__column_name_list
@@ -407,3 +928,6 @@ class IoTDBRpcDataSet(object):
 
     def get_has_cached_record(self):
         return self.__has_cached_record
+
+    def set_has_cached_record(self, has_cached_record):
+        self.__has_cached_record = has_cached_record
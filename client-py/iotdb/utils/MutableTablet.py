@@ -0,0 +1,185 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import numpy as np
+
+from iotdb.utils.IoTDBConstants import TSDataType
+from iotdb.utils.NumpyTablet import NumpyTablet
+from iotdb.utils.SortUtil import SortUtil
+
+
+class MutableTablet(object):
+    def __init__(self, device_id, measurements, data_types, max_row_number):
+        """
+        creating a reusable tablet that is filled row by row
+          the timestamps and every column are numpy arrays of max_row_number rows allocated once,
+          add_row / add_timestamp / add_value write into them in place, they are serialized from these arrays,
+          and reset() empties the tablet for the next batch without allocating again
+        Notice: a cell that is not given a value, or is given None, is an empty cell
+                The rows are sorted by timestamps when the tablet is serialized
+        :param device_id: String, IoTDB time series path to device layer (without sensor)
+        :param measurements: List, sensors
+        :param data_types: TSDataType List, specify value types for sensors
+        :param max_row_number: Integer, capacity of the tablet
+        """
+        if len(measurements) != len(data_types):
+            raise RuntimeError(
+                "Input error! len(measurements) does not equal to len(data_types)!"
+            )
+        if max_row_number <= 0:
+            raise RuntimeError("Input error! max_row_number must be positive!")
+        self.__device_id = device_id
+        self.__measurements = measurements
+        self.__data_types = data_types
+        self.__max_row_number = max_row_number
+        self.__column_index = {
+            measurement: i for i, measurement in enumerate(measurements)
+        }
+        self.__timestamps = np.empty(max_row_number, TSDataType.INT64.np_dtype())
+        # empty cells hold the same placeholder as in Tablet
+        self.__fill_values = [
+            "" if data_type == TSDataType.TEXT else 0 for data_type in data_types
+        ]
+        self.__values = []
+        for data_type, fill_value in zip(data_types, self.__fill_values):
+            if data_type == TSDataType.TEXT:
+                self.__values.append(np.full(max_row_number, fill_value, object))
+            else:
+                self.__values.append(np.zeros(max_row_number, data_type.np_dtype()))
+        # True marks an empty cell, every cell is empty until it is given a value
+        self.__bitmaps = [np.ones(max_row_number, bool) for _ in data_types]
+        self.__row_number = 0
+
+    def add_row(self, timestamp, values):
+        """
+        append one row after the filled rows
+        :param timestamp: Integer, timestamp of the row
+        :param values: List, value of each sensor, None for an empty cell
+        """
+        if self.__row_number >= self.__max_row_number:
+            raise RuntimeError(
+                "Tablet is full, max_row_number is {}".format(self.__max_row_number)
+            )
+        if len(values) != len(self.__values):
+            raise RuntimeError(
+                "Input error! len(values) does not equal to len(measurements)!"
+            )
+        row = self.__row_number
+        self.__timestamps[row] = timestamp
+        for column, value in enumerate(values):
+            self.__set_value(column, row, value)
+        self.__row_number = row + 1
+
+    def add_timestamp(self, row_index, timestamp):
+        """
+        set the timestamp of a filled row, or of the next one, which then counts as filled,
+            rows can not be skipped, every filled row has a timestamp
+        """
+        self.__check_row_index(row_index)
+        self.__timestamps[row_index] = timestamp
+        if row_index == self.__row_number:
+            self.__row_number = row_index + 1
+
+    def add_value(self, measurement, row_index, value):
+        """
+        set the value of a cell
+        :param measurement: String or Integer, sensor name or its index in measurements
+        :param row_index: Integer, row of the cell, a filled row or the next one
+        :param value: value of the cell, None for an empty cell
+        """
+        self.__check_row_index(row_index)
+        if isinstance(measurement, str):
+            if measurement not in self.__column_index:
+                raise RuntimeError("Unknown measurement: " + measurement)
+            column = self.__column_index[measurement]
+        else:
+            column = measurement
+        self.__set_value(column, row_index, value)
+
+    def reset(self):
+        """
+        empty the tablet, the arrays are kept for the next batch
+        """
+        # the next row may have values before its timestamp is set
+        cleared = min(self.__row_number + 1, self.__max_row_number)
+        for value, bitmap, fill_value in zip(
+            self.__values, self.__bitmaps, self.__fill_values
+        ):
+            value[:cleared] = fill_value
+            bitmap[:cleared] = True
+        self.__row_number = 0
+
+    def is_full(self):
+        return self.__row_number >= self.__max_row_number
+
+    def get_measurements(self):
+        return self.__measurements
+
+    def get_data_types(self):
+        return self.__data_types
+
+    def get_row_number(self):
+        return self.__row_number
+
+    def get_max_row_number(self):
+        return self.__max_row_number
+
+    def get_device_id(self):
+        return self.__device_id
+
+    def get_timestamps(self):
+        return self.__timestamps[: self.__row_number]
+
+    def get_values(self):
+        return [value[: self.__row_number] for value in self.__values]
+
+    def get_binary_timestamps(self):
+        timestamps = self.get_timestamps()
+        index = SortUtil.sort_index(timestamps)
+        if index is not None:
+            timestamps = timestamps[index]
+        return NumpyTablet.serialize_timestamps(timestamps)
+
+    def get_binary_values(self):
+        # views of the filled rows, they are copied only if they have to be sorted
+        index = SortUtil.sort_index(self.get_timestamps())
+        values = self.get_values()
+        bitmaps = []
+        for bitmap in self.__bitmaps:
+            bitmap = bitmap[: self.__row_number]
+            bitmaps.append(bitmap if bitmap.any() else None)
+        if index is not None:
+            values = [value[index] for value in values]
+            bitmaps = [None if bitmap is None else bitmap[index] for bitmap in bitmaps]
+        return NumpyTablet.serialize_values(self.__data_types, values, bitmaps)
+
+    def __set_value(self, column, row, value):
+        if value is None:
+            self.__values[column][row] = self.__fill_values[column]
+            self.__bitmaps[column][row] = True
+        else:
+            self.__values[column][row] = value
+            self.__bitmaps[column][row] = False
+
+    def __check_row_index(self, row_index):
+        # a row past the next one would leave the rows in between without a timestamp
+        upper = min(self.__row_number + 1, self.__max_row_number)
+        if row_index < 0 or row_index >= upper:
+            raise RuntimeError(
+                "row_index {} is out of the range [0, {})".format(row_index, upper)
+            )
@@ -16,13 +16,19 @@
 # under the License.
 #
 
-import struct
+import numpy as np
+
 from iotdb.utils.IoTDBConstants import TSDataType
-from iotdb.utils.BitMap import BitMap
+from iotdb.utils.SortUtil import SortUtil
 
 
 class NumpyTablet(object):
-    def __init__(self, device_id, measurements, data_types, values, timestamps):
+    __TEXT_KINDS = frozenset(["U", "S", "O"])
+    __LENGTH_DTYPE = np.dtype(">i4")
+
+    def __init__(
+        self, device_id, measurements, data_types, values, timestamps, bitmaps=None
+    ):
         """
         creating a numpy tablet for insertion
           for example, considering device: root.sg1.d1
@@ -35,8 +41,10 @@ class NumpyTablet(object):
         :param device_id: String, IoTDB time series path to device layer (without sensor)
         :param measurements: List, sensors
         :param data_types: TSDataType List, specify value types for sensors
-        :param values: List of numpy array, the values of each column should be the inner numpy array
+        :param values: List of numpy array, the values of each column should be the inner numpy array,
+                       a numpy.ma.MaskedArray or a pandas nullable array marks its masked / NA cells as empty
         :param timestamps: Numpy array, the timestamps
+        :param bitmaps: List of boolean numpy array or None, optional, True marks an empty cell of the column
         """
         if len(values) > 0 and len(values[0]) != len(timestamps):
             raise RuntimeError(
@@ -46,20 +54,40 @@ class NumpyTablet(object):
             raise RuntimeError(
                 "Input error! len(values) does not equal to len(data_types)!"
             )
+        if bitmaps is None:
+            bitmaps = [None] * len(values)
+        elif len(bitmaps) != len(values):
+            raise RuntimeError(
+                "Input error! len(bitmaps) does not equal to len(values)!"
+            )
+        bitmaps = list(bitmaps)
+        # the caller's list and arrays are left untouched, every change makes a new array
+        values = list(values)
+        for i in range(len(values)):
+            values[i], bitmaps[i] = NumpyTablet.__split_none_value(
+                values[i], bitmaps[i], data_types[i]
+            )
 
-        if not self.check_sorted(timestamps):
-            index = timestamps.argsort()
+        index = SortUtil.sort_index(timestamps)
+        if index is not None:
             timestamps = timestamps[index]
             for i in range(len(values)):
                 values[i] = values[i][index]
+                if bitmaps[i] is not None:
+                    bitmaps[i] = bitmaps[i][index]
 
-        if timestamps.dtype != TSDataType.INT64.np_dtype():
-            timestamps = timestamps.astype(TSDataType.INT64.np_dtype())
+        # arrays of either byte order are kept as they are, get_binary_* write them big-endian
+        timestamps = NumpyTablet.__as_dtype(timestamps, TSDataType.INT64.np_dtype())
         for i in range(len(values)):
-            if values[i].dtype != data_types[i].np_dtype():
-                values[i] = values[i].astype(data_types[i].np_dtype())
+            if data_types[i] == TSDataType.TEXT:
+                # str, bytes and object arrays are all encoded by get_binary_values as they are
+                if values[i].dtype.kind not in NumpyTablet.__TEXT_KINDS:
+                    values[i] = values[i].astype(data_types[i].np_dtype())
+            else:
+                values[i] = NumpyTablet.__as_dtype(values[i], data_types[i].np_dtype())
 
         self.__values = values
+        self.__bitmaps = bitmaps
         self.__timestamps = timestamps
         self.__device_id = device_id
         self.__measurements = measurements
@@ -69,10 +97,7 @@ class NumpyTablet(object):
 
     @staticmethod
     def check_sorted(timestamps):
-        for i in range(1, len(timestamps)):
-            if timestamps[i] < timestamps[i - 1]:
-                return False
-        return True
+        return SortUtil.check_sorted(timestamps)
 
     def get_measurements(self):
         return self.__measurements
@@ -87,45 +112,210 @@ class NumpyTablet(object):
         return self.__device_id
 
     def get_timestamps(self):
-        return self.__timestamps
+        """
+        :return: the sorted timestamps in the big-endian dtype of INT64
+        """
+        return self.__timestamps.astype(TSDataType.INT64.np_dtype(), copy=False)
 
     def get_values(self):
-        return self.__values
+        """
+        :return: List of the sorted columns, fixed-width ones in the big-endian dtype of their data type,
+                 TEXT ones as given
+        """
+        return [
+            value
+            if data_type == TSDataType.TEXT
+            else value.astype(data_type.np_dtype(), copy=False)
+            for data_type, value in zip(self.__data_types, self.__values)
+        ]
+
+    def get_bitmaps(self):
+        return self.__bitmaps
 
     def get_binary_timestamps(self):
-        return self.__timestamps.tobytes()
+        return NumpyTablet.serialize_timestamps(self.__timestamps)
 
     def get_binary_values(self):
+        return NumpyTablet.serialize_values(
+            self.__data_types, self.__values, self.__bitmaps
+        )
+
+    @staticmethod
+    def serialize_timestamps(timestamps):
+        """
+        :param timestamps: numpy array of INT64 timestamps in either byte order
+        :return: memoryview of the big-endian timestamps
+        """
+        ret = bytearray(8 * len(timestamps))
+        # a single pass copies and byteswaps a native-endian array into the buffer
+        np.frombuffer(ret, TSDataType.INT64.np_dtype())[:] = timestamps
+        return memoryview(ret)
+
+    @staticmethod
+    def serialize_values(data_types, values, bitmaps):
+        """
+        serialize the columns of a tablet, shared with MutableTablet which serializes its own buffers
+        :param data_types: TSDataType List
+        :param values: List of numpy arrays of the same length, fixed-width ones of the kind and item size of
+                       their data type in either byte order, TEXT ones of str (U), bytes (S) or objects
+        :param bitmaps: List of boolean numpy array or None, True marks an empty cell of the column
+        :return: memoryview of the serialized columns
+        """
+        row_number = len(values[0]) if values else 0
+        encoded_texts = {}
         bs_len = 0
-        bs_list = []
-        for i, value in enumerate(self.__values):
-            if self.__data_types[i] == TSDataType.TEXT:
-                format_str_list = [">"]
-                values_tobe_packed = []
-                for str_list in value:
-                    # Fot TEXT, it's same as the original solution
-                    value_bytes = bytes(str_list, "utf-8")
-                    format_str_list.append("i")
-                    format_str_list.append(str(len(value_bytes)))
-                    format_str_list.append("s")
-                    values_tobe_packed.append(len(value_bytes))
-                    values_tobe_packed.append(value_bytes)
-                format_str = "".join(format_str_list)
-                bs = struct.pack(format_str, *values_tobe_packed)
+        for i, value in enumerate(values):
+            if data_types[i] == TSDataType.TEXT:
+                encoded_texts[i] = NumpyTablet.__encode_text(value)
+                bs_len += len(encoded_texts[i])
             else:
-                bs = value.tobytes()
-            bs_list.append(bs)
-            bs_len += len(bs)
-        ret = memoryview(bytearray(bs_len))
+                bs_len += row_number * data_types[i].np_dtype().itemsize
+        has_none = any(bitmap is not None for bitmap in bitmaps)
+        if has_none:
+            for bitmap in bitmaps:
+                bs_len += 1 if bitmap is None else 2 + row_number // 8
+
+        ret = bytearray(bs_len)
+        ret_array = np.frombuffer(ret, np.uint8)
         offset = 0
-        for bs in bs_list:
-            _l = len(bs)
-            ret[offset : offset + _l] = bs
-            offset += _l
+        for i, value in enumerate(values):
+            if i in encoded_texts:
+                bs = encoded_texts[i]
+                ret_array[offset : offset + len(bs)] = bs
+                offset += len(bs)
+            else:
+                data_type = data_types[i].np_dtype()
+                np.frombuffer(ret, data_type, row_number, offset)[:] = value
+                offset += row_number * data_type.itemsize
+        if has_none:
+            for bitmap in bitmaps:
+                if bitmap is None:
+                    ret[offset] = 0
+                    offset += 1
+                else:
+                    bs = NumpyTablet.__pack_bitmap(bitmap)
+                    ret[offset] = 1
+                    ret[offset + 1 : offset + 1 + len(bs)] = bs
+                    offset += 1 + len(bs)
+        return memoryview(ret)
+
+    def mark_none_value(self, column, row):
+        """
+        mark the cell at (column, row) as empty, the value stored in it is ignored
+        """
+        if self.__bitmaps[column] is None:
+            self.__bitmaps[column] = np.zeros(self.__row_number, bool)
+        self.__bitmaps[column][row] = True
+
+    @staticmethod
+    def __split_none_value(value, bitmap, data_type):
+        """
+        separate the empty cells of a column from its values
+        :return: the values with empty cells filled by a placeholder, and the boolean mask of empty
+                 cells (None if the column has none)
+        """
+        fill_value = "" if data_type == TSDataType.TEXT else 0
+        if isinstance(value, np.ma.MaskedArray):
+            mask = np.ma.getmaskarray(value)
+            value = value.filled(fill_value)
+        elif not isinstance(value, np.ndarray) and hasattr(value, "isna"):
+            # pandas Series or extension array, e.g. Int32, boolean or string dtype
+            mask = np.asarray(value.isna(), bool)
+            if data_type == TSDataType.TEXT:
+                value = value.to_numpy(dtype=object, na_value=fill_value)
+            else:
+                value = value.to_numpy(dtype=data_type.np_dtype(), na_value=fill_value)
+        elif value.dtype == object:
+            mask = np.equal(value, None)
+            if mask.any():
+                value = np.where(mask, fill_value, value)
+        else:
+            mask = None
+
+        if bitmap is not None:
+            bitmap = np.array(bitmap, bool)
+            if len(bitmap) != len(value):
+                raise RuntimeError(
+                    "Input error! len(bitmap) does not equal to len(timestamps)!"
+                )
+            mask = bitmap if mask is None else mask | bitmap
+        if mask is not None and not mask.any():
+            mask = None
+        return value, mask
+
+    @staticmethod
+    def __as_dtype(value, np_dtype):
+        """
+        convert value to np_dtype unless it only differs in byte order, a conversion makes a native-endian array
+        """
+        if (
+            value.dtype.kind == np_dtype.kind
+            and value.dtype.itemsize == np_dtype.itemsize
+        ):
+            return value
+        return value.astype(np_dtype.newbyteorder("="))
+
+    @staticmethod
+    def __encode_text(value):
+        """
+        serialize a TEXT column as consecutive (big-endian int32 length, utf-8 bytes) pairs
+        :param value: numpy array of str (U), bytes (S) or objects, non-bytes objects are written as str()
+        :return: uint8 numpy array of the serialized column
+        """
+        if len(value) == 0:
+            return np.empty(0, np.uint8)
+        chars = None
+        if value.dtype.kind == "U":
+            value = np.ascontiguousarray(value)
+            width = value.dtype.itemsize // 4
+            codes = value.view(np.uint32).reshape(len(value), width)
+            if width == 0 or codes.max() < 0x80:
+                # pure ASCII, the utf-8 bytes are the code points themselves
+                chars = codes
+            else:
+                value = value.tolist()
+        elif value.dtype.kind == "S":
+            value = np.ascontiguousarray(value)
+            width = value.dtype.itemsize
+            chars = value.view(np.uint8).reshape(len(value), width)
+
+        row_number = len(value)
+        if chars is not None:
+            # fixed width elements padded with trailing NULs: lay out one (length, payload) row per
+            # element, then drop the padding of every row in a single selection
+            not_padding = chars[:, ::-1] != 0
+            lengths = np.where(
+                not_padding.any(axis=1), width - not_padding.argmax(axis=1), 0
+            )
+            rows = np.empty((row_number, 4 + width), np.uint8)
+            rows[:, :4] = (
+                lengths.astype(NumpyTablet.__LENGTH_DTYPE).view(np.uint8).reshape(-1, 4)
+            )
+            rows[:, 4:] = chars
+            return rows[np.arange(4 + width) < lengths[:, None] + 4]
+
+        # bytes are kept as they are, any other object is written as its utf-8 str()
+        encoded = [v if isinstance(v, bytes) else str(v).encode("utf-8") for v in value]
+        lengths = np.fromiter(map(len, encoded), np.int64, row_number)
+        payload = np.frombuffer(b"".join(encoded), np.uint8)
+        ret = np.empty(4 * row_number + len(payload), np.uint8)
+        # element i starts after the i previous length prefixes and payloads
+        starts = np.arange(row_number) * 4
+        starts[1:] += np.cumsum(lengths[:-1])
+        ret[starts[:, None] + np.arange(4)] = (
+            lengths.astype(NumpyTablet.__LENGTH_DTYPE).view(np.uint8).reshape(-1, 4)
+        )
+        # the payload of element i follows i + 1 length prefixes, its own included
+        shift = np.repeat(np.arange(1, row_number + 1) * 4, lengths)
+        ret[np.arange(len(payload)) + shift] = payload
         return ret
 
-    def __mark_none_value(self, bitmaps, bitmap, column, row):
-        if bitmap is None:
-            bitmap = BitMap(self.__row_number)
-            bitmaps.insert(column, bitmap)
-        bitmap.mark(row)
+    @staticmethod
+    def __pack_bitmap(bitmap):
+        """
+        same layout as BitMap: row_number // 8 + 1 bytes, row i is bit i % 8 of byte i // 8
+        """
+        packed = np.zeros(len(bitmap) // 8 + 1, np.uint8)
+        bits = np.packbits(bitmap, bitorder="little")
+        packed[: len(bits)] = bits
+        return packed.tobytes()
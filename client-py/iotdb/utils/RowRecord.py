@@ -25,6 +25,8 @@ from .Field import Field
 
 
 class RowRecord(object):
+    __slots__ = ("__timestamp", "__field_list")
+
     def __init__(self, timestamp, field_list=None):
         self.__timestamp = timestamp
         self.__field_list = field_list
@@ -31,6 +31,15 @@ logger = logging.getLogger("IoTDB")
 
 
 class SessionDataSet(object):
+    __TIME_STRUCT = struct.Struct(">q")
+    __VALUE_STRUCTS = {
+        TSDataType.BOOLEAN: struct.Struct(">?"),
+        TSDataType.INT32: struct.Struct(">i"),
+        TSDataType.INT64: struct.Struct(">q"),
+        TSDataType.FLOAT: struct.Struct(">f"),
+        TSDataType.DOUBLE: struct.Struct(">d"),
+    }
+
     def __init__(
         self,
         sql,
@@ -43,6 +52,7 @@ class SessionDataSet(object):
         session_id,
         query_data_set,
         ignore_timestamp,
+        fetch_size=1024,
     ):
         self.iotdb_rpc_data_set = IoTDBRpcDataSet(
             sql,
@@ -55,8 +65,23 @@ class SessionDataSet(object):
             statement_id,
             session_id,
             query_data_set,
-            1024,
+            fetch_size,
         )
+        # name, value buffer location and data type of each column of a row record
+        self.__row_columns = []
+        column_names = self.iotdb_rpc_data_set.get_column_names()
+        for i in range(self.iotdb_rpc_data_set.get_column_size()):
+            column_name = column_names[
+                i if self.iotdb_rpc_data_set.get_ignore_timestamp() else i + 1
+            ]
+            location = (
+                self.iotdb_rpc_data_set.get_column_ordinal_dict()[column_name]
+                - IoTDBRpcDataSet.START_INDEX
+            )
+            data_type = self.iotdb_rpc_data_set.get_column_type_deduplicated_list()[
+                location
+            ]
+            self.__row_columns.append((column_name, location, data_type))
 
     def __enter__(self):
         return self
@@ -70,6 +95,36 @@ class SessionDataSet(object):
     def set_fetch_size(self, fetch_size):
         self.iotdb_rpc_data_set.set_fetch_size(fetch_size)
 
+    def set_adaptive_fetch_size(
+        self,
+        target_fetch_bytes,
+        max_fetch_latency=None,
+        min_fetch_size=1,
+        max_fetch_size=None,
+    ):
+        """
+        let the fetch size follow the measured bytes per row, so that each fetch carries about target_fetch_bytes
+        whether the rows are wide TEXT rows or narrow numeric rows
+        :param target_fetch_bytes: Integer, bytes each fetch should carry, None disables the adaptive fetch size
+        :param max_fetch_latency: Float, seconds, the fetch size is reduced when fetches take longer than this
+        :param min_fetch_size: Integer, lower bound of the fetch size
+        :param max_fetch_size: Integer, upper bound of the fetch size, unbounded by default
+        """
+        self.iotdb_rpc_data_set.set_adaptive_fetch_size(
+            target_fetch_bytes, max_fetch_latency, min_fetch_size, max_fetch_size
+        )
+
+    def get_prefetch_depth(self):
+        return self.iotdb_rpc_data_set.get_prefetch_depth()
+
+    def set_prefetch_depth(self, prefetch_depth):
+        """
+        fetch the next batches of the result set in a background thread while the current one is read,
+        the session stays usable meanwhile, its requests and the fetches take turns on the connection
+        :param prefetch_depth: Integer, maximum number of batches fetched ahead, 0 disables prefetching
+        """
+        self.iotdb_rpc_data_set.set_prefetch_depth(prefetch_depth)
+
     def get_column_names(self):
         return self.iotdb_rpc_data_set.get_column_names()
 
@@ -83,54 +138,39 @@ class SessionDataSet(object):
         if not self.iotdb_rpc_data_set.get_has_cached_record():
             if not self.has_next():
                 return None
-        self.iotdb_rpc_data_set.has_cached_record = False
+        self.iotdb_rpc_data_set.set_has_cached_record(False)
         return self.construct_row_record_from_value_array()
 
+    def fetch_rows(self, n):
+        """
+        read up to n rows at once, the values are decoded column by column which is much faster than next()
+        :param n: Integer, maximum number of rows to read
+        :return: List of tuples with one value per column (see get_column_names), None stands for a null value
+                 and TEXT values are decoded to str. An empty list is returned when the result set is exhausted.
+        """
+        return self.iotdb_rpc_data_set.next_rows(n)
+
     def construct_row_record_from_value_array(self):
+        values = self.iotdb_rpc_data_set.get_values()
         out_fields = []
-        for i in range(self.iotdb_rpc_data_set.get_column_size()):
-            index = i + 1
-            data_set_column_index = i + IoTDBRpcDataSet.START_INDEX
-            if self.iotdb_rpc_data_set.get_ignore_timestamp():
-                index -= 1
-                data_set_column_index -= 1
-            column_name = self.iotdb_rpc_data_set.get_column_names()[index]
-            location = (
-                self.iotdb_rpc_data_set.get_column_ordinal_dict()[column_name]
-                - IoTDBRpcDataSet.START_INDEX
-            )
-
-            if not self.iotdb_rpc_data_set.is_null_by_index(data_set_column_index):
-                value_bytes = self.iotdb_rpc_data_set.get_values()[location]
-                data_type = self.iotdb_rpc_data_set.get_column_type_deduplicated_list()[
-                    location
-                ]
-                field = Field(data_type)
-                if data_type == TSDataType.BOOLEAN:
-                    value = struct.unpack(">?", value_bytes)[0]
-                    field.set_bool_value(value)
-                elif data_type == TSDataType.INT32:
-                    value = struct.unpack(">i", value_bytes)[0]
-                    field.set_int_value(value)
-                elif data_type == TSDataType.INT64:
-                    value = struct.unpack(">q", value_bytes)[0]
-                    field.set_long_value(value)
-                elif data_type == TSDataType.FLOAT:
-                    value = struct.unpack(">f", value_bytes)[0]
-                    field.set_float_value(value)
-                elif data_type == TSDataType.DOUBLE:
-                    value = struct.unpack(">d", value_bytes)[0]
-                    field.set_double_value(value)
-                elif data_type == TSDataType.TEXT:
-                    field.set_binary_value(value_bytes)
-                else:
-                    raise RuntimeError("unsupported data type {}.".format(data_type))
+        for column_name, location, data_type in self.__row_columns:
+            if self.iotdb_rpc_data_set.is_null_by_name(column_name):
+                out_fields.append(Field(None))
+                continue
+            value_bytes = values[location]
+            if data_type == TSDataType.TEXT:
+                value = value_bytes
+            elif data_type in SessionDataSet.__VALUE_STRUCTS:
+                value = SessionDataSet.__VALUE_STRUCTS[data_type].unpack(value_bytes)[0]
             else:
-                field = Field(None)
-            out_fields.append(field)
+                raise RuntimeError("unsupported data type {}.".format(data_type))
+            out_fields.append(Field(data_type, value))
 
         return RowRecord(
-            struct.unpack(">q", self.iotdb_rpc_data_set.get_time_bytes())[0], out_fields
+            SessionDataSet.__TIME_STRUCT.unpack(
+                self.iotdb_rpc_data_set.get_time_bytes()
+            )[0],
+            out_fields,
         )
 
     def close_operation_handle(self):
@@ -139,6 +179,33 @@ class SessionDataSet(object):
     def todf(self):
         return resultset_to_pandas(self)
 
+    def iter_dataframes(self, batch_rows=None):
+        """
+        iterate over the result set as Pandas data frames, only one batch of rows is held in memory at a time
+        :param batch_rows: Integer, number of rows of each data frame, by default one data frame is
+                           generated for each fetch from the server (see set_fetch_size)
+        """
+        return self.iotdb_rpc_data_set.resultset_to_pandas_batches(batch_rows)
+
+    def to_arrow(self):
+        """
+        transform the result set to an Apache Arrow table without a Pandas intermediate, requires pyarrow
+        """
+        import pyarrow as pa
+
+        schema, batches = self.iotdb_rpc_data_set.resultset_to_arrow_batches()
+        return pa.Table.from_batches(batches, schema=schema)
+
+    def to_arrow_reader(self):
+        """
+        iterate over the result set as Apache Arrow record batches, one record batch per fetch, requires pyarrow
+        :return: pyarrow.RecordBatchReader
+        """
+        import pyarrow as pa
+
+        schema, batches = self.iotdb_rpc_data_set.resultset_to_arrow_batches()
+        return pa.RecordBatchReader.from_batches(schema, batches)
+
 
 def resultset_to_pandas(result_set: SessionDataSet) -> pd.DataFrame:
     """
@@ -0,0 +1,65 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import numpy as np
+
+
+class SortUtil(object):
+    """
+    ordering helpers shared by Tablet, NumpyTablet and the records of one device in Session
+    """
+
+    @staticmethod
+    def check_sorted(timestamps):
+        """
+        :param timestamps: List or numpy array of Integer
+        :return: True if the timestamps are in non-decreasing order
+        """
+        if len(timestamps) < 2:
+            return True
+        timestamps = SortUtil.__as_array(timestamps)
+        # compare neighbours instead of np.diff, whose difference may overflow int64
+        return bool((timestamps[1:] >= timestamps[:-1]).all())
+
+    @staticmethod
+    def sort_index(timestamps):
+        """
+        :param timestamps: List or numpy array of Integer
+        :return: None if the timestamps are sorted already, otherwise the permutation (numpy array) that
+                 sorts them, rows with the same timestamp keep their order
+        """
+        if SortUtil.check_sorted(timestamps):
+            return None
+        return np.argsort(SortUtil.__as_array(timestamps), kind="stable")
+
+    @staticmethod
+    def reorder(values, index):
+        """
+        :param values: List or numpy array
+        :param index: permutation returned by sort_index
+        :return: values in the order of index, a numpy array is indexed, a list is rebuilt as a list
+        """
+        if isinstance(values, np.ndarray):
+            return values[index]
+        return [values[i] for i in index.tolist()]
+
+    @staticmethod
+    def __as_array(timestamps):
+        if isinstance(timestamps, np.ndarray):
+            return timestamps
+        return np.asarray(timestamps, np.int64)
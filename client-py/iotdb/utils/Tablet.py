@@ -18,11 +18,31 @@
 
 import struct
 
+import numpy as np
+
 from iotdb.utils.IoTDBConstants import TSDataType
-from iotdb.utils.BitMap import BitMap
+from iotdb.utils.SortUtil import SortUtil
 
 
 class Tablet(object):
+    __LENGTH_STRUCT = struct.Struct(">i")
+    # struct format of each fixed-width data type
+    __VALUE_FORMATS = {
+        TSDataType.BOOLEAN: "?",
+        TSDataType.INT32: "i",
+        TSDataType.INT64: "q",
+        TSDataType.FLOAT: "f",
+        TSDataType.DOUBLE: "d",
+    }
+    # kinds of numpy arrays each fixed-width data type converts without loss
+    __EXACT_KINDS = {
+        TSDataType.BOOLEAN: "b",
+        TSDataType.INT32: "bi",
+        TSDataType.INT64: "bi",
+        TSDataType.FLOAT: "biuf",
+        TSDataType.DOUBLE: "biuf",
+    }
+
     def __init__(self, device_id, measurements, data_types, values, timestamps):
         """
         creating a tablet for insertion
@@ -44,13 +64,12 @@ class Tablet(object):
                 "Input error! len(timestamps) does not equal to len(values)!"
             )
 
-        if not Tablet.check_sorted(timestamps):
-            sorted_zipped = sorted(zip(timestamps, values))
-            result = zip(*sorted_zipped)
-            self.__timestamps, self.__values = [list(x) for x in result]
-        else:
-            self.__values = values
-            self.__timestamps = timestamps
+        index = SortUtil.sort_index(timestamps)
+        if index is not None:
+            timestamps = SortUtil.reorder(timestamps, index)
+            values = SortUtil.reorder(values, index)
+        self.__values = values
+        self.__timestamps = timestamps
 
         self.__device_id = device_id
         self.__measurements = measurements
@@ -60,10 +79,7 @@ class Tablet(object):
 
     @staticmethod
     def check_sorted(timestamps):
-        for i in range(1, len(timestamps)):
-            if timestamps[i] < timestamps[i - 1]:
-                return False
-        return True
+        return SortUtil.check_sorted(timestamps)
 
     def get_measurements(self):
         return self.__measurements
@@ -78,115 +94,76 @@ class Tablet(object):
         return self.__device_id
 
     def get_binary_timestamps(self):
-        format_str_list = [">"]
-        values_tobe_packed = []
-        for timestamp in self.__timestamps:
-            format_str_list.append("q")
-            values_tobe_packed.append(timestamp)
-
-        format_str = "".join(format_str_list)
-        return struct.pack(format_str, *values_tobe_packed)
+        return np.array(self.__timestamps, TSDataType.INT64.np_dtype()).tobytes()
 
     def get_binary_values(self):
-        format_str_list = [">"]
-        values_tobe_packed = []
+        # pack the tablet column by column, each fixed-width column in one numpy conversion
+        bs_list = []
         bitmaps = []
         has_none = False
+        if self.__row_number == 0:
+            columns = [() for _ in range(self.__column_number)]
+        else:
+            columns = list(zip(*self.__values))
         for i in range(self.__column_number):
+            data_type = self.__data_types[i]
+            column = columns[i]
             bitmap = None
+            if None in column:
+                bitmap = Tablet.__pack_bitmap([value is None for value in column])
+                has_none = True
+                fill_value = "" if data_type == TSDataType.TEXT else 0
+                column = [fill_value if value is None else value for value in column]
             bitmaps.append(bitmap)
-            if self.__data_types[i] == TSDataType.BOOLEAN:
-                format_str_list.append(str(self.__row_number))
-                format_str_list.append("?")
-                for j in range(self.__row_number):
-                    if self.__values[j][i] is not None:
-                        values_tobe_packed.append(self.__values[j][i])
-                    else:
-                        values_tobe_packed.append(False)
-                        self.__mark_none_value(bitmaps, i, j)
-                        has_none = True
-
-            elif self.__data_types[i] == TSDataType.INT32:
-                format_str_list.append(str(self.__row_number))
-                format_str_list.append("i")
-                for j in range(self.__row_number):
-                    if self.__values[j][i] is not None:
-                        values_tobe_packed.append(self.__values[j][i])
-                    else:
-                        values_tobe_packed.append(0)
-                        self.__mark_none_value(bitmaps, i, j)
-                        has_none = True
-
-            elif self.__data_types[i] == TSDataType.INT64:
-                format_str_list.append(str(self.__row_number))
-                format_str_list.append("q")
-                for j in range(self.__row_number):
-                    if self.__values[j][i] is not None:
-                        values_tobe_packed.append(self.__values[j][i])
-                    else:
-                        values_tobe_packed.append(0)
-                        self.__mark_none_value(bitmaps, i, j)
-                        has_none = True
-
-            elif self.__data_types[i] == TSDataType.FLOAT:
-                format_str_list.append(str(self.__row_number))
-                format_str_list.append("f")
-                for j in range(self.__row_number):
-                    if self.__values[j][i] is not None:
-                        values_tobe_packed.append(self.__values[j][i])
-                    else:
-                        values_tobe_packed.append(0)
-                        self.__mark_none_value(bitmaps, i, j)
-                        has_none = True
-
-            elif self.__data_types[i] == TSDataType.DOUBLE:
-                format_str_list.append(str(self.__row_number))
-                format_str_list.append("d")
-                for j in range(self.__row_number):
-                    if self.__values[j][i] is not None:
-                        values_tobe_packed.append(self.__values[j][i])
-                    else:
-                        values_tobe_packed.append(0)
-                        self.__mark_none_value(bitmaps, i, j)
-                        has_none = True
-
-            elif self.__data_types[i] == TSDataType.TEXT:
-                for j in range(self.__row_number):
-                    if self.__values[j][i] is not None:
-                        value_bytes = bytes(self.__values[j][i], "utf-8")
-                        format_str_list.append("i")
-                        format_str_list.append(str(len(value_bytes)))
-                        format_str_list.append("s")
-                        values_tobe_packed.append(len(value_bytes))
-                        values_tobe_packed.append(value_bytes)
-                    else:
-                        value_bytes = bytes("", "utf-8")
-                        format_str_list.append("i")
-                        format_str_list.append(str(len(value_bytes)))
-                        format_str_list.append("s")
-                        values_tobe_packed.append(len(value_bytes))
-                        values_tobe_packed.append(value_bytes)
-                        self.__mark_none_value(bitmaps, i, j)
-                        has_none = True
 
+            if data_type == TSDataType.TEXT:
+                pack_length = Tablet.__LENGTH_STRUCT.pack
+                for value in column:
+                    value_bytes = bytes(value, "utf-8")
+                    bs_list.append(pack_length(len(value_bytes)) + value_bytes)
+            elif data_type in Tablet.__VALUE_FORMATS:
+                bs_list.append(Tablet.__pack_fixed_width(column, data_type))
             else:
-                raise RuntimeError("Unsupported data type:" + str(self.__data_types[i]))
+                raise RuntimeError("Unsupported data type:" + str(data_type))
 
         if has_none:
-            for i in range(self.__column_number):
-                format_str_list.append("?")
-                if bitmaps[i] is None:
-                    values_tobe_packed.append(False)
+            for bitmap in bitmaps:
+                if bitmap is None:
+                    bs_list.append(b"\x00")
                 else:
-                    values_tobe_packed.append(True)
-                    format_str_list.append(str(self.__row_number // 8 + 1))
-                    format_str_list.append("c")
-                    for j in range(self.__row_number // 8 + 1):
-                        values_tobe_packed.append(bytes([bitmaps[i].bits[j]]))
-        format_str = "".join(format_str_list)
-        return struct.pack(format_str, *values_tobe_packed)
-
-    def __mark_none_value(self, bitmaps, column, row):
-        if bitmaps[column] is None:
-            bitmaps[column] = BitMap(self.__row_number)
-        bitmaps[column].mark(row)
+                    bs_list.append(b"\x01")
+                    bs_list.append(bitmap)
+        return b"".join(bs_list)
+
+    @staticmethod
+    def __pack_fixed_width(column, data_type):
+        """
+        pack a column in one numpy conversion, a column numpy could convert with loss, e.g. an out of range
+        integer or a float in an integer column, is packed by struct, which raises on such values
+        """
+        raw = np.array(column)
+        if raw.dtype.kind in Tablet.__EXACT_KINDS[data_type] and len(raw) > 0:
+            np_dtype = data_type.np_dtype()
+            if data_type in (TSDataType.INT32, TSDataType.INT64):
+                info = np.iinfo(np_dtype)
+                exact = raw.min() >= info.min and raw.max() <= info.max
+            elif data_type == TSDataType.FLOAT:
+                finite = np.abs(raw[np.isfinite(raw)])
+                exact = len(finite) == 0 or finite.max() <= np.finfo(np_dtype).max
+            else:
+                exact = True
+            if exact:
+                return raw.astype(np_dtype).tobytes()
+        return struct.pack(
+            ">{}{}".format(len(column), Tablet.__VALUE_FORMATS[data_type]), *column
+        )
+
+    @staticmethod
+    def __pack_bitmap(is_none):
+        """
+        same layout as BitMap: row_number // 8 + 1 bytes, row i is bit i % 8 of byte i // 8
+        """
+        bitmap = np.zeros(len(is_none) // 8 + 1, np.uint8)
+        packed = np.packbits(np.array(is_none, bool), bitorder="little")
+        bitmap[: len(packed)] = packed
+        return bitmap.tobytes()
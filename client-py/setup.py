@@ -47,6 +47,9 @@ setuptools.setup(
         "sqlalchemy>=1.3.16, <1.4, !=1.3.21",
         "sqlalchemy-utils>=0.37.8, <0.38",
     ],
+    extras_require={
+        "arrow": ["pyarrow>=4.0.0"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
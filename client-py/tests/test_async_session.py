@@ -0,0 +1,339 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import asyncio
+import struct
+import threading
+
+import pytest
+from thrift.protocol import TBinaryProtocol
+from thrift.transport import TTransport
+
+from iotdb.AsyncSession import AsyncSession
+from iotdb.AsyncSessionPool import AsyncSessionPool
+from iotdb.IoTDBContainer import IoTDBContainer
+from iotdb.Session import Session
+from iotdb.SessionPool import PoolConfig
+from iotdb.thrift.common.ttypes import TSStatus
+from iotdb.thrift.rpc.TSIService import Processor
+from iotdb.thrift.rpc.ttypes import TSOpenSessionResp
+from iotdb.utils.IoTDBConstants import TSDataType
+from iotdb.utils.Tablet import Tablet
+
+
+def test_async_session():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        host, port = db.get_container_host_ip(), db.get_exposed_port(6667)
+
+        async def run():
+            async with AsyncSession(host, port) as session:
+                await session.open(False)
+                assert (
+                    await session.execute_non_query_statement(
+                        "set storage group to root.sg_test_01"
+                    )
+                    == 0
+                )
+                tablets = [
+                    Tablet(
+                        "root.sg_test_01.d_01",
+                        ["s_01"],
+                        [TSDataType.INT64],
+                        [[i]],
+                        [i],
+                    )
+                    for i in range(100)
+                ]
+                results = await asyncio.gather(
+                    *[session.insert_tablet(tablet) for tablet in tablets]
+                )
+                assert results == [0] * 100
+                assert (
+                    await session.insert_records(
+                        ["root.sg_test_01.d_01"],
+                        [100],
+                        [["s_01"]],
+                        [[TSDataType.INT64]],
+                        [[100]],
+                    )
+                    == 0
+                )
+
+                session_data_set = await session.execute_query_statement(
+                    "select s_01 from root.sg_test_01.d_01"
+                )
+                session_data_set.set_fetch_size(7)
+                rows = 0
+                async for df in session_data_set:
+                    rows += len(df)
+                assert rows == 101
+                await session_data_set.close_operation_handle()
+
+            async with AsyncSessionPool(
+                PoolConfig(host, port), max_pool_size=3
+            ) as pool:
+                results = await asyncio.gather(
+                    *[pool.insert_tablets(tablets[i::10]) for i in range(10)]
+                )
+                assert results == [0] * 10
+                assert pool.get_current_size() <= 3
+
+                session_data_set = await pool.execute_query_statement(
+                    "select count(s_01) from root.sg_test_01.d_01"
+                )
+                df = await session_data_set.todf()
+                assert df.iloc[0, 0] == 101
+                await pool.close_result_set(session_data_set)
+            assert pool.get_current_size() == 0
+
+        asyncio.run(run())
+
+
+class FakeHandler(object):
+    """
+    answers the rpcs of AsyncSession in memory and records them
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def openSession(self, request):
+        self.calls.append("openSession")
+        return TSOpenSessionResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            serverProtocolVersion=request.client_protocol,
+            sessionId=1,
+        )
+
+    def requestStatementId(self, session_id):
+        return 1
+
+    def setTimeZone(self, request):
+        return TSStatus(Session.SUCCESS_CODE, "")
+
+    def closeSession(self, request):
+        self.calls.append("closeSession")
+        return TSStatus(Session.SUCCESS_CODE)
+
+    def insertTablet(self, request):
+        self.calls.append(("insertTablet", request.size))
+        return TSStatus(Session.SUCCESS_CODE, "")
+
+    def insertTablets(self, request):
+        self.calls.append(("insertTablets", request.sizeList))
+        return TSStatus(Session.SUCCESS_CODE, "")
+
+    def insertRecords(self, request):
+        self.calls.append(("insertRecords", len(request.timestamps)))
+        return TSStatus(Session.SUCCESS_CODE, "")
+
+
+class FakeServer(object):
+    """
+    a framed Thrift server on asyncio streams, responses can be delayed to keep requests in flight
+    """
+
+    def __init__(self):
+        self.handler = FakeHandler()
+        self.processor = Processor(self.handler)
+        self.delay = 0
+        self.disconnects = 0
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.__serve, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def get_port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def __serve(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(4)
+                frame = await reader.readexactly(struct.unpack(">i", header)[0])
+                out_buffer = TTransport.TMemoryBuffer()
+                self.processor.process(
+                    TBinaryProtocol.TBinaryProtocol(TTransport.TMemoryBuffer(frame)),
+                    TBinaryProtocol.TBinaryProtocol(out_buffer),
+                )
+                payload = out_buffer.getvalue()
+                if self.delay:
+                    try:
+                        # a client that hangs up while the response is delayed reaches EOF here
+                        if not await asyncio.wait_for(reader.read(1), self.delay):
+                            self.disconnects += 1
+                            return
+                    except asyncio.TimeoutError:
+                        pass
+                writer.write(struct.pack(">i", len(payload)) + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.disconnects += 1
+        finally:
+            writer.close()
+
+
+def make_tablet(rows):
+    return Tablet(
+        "root.sg_test_01.d_01",
+        ["s_01"],
+        [TSDataType.INT64],
+        [[i] for i in range(rows)],
+        list(range(rows)),
+    )
+
+
+def test_async_session_cancellation_closes_connection():
+    async def run():
+        async with FakeServer() as server:
+            session = AsyncSession("127.0.0.1", server.get_port())
+            await session.open(False)
+            server.delay = 10
+            task = asyncio.ensure_future(session.insert_tablet(make_tablet(1)))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # the response of the cancelled request would be read by the next one, the connection is dropped
+            assert not session.is_open()
+            with pytest.raises(RuntimeError):
+                await session.insert_tablet(make_tablet(1))
+            await asyncio.sleep(0.1)
+            assert server.disconnects == 1
+            assert "closeSession" not in server.handler.calls
+
+    asyncio.run(run())
+
+
+def test_async_session_pool_wait_timeout():
+    async def run():
+        async with FakeServer() as server:
+            pool = AsyncSessionPool(
+                PoolConfig("127.0.0.1", server.get_port()),
+                max_pool_size=1,
+                wait_timeout_in_ms=100,
+            )
+            session = await pool.get_session()
+            with pytest.raises(RuntimeError, match="timeout"):
+                await pool.get_session()
+            assert pool.get_current_size() == 1
+
+            # a waiting task gets the session once it is put back
+            waiter = asyncio.ensure_future(pool.get_session())
+            await asyncio.sleep(0.01)
+            await pool.put_back(session)
+            assert await waiter is session
+            await pool.put_back(session)
+            await pool.close()
+            assert pool.get_current_size() == 0
+
+    asyncio.run(run())
+
+
+def test_async_session_pool_put_back_broken():
+    async def run():
+        async with FakeServer() as server:
+            pool = AsyncSessionPool(PoolConfig("127.0.0.1", server.get_port()))
+            session = await pool.get_session()
+            await pool.put_back(session, broken=True)
+            assert not session.is_open()
+            assert pool.get_current_size() == 0
+            assert pool.get_idle_size() == 0
+            assert server.handler.calls == ["openSession", "closeSession"]
+
+            # the next borrower gets a new session
+            new_session = await pool.get_session()
+            assert new_session is not session
+            assert server.handler.calls.count("openSession") == 2
+            await pool.put_back(new_session)
+            await pool.close()
+
+    asyncio.run(run())
+
+
+class RecordingTablet(Tablet):
+    def get_binary_values(self):
+        self.thread = threading.current_thread()
+        return super().get_binary_values()
+
+
+def test_async_session_serializes_large_insertions_in_executor(monkeypatch):
+    monkeypatch.setattr(AsyncSession, "EXECUTOR_SERIALIZATION_MIN_ROWS", 10)
+
+    async def run():
+        async with FakeServer() as server:
+            async with AsyncSession("127.0.0.1", server.get_port()) as session:
+                await session.open(False)
+                small, large = (
+                    RecordingTablet(
+                        "root.sg_test_01.d_01",
+                        ["s_01"],
+                        [TSDataType.INT64],
+                        [[i] for i in range(rows)],
+                        list(range(rows)),
+                    )
+                    for rows in (9, 10)
+                )
+                assert await session.insert_tablet(small) == 0
+                assert await session.insert_tablets([large]) == 0
+                assert small.thread is threading.current_thread()
+                assert large.thread is not threading.current_thread()
+                assert server.handler.calls[1:] == [
+                    ("insertTablet", 9),
+                    ("insertTablets", [10]),
+                ]
+
+    asyncio.run(run())
+
+
+def test_async_session_records_auto_convert_tablet():
+    async def run():
+        async with FakeServer() as server:
+            async with AsyncSession(
+                "127.0.0.1", server.get_port(), enable_records_auto_convert_tablet=True
+            ) as session:
+                await session.open(False)
+                args = (
+                    ["root.sg_test_01.d_01"] * 4,
+                    [1, 2, 3, 4],
+                    [["s_01"]] * 4,
+                    [[TSDataType.INT64]] * 4,
+                    [[1], [2], [3], [4]],
+                )
+                assert await session.insert_records(*args) == 0
+                # records of different devices are not worth converting
+                args[0][1:] = [
+                    "root.sg_test_01.d_02",
+                    "root.sg_test_01.d_03",
+                    "root.sg_test_01.d_04",
+                ]
+                assert await session.insert_records(*args) == 0
+                with pytest.raises(RuntimeError):
+                    await session.insert_records(*args[:4], [[1]])
+                assert server.handler.calls[1:] == [
+                    ("insertTablets", [4]),
+                    ("insertRecords", 4),
+                ]
+
+    asyncio.run(run())
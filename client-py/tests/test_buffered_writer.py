@@ -0,0 +1,107 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import threading
+import time
+
+from numpy.testing import assert_array_equal
+
+from iotdb.BufferedWriter import BufferedWriter
+from iotdb.IoTDBContainer import IoTDBContainer
+from iotdb.Session import Session
+from iotdb.utils.IoTDBConstants import TSDataType
+
+
+def test_buffered_writer():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.sg_test_01")
+
+        measurements_ = ["s_01", "s_02"]
+        data_types_ = [TSDataType.INT64, TSDataType.TEXT]
+        with BufferedWriter(session, max_rows=4) as writer:
+            for i in range(10):
+                assert (
+                    writer.insert_record(
+                        "root.sg_test_01.d_0" + str(i % 2),
+                        i,
+                        measurements_,
+                        data_types_,
+                        [i, None if i % 3 == 0 else "text" + str(i)],
+                    )
+                    == 0
+                )
+            # two flushes of 4 rows are done, the remaining rows are written on close
+            assert writer.get_buffered_row_number() == 2
+
+        df = session.execute_query_statement(
+            "select s_01, s_02 from root.sg_test_01.d_00"
+        ).todf()
+        assert_array_equal(df["Time"], [0, 2, 4, 6, 8])
+        assert_array_equal(
+            df["root.sg_test_01.d_00.s_02"], [None, "text2", "text4", None, "text8"]
+        )
+        df = session.execute_query_statement(
+            "select count(s_01) from root.sg_test_01.d_01"
+        ).todf()
+        assert_array_equal(df.values, [[5]])
+
+        session.close()
+
+
+class FakeSession(object):
+    def __init__(self):
+        self.tablets = []
+        self.inserted = threading.Event()
+
+    def insert_tablets(self, tablets):
+        self.tablets.extend(tablets)
+        self.inserted.set()
+        return 0
+
+    def insert_aligned_tablets(self, tablets):
+        return self.insert_tablets(tablets)
+
+
+def test_buffered_writer_counts_text_bytes():
+    session = FakeSession()
+    # 8 bytes of timestamp, 4 bytes of length and 12 utf-8 bytes of the 4 characters
+    writer = BufferedWriter(session, max_bytes=24)
+    writer.insert_record("root.sg.d1", 1, ["s1"], [TSDataType.TEXT], ["温度温度"])
+    assert writer.get_buffered_row_number() == 0
+    assert len(session.tablets) == 1
+    writer.insert_record("root.sg.d1", 2, ["s1"], [TSDataType.TEXT], ["abcd"])
+    assert writer.get_buffered_row_number() == 1
+    writer.close()
+    assert len(session.tablets) == 2
+
+
+def test_buffered_writer_background_flush_waits_for_session_lock():
+    session = FakeSession()
+    writer = BufferedWriter(session, max_latency=0.05)
+    with writer.get_session_lock():
+        writer.insert_record("root.sg.d1", 1, ["s1"], [TSDataType.INT64], [1])
+        # the caller owns the session, the background flush must not use it
+        time.sleep(0.3)
+        assert not session.inserted.is_set()
+        assert writer.get_buffered_row_number() == 1
+    assert session.inserted.wait(5)
+    assert writer.get_buffered_row_number() == 0
+    writer.close()
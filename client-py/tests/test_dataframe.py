@@ -15,6 +15,11 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
 
 from iotdb.Session import Session
 from iotdb.IoTDBContainer import IoTDBContainer
@@ -83,3 +88,109 @@ def test_non_time_query():
             ]
         ],
     )
+
+
+def test_insert_dataframe():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.device0")
+
+        df_input = pd.DataFrame(
+            {
+                "Time": [3, 1, 2],
+                "root.device0.temperature": [21.5, np.nan, 22.0],
+                "root.device0.status": ["ok", "ok", None],
+                "root.device1.count": pd.array([None, 7, 8], dtype="Int32"),
+            }
+        )
+        assert session.insert_dataframe(df_input, max_request_bytes=16) == 0
+
+        df_output = session.execute_query_statement(
+            "SELECT temperature, status FROM root.device0"
+        ).todf()
+        assert_array_equal(df_output["Time"], [1, 2, 3])
+        assert_array_equal(df_output["root.device0.status"].values, ["ok", None, "ok"])
+
+        df_output = session.execute_query_statement(
+            "SELECT count FROM root.device1"
+        ).todf()
+        assert_array_equal(df_output.values, [[1, 7], [2, 8]])
+
+        session.close()
+
+
+def test_insert_dataframe_with_device_column():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.device0")
+
+        df_input = pd.DataFrame(
+            {
+                "timestamp": [1, 1, 2],
+                "device": ["root.device0.a", "root.device0.b", "root.device0.a"],
+                "pressure": [15.0, 16.0, 17.0],
+            }
+        )
+        assert (
+            session.insert_dataframe(
+                df_input, device_column="device", time_column="timestamp"
+            )
+            == 0
+        )
+
+        df_output = session.execute_query_statement(
+            "SELECT pressure FROM root.device0.a, root.device0.b"
+        ).todf()
+        assert_array_equal(
+            df_output[
+                ["Time", "root.device0.a.pressure", "root.device0.b.pressure"]
+            ].values,
+            [[1, 15.0, 16.0], [2, 17.0, np.nan]],
+        )
+
+        session.close()
+
+
+def test_insert_dataframe_with_object_columns():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.device0")
+
+        # object columns without str values are inserted as TEXT of their str()
+        df_input = pd.DataFrame(
+            {
+                "Time": [1, 2, 3],
+                "root.device0.price": [Decimal("1.5"), Decimal("2.25"), None],
+                "root.device0.code": [5, "ab", None],
+            }
+        )
+        assert session.insert_dataframe(df_input, max_request_bytes=16) == 0
+
+        df_output = session.execute_query_statement(
+            "SELECT price, code FROM root.device0"
+        ).todf()
+        assert_array_equal(df_output["Time"], [1, 2])
+        assert_array_equal(df_output["root.device0.price"].values, ["1.5", "2.25"])
+        assert_array_equal(df_output["root.device0.code"].values, ["5", "ab"])
+
+        session.close()
+
+
+def test_insert_dataframe_with_invalid_column_name():
+    df = pd.DataFrame(
+        {"Time": [1, 2], "root.sg_test_01.d_01.s_01": [1, 2], "s_02": [1.5, 2.5]}
+    )
+    session = Session("127.0.0.1", 6667)
+    # the columns are checked before anything is sent
+    with pytest.raises(RuntimeError, match="'s_02'"):
+        session.insert_dataframe(df)
+    with pytest.raises(RuntimeError, match="'root.sg_test_01.'"):
+        session.insert_dataframe(
+            pd.DataFrame({"Time": [1, 2], "root.sg_test_01.": [1, 2]})
+        )
@@ -0,0 +1,74 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import pytest
+
+from iotdb.utils.Field import Field
+from iotdb.utils.IoTDBConstants import TSDataType
+
+GETTERS = {
+    TSDataType.BOOLEAN: Field.get_bool_value,
+    TSDataType.INT32: Field.get_int_value,
+    TSDataType.INT64: Field.get_long_value,
+    TSDataType.FLOAT: Field.get_float_value,
+    TSDataType.DOUBLE: Field.get_double_value,
+    TSDataType.TEXT: Field.get_binary_value,
+}
+
+VALUES = {
+    TSDataType.BOOLEAN: True,
+    TSDataType.INT32: 1,
+    TSDataType.INT64: 2,
+    TSDataType.FLOAT: 3.5,
+    TSDataType.DOUBLE: 4.25,
+    TSDataType.TEXT: "温度".encode("utf-8"),
+}
+
+
+@pytest.mark.parametrize("data_type", list(GETTERS))
+def test_typed_getters(data_type):
+    field = Field.get_field(VALUES[data_type], data_type)
+    for getter_type, getter in GETTERS.items():
+        expected = VALUES[data_type] if getter_type == data_type else None
+        assert getter(field) == expected
+        assert field.get_object_value(getter_type) == expected
+    assert Field.copy(field).get_object_value(data_type) == VALUES[data_type]
+
+
+def test_setters():
+    field = Field(TSDataType.INT64)
+    field.set_long_value(10)
+    assert field.get_long_value() == 10
+    assert field.get_int_value() is None
+    assert str(field) == "10"
+
+    field = Field(TSDataType.TEXT)
+    field.set_binary_value(b"abc")
+    assert field.get_binary_value() == b"abc"
+    assert field.get_string_value() == "abc"
+
+
+def test_null_field():
+    field = Field(None)
+    assert field.is_null()
+    assert field.get_string_value() == "None"
+    assert field.get_object_value(TSDataType.INT64) is None
+    for getter in GETTERS.values():
+        with pytest.raises(Exception):
+            getter(field)
+    assert Field.get_field(None, TSDataType.INT64) is None
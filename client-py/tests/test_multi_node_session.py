@@ -0,0 +1,63 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import socket
+
+import pytest
+
+from iotdb.IoTDBContainer import IoTDBContainer
+from iotdb.Session import Session
+from iotdb.utils.IoTDBConstants import TSDataType
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.parametrize(
+    "node_select_policy",
+    [Session.SELECT_RANDOM, Session.SELECT_ROUND_ROBIN, Session.SELECT_LATENCY],
+)
+def test_multi_node_session(node_select_policy):
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        good_url = "{}:{}".format(db.get_container_host_ip(), db.get_exposed_port(6667))
+        bad_url = "127.0.0.1:{}".format(unused_port())
+        session = Session.init_from_node_urls(
+            [bad_url, good_url], node_select_policy=node_select_policy
+        )
+        session.open(False)
+        assert session.is_open()
+        assert "{}:{}".format(*session.get_endpoint()) == good_url
+
+        session.set_storage_group("root.sg_test_01")
+        assert (
+            session.insert_record(
+                "root.sg_test_01.d_01", 1, ["s_01"], [TSDataType.INT64], [1]
+            )
+            == 0
+        )
+        session.close()
+
+
+def test_no_reachable_node():
+    session = Session.init_from_node_urls(["127.0.0.1:{}".format(unused_port())])
+    with pytest.raises(RuntimeError):
+        session.open(False)
@@ -0,0 +1,135 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import pytest
+
+from iotdb.utils.IoTDBConstants import TSDataType
+from iotdb.utils.MutableTablet import MutableTablet
+from iotdb.utils.Tablet import Tablet
+
+measurements_ = ["s_01", "s_02", "s_03", "s_04", "s_05", "s_06"]
+data_types_ = [
+    TSDataType.BOOLEAN,
+    TSDataType.INT32,
+    TSDataType.INT64,
+    TSDataType.FLOAT,
+    TSDataType.DOUBLE,
+    TSDataType.TEXT,
+]
+
+
+def test_mutable_tablet_serialization():
+    values_ = [
+        [False, 10, 11, 1.1, 10011.1, "test01"],
+        [True, None, 11111, 1.25, None, "test02"],
+        [None, 100, 1, 188.1, 688.25, None],
+    ]
+    timestamps_ = [18, 16, 17]
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, values_, timestamps_
+    )
+    mutable_tablet_ = MutableTablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, 4
+    )
+    for timestamp, values in zip(timestamps_, values_):
+        mutable_tablet_.add_row(timestamp, values)
+    assert mutable_tablet_.get_row_number() == 3
+    assert tablet_.get_binary_timestamps() == mutable_tablet_.get_binary_timestamps()
+    assert tablet_.get_binary_values() == mutable_tablet_.get_binary_values()
+
+
+def test_mutable_tablet_reuse():
+    mutable_tablet_ = MutableTablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, 2
+    )
+    for timestamp in range(2):
+        mutable_tablet_.add_row(timestamp, [True, 1, 2, 3.0, 4.0, "test01"])
+    assert mutable_tablet_.is_full()
+    mutable_tablet_.reset()
+    assert mutable_tablet_.get_row_number() == 0
+
+    # cells without a value are empty
+    mutable_tablet_.add_timestamp(0, 5)
+    mutable_tablet_.add_value("s_02", 0, 100)
+    mutable_tablet_.add_timestamp(1, 6)
+    mutable_tablet_.add_value(5, 1, "test02")
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01",
+        measurements_,
+        data_types_,
+        [
+            [None, 100, None, None, None, None],
+            [None, None, None, None, None, "test02"],
+        ],
+        [5, 6],
+    )
+    assert tablet_.get_binary_timestamps() == mutable_tablet_.get_binary_timestamps()
+    assert tablet_.get_binary_values() == mutable_tablet_.get_binary_values()
+
+
+def test_mutable_tablet_rows_can_not_be_skipped():
+    mutable_tablet_ = MutableTablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, 4
+    )
+    # a skipped row would be sent with the timestamp left in the array
+    with pytest.raises(RuntimeError):
+        mutable_tablet_.add_timestamp(1, 5)
+    with pytest.raises(RuntimeError):
+        mutable_tablet_.add_value("s_02", 1, 100)
+    # the next row may get its values before its timestamp
+    mutable_tablet_.add_value("s_02", 0, 100)
+    assert mutable_tablet_.get_row_number() == 0
+    mutable_tablet_.add_timestamp(0, 5)
+    mutable_tablet_.add_timestamp(0, 6)
+    assert mutable_tablet_.get_row_number() == 1
+    mutable_tablet_.add_value("s_02", 1, 200)
+    mutable_tablet_.reset()
+
+    # values given to the next row are cleared by reset too
+    mutable_tablet_.add_timestamp(0, 7)
+    mutable_tablet_.add_timestamp(1, 8)
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01",
+        measurements_,
+        data_types_,
+        [[None] * 6, [None] * 6],
+        [7, 8],
+    )
+    assert tablet_.get_binary_timestamps() == mutable_tablet_.get_binary_timestamps()
+    assert tablet_.get_binary_values() == mutable_tablet_.get_binary_values()
+
+
+def test_mutable_tablet_unsorted_rows():
+    values_ = [
+        [True, 10, None, 1.5, 2.5, "test01"],
+        [None, 20, 21, 3.5, None, "测试02"],
+        [False, None, 31, None, 4.5, None],
+    ]
+    timestamps_ = [3, 1, 2]
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, values_, timestamps_
+    )
+    mutable_tablet_ = MutableTablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, 3
+    )
+    for timestamp, values in zip(timestamps_, values_):
+        mutable_tablet_.add_row(timestamp, values)
+    assert tablet_.get_binary_timestamps() == mutable_tablet_.get_binary_timestamps()
+    assert tablet_.get_binary_values() == mutable_tablet_.get_binary_values()
+    # the rows are sorted for serialization only, the buffers keep the order they were added in
+    assert mutable_tablet_.get_timestamps().tolist() == timestamps_
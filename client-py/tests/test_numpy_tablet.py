@@ -17,6 +17,7 @@
 #
 
 import numpy as np
+import pandas as pd
 from iotdb.utils.IoTDBConstants import TSDataType
 from iotdb.utils.NumpyTablet import NumpyTablet
 from iotdb.utils.Tablet import Tablet
@@ -145,3 +146,156 @@ def test_numpy_tablet_auto_correct_datatype():
     )
     assert tablet_.get_binary_timestamps() == np_tablet_.get_binary_timestamps()
     assert tablet_.get_binary_values() == np_tablet_.get_binary_values()
+
+
+def test_nullable_numpy_tablet_serialization():
+
+    measurements_ = ["s_01", "s_02", "s_03", "s_04", "s_05", "s_06"]
+    data_types_ = [
+        TSDataType.BOOLEAN,
+        TSDataType.INT32,
+        TSDataType.INT64,
+        TSDataType.FLOAT,
+        TSDataType.DOUBLE,
+        TSDataType.TEXT,
+    ]
+    values_ = [
+        [None, 10, 11, 1.1, 10011.1, "test01"],
+        [True, None, 11111, 1.25, 101.0, "test02"],
+        [False, 100, 1, None, 688.25, None],
+        [True, 0, 0, 0, 6.25, "test04"],
+        [None, None, None, None, None, None],
+        [False, 7, 77, 7.5, 7.25, "test06"],
+        [True, 8, 88, 8.5, 8.25, "test07"],
+        [False, 9, None, 9.5, 9.25, "test08"],
+        [True, 10, 1010, 10.5, 10.25, "test09"],
+    ]
+    timestamps_ = [16, 17, 18, 19, 20, 21, 22, 23, 24]
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, values_, timestamps_
+    )
+    np_values_ = [
+        np.ma.masked_array(
+            [False, True, False, True, False, False, True, False, True],
+            mask=[True, False, False, False, True, False, False, False, False],
+        ),
+        pd.array([10, None, 100, 0, None, 7, 8, 9, 10], dtype="Int32"),
+        pd.Series([11, 11111, 1, 0, None, 77, 88, None, 1010], dtype="Int64"),
+        np.array([1.1, 1.25, 0, 0, 0, 7.5, 8.5, 9.5, 10.5]),
+        np.array([10011.1, 101.0, 688.25, 6.25, 0, 7.25, 8.25, 9.25, 10.25]),
+        np.array(
+            [
+                "test01",
+                "test02",
+                None,
+                "test04",
+                None,
+                "test06",
+                "test07",
+                "test08",
+                "test09",
+            ],
+            dtype=object,
+        ),
+    ]
+    np_bitmaps_ = [None, None, None, None, None, None]
+    np_bitmaps_[3] = np.array([False, False, True, False, True] + [False] * 4)
+    np_timestamps_ = np.array([16, 17, 18, 19, 20, 21, 22, 23, 24])
+    np_tablet_ = NumpyTablet(
+        "root.sg_test_01.d_01",
+        measurements_,
+        data_types_,
+        np_values_,
+        np_timestamps_,
+        np_bitmaps_,
+    )
+    np_tablet_.mark_none_value(4, 4)
+    assert tablet_.get_binary_timestamps() == np_tablet_.get_binary_timestamps()
+    assert tablet_.get_binary_values() == np_tablet_.get_binary_values()
+
+
+def test_numpy_tablet_text_encoding():
+
+    measurements_ = ["s_01", "s_02", "s_03", "s_04"]
+    data_types_ = [TSDataType.TEXT] * 4
+    texts_ = ["test01", "", "温度 23.5℃", "Grüße"]
+    values_ = [[text] * 4 for text in texts_]
+    timestamps_ = [16, 17, 18, 19]
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, values_, timestamps_
+    )
+    np_values_ = [
+        np.array(texts_),
+        np.array(texts_, dtype=object),
+        np.array([text.encode("utf-8") for text in texts_]),
+        np.array([text.encode("utf-8") for text in texts_], dtype=object),
+    ]
+    np_timestamps_ = np.array(timestamps_, TSDataType.INT64.np_dtype())
+    np_tablet_ = NumpyTablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, np_values_, np_timestamps_
+    )
+    assert tablet_.get_binary_values() == np_tablet_.get_binary_values()
+
+
+def test_numpy_tablet_keeps_input_arrays():
+
+    measurements_ = ["s_01", "s_02", "s_03"]
+    data_types_ = [TSDataType.INT32, TSDataType.DOUBLE, TSDataType.TEXT]
+    np_values_ = [
+        np.array([3, 2, 1], np.int32),
+        np.array([3.5, 2.5, 1.5], np.float64),
+        np.array(["test03", "test02", "test01"]),
+    ]
+    np_timestamps_ = np.array([3, 2, 1], np.int64)
+    input_values = list(np_values_)
+    np_tablet_ = NumpyTablet(
+        "root.sg_test_01.d_01",
+        measurements_,
+        data_types_,
+        input_values,
+        np_timestamps_,
+    )
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01",
+        measurements_,
+        data_types_,
+        [[1, 1.5, "test01"], [2, 2.5, "test02"], [3, 3.5, "test03"]],
+        [1, 2, 3],
+    )
+    assert tablet_.get_binary_timestamps() == np_tablet_.get_binary_timestamps()
+    assert tablet_.get_binary_values() == np_tablet_.get_binary_values()
+    # the getters return the big-endian dtypes, and the input is not modified
+    assert np_tablet_.get_timestamps().dtype == TSDataType.INT64.np_dtype()
+    assert np_tablet_.get_timestamps().tolist() == [1, 2, 3]
+    assert [value.dtype for value in np_tablet_.get_values()[:2]] == [
+        TSDataType.INT32.np_dtype(),
+        TSDataType.DOUBLE.np_dtype(),
+    ]
+    assert np_tablet_.get_values()[1].tolist() == [1.5, 2.5, 3.5]
+    assert all(x is y for x, y in zip(input_values, np_values_))
+    assert np_timestamps_.tolist() == [3, 2, 1]
+    assert np_values_[0].tolist() == [3, 2, 1]
+
+
+def test_numpy_tablet_mixed_object_column():
+
+    measurements_ = ["s_01"]
+    data_types_ = [TSDataType.TEXT]
+    timestamps_ = [1, 2, 3, 4]
+    np_values_ = [np.array([5, "温度", b"abc", 2.5], dtype=object)]
+    np_tablet_ = NumpyTablet(
+        "root.sg_test_01.d_01",
+        measurements_,
+        data_types_,
+        np_values_,
+        np.array(timestamps_, TSDataType.INT64.np_dtype()),
+    )
+    # values other than str / bytes are written as their str(), not as bytes(value)
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01",
+        measurements_,
+        data_types_,
+        [["5"], ["温度"], ["abc"], ["2.5"]],
+        timestamps_,
+    )
+    assert tablet_.get_binary_values() == np_tablet_.get_binary_values()
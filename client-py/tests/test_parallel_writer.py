@@ -0,0 +1,138 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import threading
+import time
+
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+import iotdb.ParallelWriter
+from iotdb.IoTDBContainer import IoTDBContainer
+from iotdb.ParallelWriter import ParallelWriter
+from iotdb.Session import Session
+from iotdb.utils.IoTDBConstants import TSDataType
+from iotdb.utils.NumpyTablet import NumpyTablet
+
+
+def test_parallel_writer():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        host = db.get_container_host_ip()
+        port = db.get_exposed_port(6667)
+        session = Session(host, port)
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.sg_test_01")
+
+        tablets = []
+        for i in range(10):
+            tablets.append(
+                NumpyTablet(
+                    "root.sg_test_01.d_0" + str(i),
+                    ["s_01"],
+                    [TSDataType.INT64],
+                    [np.arange(100, dtype=np.int64)],
+                    np.arange(100, dtype=np.int64),
+                )
+            )
+        with ParallelWriter([(host, port)], 3) as writer:
+            writer.open(False)
+            assert writer.submit(tablets) == (0, [])
+            assert writer.submit(tablets, tablets_per_request=2) == (0, [])
+
+        df = session.execute_query_statement(
+            "select count(s_01) from root.sg_test_01.**"
+        ).todf()
+        assert_array_equal(df.values, [[100] * 10])
+
+        session.close()
+
+
+class FakeSession(object):
+    """
+    records its calls, fails when two threads use it at once like a real session would break
+    """
+
+    instances = []
+
+    def __init__(self, host, port, *args):
+        self.port = port
+        self.in_use = threading.Lock()
+        self.overlaps = 0
+        self.tablets = []
+        self.is_open = False
+        FakeSession.instances.append(self)
+
+    def open(self, enable_rpc_compression):
+        if self.port == 0:
+            raise RuntimeError("Can not connect to any node")
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def insert_tablet(self, tablet):
+        if not self.in_use.acquire(blocking=False):
+            self.overlaps += 1
+            return -1
+        try:
+            time.sleep(0.001)
+            self.tablets.append(tablet)
+        finally:
+            self.in_use.release()
+        return 0
+
+
+@pytest.fixture
+def fake_sessions(monkeypatch):
+    FakeSession.instances = []
+    monkeypatch.setattr(iotdb.ParallelWriter, "Session", FakeSession)
+    return FakeSession.instances
+
+
+def test_parallel_writer_concurrent_submits(fake_sessions):
+    def submit(writer, results):
+        # a single tablet always goes to the first session
+        for i in range(10):
+            results.append(writer.submit([i]))
+
+    with ParallelWriter(["127.0.0.1:6667"], 2) as writer:
+        writer.open(False)
+        results = []
+        threads = [
+            threading.Thread(target=submit, args=(writer, results)) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results == [(0, [])] * 40
+    assert [session.overlaps for session in fake_sessions] == [0, 0]
+    assert len(fake_sessions[0].tablets) == 40
+    assert not any(session.is_open for session in fake_sessions)
+
+
+def test_parallel_writer_open_failure_closes_sessions(fake_sessions):
+    writer = ParallelWriter(["127.0.0.1:6667", "127.0.0.1:0"], 4)
+    with pytest.raises(RuntimeError):
+        writer.open(False)
+    assert fake_sessions[0].port == 6667
+    assert not any(session.is_open for session in fake_sessions)
+    with pytest.raises(RuntimeError, match="not opened"):
+        writer.submit([])
@@ -0,0 +1,388 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import itertools
+import struct
+import types
+
+from thrift.transport import TTransport
+
+import iotdb.Session
+from iotdb.IoTDBContainer import IoTDBContainer
+from iotdb.Session import Session
+from iotdb.thrift.common.ttypes import TEndPoint, TSStatus
+from iotdb.thrift.rpc.ttypes import (
+    TSExecuteStatementResp,
+    TSFetchResultsResp,
+    TSOpenSessionResp,
+    TSQueryDataSet,
+)
+from iotdb.utils.IoTDBConstants import TSDataType
+from iotdb.utils.Tablet import Tablet
+
+
+def test_verify_success_with_redirection():
+    end_point = TEndPoint("127.0.0.1", 6668)
+    assert Session.verify_success(TSStatus(Session.SUCCESS_CODE)) == 0
+    assert (
+        Session.verify_success(
+            TSStatus(Session.NEED_REDIRECTION_CODE, redirectNode=end_point)
+        )
+        == 0
+    )
+    assert (
+        Session.verify_success(
+            TSStatus(
+                Session.MULTIPLE_ERROR_CODE,
+                subStatus=[
+                    TSStatus(Session.SUCCESS_CODE),
+                    TSStatus(Session.NEED_REDIRECTION_CODE, redirectNode=end_point),
+                ],
+            )
+        )
+        == 0
+    )
+    assert (
+        Session.verify_success(
+            TSStatus(
+                Session.MULTIPLE_ERROR_CODE,
+                subStatus=[TSStatus(Session.SUCCESS_CODE), TSStatus(500)],
+            )
+        )
+        == -1
+    )
+
+
+def test_query_redirection():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(
+            db.get_container_host_ip(),
+            db.get_exposed_port(6667),
+            enable_query_redirection=True,
+        )
+        session.open(False)
+        session.set_storage_group("root.sg_test_01")
+        session.insert_record(
+            "root.sg_test_01.d_01", 1, ["s_01"], [TSDataType.INT64], [1]
+        )
+
+        # a single node never redirects, the query runs where it was sent
+        session_data_set = session.execute_raw_data_query(
+            ["root.sg_test_01.d_01.s_01"], 0, 10
+        )
+        assert session_data_set.next().get_fields()[0].get_long_value() == 1
+        session_data_set.close_operation_handle()
+        session_data_set = session.execute_last_data_query(
+            ["root.sg_test_01.d_01.s_01"], 0
+        )
+        assert session_data_set.has_next()
+        session_data_set.close_operation_handle()
+        session.close()
+
+
+class FakeCluster(object):
+    """
+    nodes answering the rpcs of Session in memory, a node redirects the insertions of the devices it does not own
+    """
+
+    # node states are shared by all sessions of the process, every cluster gets its own hosts
+    __ids = itertools.count()
+
+    def __init__(self, monkeypatch, owners, query_owner="a"):
+        """
+        :param owners: dict, device -> name of the node owning it
+        :param query_owner: String, name of the node queries are redirected to
+        """
+        self.__id = next(FakeCluster.__ids)
+        self.owners = {
+            device: self.endpoint(name) if name != "unknown" else ("0.0.0.0", 6667)
+            for device, name in owners.items()
+        }
+        self.down = set()
+        self.connects = []
+        self.timeouts = {}
+        # (endpoint, rpc name, devices) of every insertion
+        self.inserts = []
+        self.query_owner = self.endpoint(query_owner)
+        # (endpoint, rpc name, query id or enableRedirectQuery) of every query rpc
+        self.queries = []
+        self.query_ids = itertools.count(1)
+        cluster = self
+
+        class FakeSocket(object):
+            def __init__(self, host, port):
+                self.endpoint = (host, port)
+                self.timeout = None
+
+            def setTimeout(self, ms):
+                self.timeout = ms
+                cluster.timeouts.setdefault(self.endpoint, []).append(ms)
+
+            def isOpen(self):
+                return False
+
+            def open(self):
+                cluster.connects.append(self.endpoint)
+                if self.endpoint in cluster.down:
+                    raise TTransport.TTransportException(message="connection refused")
+
+            def close(self):
+                pass
+
+        monkeypatch.setattr(
+            iotdb.Session, "TSocket", types.SimpleNamespace(TSocket=FakeSocket)
+        )
+        monkeypatch.setattr(
+            iotdb.Session.TTransport, "TFramedTransport", lambda socket: socket
+        )
+        monkeypatch.setattr(
+            iotdb.Session,
+            "Client",
+            lambda protocol: FakeClient(cluster, protocol.trans.endpoint),
+        )
+
+    def endpoint(self, name):
+        return "{}.{}".format(name, self.__id), 6667
+
+    def session(self, name="a", **kwargs):
+        session = Session(*self.endpoint(name), **kwargs)
+        session.open(False)
+        return session
+
+
+class FakeClient(object):
+    def __init__(self, cluster, endpoint):
+        self.cluster = cluster
+        self.endpoint = endpoint
+
+    def openSession(self, request):
+        return TSOpenSessionResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            serverProtocolVersion=request.client_protocol,
+            sessionId=1,
+        )
+
+    def requestStatementId(self, session_id):
+        return 1
+
+    def setTimeZone(self, request):
+        return TSStatus(Session.SUCCESS_CODE, "")
+
+    def closeSession(self, request):
+        pass
+
+    def __check_connection(self):
+        if self.endpoint in self.cluster.down:
+            raise TTransport.TTransportException(message="connection reset")
+
+    def __status(self, device):
+        owner = self.cluster.owners.get(device, self.endpoint)
+        if owner == self.endpoint:
+            return TSStatus(Session.SUCCESS_CODE)
+        return TSStatus(Session.NEED_REDIRECTION_CODE, redirectNode=TEndPoint(*owner))
+
+    def __insert(self, rpc_name, devices):
+        self.__check_connection()
+        self.cluster.inserts.append((self.endpoint, rpc_name, list(devices)))
+        statuses = [self.__status(device) for device in devices]
+        if len(statuses) == 1:
+            return statuses[0]
+        if all(status.code == Session.SUCCESS_CODE for status in statuses):
+            return TSStatus(Session.SUCCESS_CODE)
+        return TSStatus(Session.MULTIPLE_ERROR_CODE, subStatus=statuses)
+
+    def insertRecord(self, request):
+        return self.__insert("insertRecord", [request.prefixPath])
+
+    def insertRecords(self, request):
+        return self.__insert("insertRecords", request.prefixPaths)
+
+    def insertTablet(self, request):
+        return self.__insert("insertTablet", [request.prefixPath])
+
+    def insertTablets(self, request):
+        return self.__insert("insertTablets", request.prefixPaths)
+
+    def executeQueryStatement(self, request):
+        self.__check_connection()
+        self.cluster.queries.append(
+            (self.endpoint, "executeQueryStatement", request.enableRedirectQuery)
+        )
+        query_id = next(self.cluster.query_ids)
+        if request.enableRedirectQuery and self.endpoint != self.cluster.query_owner:
+            return TSExecuteStatementResp(
+                status=TSStatus(
+                    Session.NEED_REDIRECTION_CODE,
+                    redirectNode=TEndPoint(*self.cluster.query_owner),
+                ),
+                queryId=query_id,
+            )
+        return TSExecuteStatementResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            queryId=query_id,
+            columns=["root.sg.d1.s_01"],
+            ignoreTimeStamp=False,
+            dataTypeList=["INT64"],
+            queryDataSet=query_data_set([1, 2, 3]),
+            columnNameIndexMap={"root.sg.d1.s_01": 0},
+        )
+
+    def fetchResults(self, request):
+        self.__check_connection()
+        self.cluster.queries.append((self.endpoint, "fetchResults", request.queryId))
+        fetches = len(
+            [query for query in self.cluster.queries if query[1] == "fetchResults"]
+        )
+        if fetches > 1:
+            return TSFetchResultsResp(
+                status=TSStatus(Session.SUCCESS_CODE), hasResultSet=False
+            )
+        return TSFetchResultsResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            hasResultSet=True,
+            queryDataSet=query_data_set([4]),
+        )
+
+    def closeOperation(self, request):
+        self.cluster.queries.append((self.endpoint, "closeOperation", request.queryId))
+        return TSStatus(Session.SUCCESS_CODE)
+
+
+def query_data_set(times):
+    """
+    one INT64 column without nulls, valued like the timestamps
+    """
+    packed = b"".join(struct.pack(">q", t) for t in times)
+    return TSQueryDataSet(
+        time=packed, valueList=[packed], bitmapList=[b"\xff" * (len(times) // 8 + 1)]
+    )
+
+
+def insert_record(session, device, timestamp=1):
+    return session.insert_record(device, timestamp, ["s_01"], [TSDataType.INT64], [1])
+
+
+def test_insert_redirection_routes_devices(monkeypatch):
+    cluster = FakeCluster(monkeypatch, {"root.sg.d1": "b", "root.sg.d2": "c"})
+    a, b, c = (cluster.endpoint(name) for name in "abc")
+    session = cluster.session()
+
+    # the first insertion is redirected, the next ones go to the owner directly
+    assert insert_record(session, "root.sg.d1") == 0
+    assert insert_record(session, "root.sg.d1") == 0
+    assert cluster.inserts == [
+        (a, "insertRecord", ["root.sg.d1"]),
+        (b, "insertRecord", ["root.sg.d1"]),
+    ]
+
+    # a batch is split into one request per node, in the order of the devices
+    cluster.inserts.clear()
+    tablets = [
+        Tablet(device, ["s_01"], [TSDataType.INT64], [[1]], [1])
+        for device in ["root.sg.d0", "root.sg.d1", "root.sg.d2", "root.sg.d1"]
+    ]
+    assert session.insert_tablets(tablets) == 0
+    assert session.insert_tablets(tablets) == 0
+    assert cluster.inserts == [
+        (a, "insertTablets", ["root.sg.d0", "root.sg.d2"]),
+        (b, "insertTablets", ["root.sg.d1", "root.sg.d1"]),
+        (a, "insertTablets", ["root.sg.d0"]),
+        (b, "insertTablets", ["root.sg.d1", "root.sg.d1"]),
+        (c, "insertTablets", ["root.sg.d2"]),
+    ]
+
+    # redirected nodes are connected with a timeout, only while the session is opened
+    assert cluster.timeouts[a] == [None, None]
+    assert cluster.timeouts[b] == [Session.REDIRECTION_CONNECTION_TIMEOUT_IN_MS, None]
+    session.close()
+
+
+def test_insert_redirection_falls_back_to_default_connection(monkeypatch):
+    cluster = FakeCluster(monkeypatch, {"root.sg.d1": "b"})
+    a, b = cluster.endpoint("a"), cluster.endpoint("b")
+    session = cluster.session()
+    insert_record(session, "root.sg.d1")
+    insert_record(session, "root.sg.d1")
+    assert cluster.inserts[-1][0] == b
+
+    # the owner goes down, the insertion is sent through the default connection instead
+    cluster.down.add(b)
+    cluster.inserts.clear()
+    assert insert_record(session, "root.sg.d1") == 0
+    assert cluster.inserts == [(a, "insertRecord", ["root.sg.d1"])]
+
+    # the node that failed is not connected to again while it cools down
+    connects = len(cluster.connects)
+    for timestamp in range(2, 5):
+        assert insert_record(session, "root.sg.d1", timestamp) == 0
+    assert len(cluster.connects) == connects
+    assert [endpoint for endpoint, _, _ in cluster.inserts] == [a] * 4
+    session.close()
+
+
+def test_insert_redirection_to_unknown_node(monkeypatch):
+    cluster = FakeCluster(monkeypatch, {"root.sg.d1": "unknown"})
+    a = cluster.endpoint("a")
+    session = cluster.session()
+    for timestamp in range(3):
+        assert insert_record(session, "root.sg.d1", timestamp) == 0
+    assert cluster.connects == [a]
+    assert [endpoint for endpoint, _, _ in cluster.inserts] == [a] * 3
+    session.close()
+
+
+def test_query_redirection_to_owner(monkeypatch):
+    cluster = FakeCluster(monkeypatch, {}, query_owner="b")
+    a, b = cluster.endpoint("a"), cluster.endpoint("b")
+    session = cluster.session(enable_query_redirection=True)
+
+    session_data_set = session.execute_query_statement("select s_01 from root.sg.d1")
+    timestamps = []
+    while session_data_set.has_next():
+        timestamps.append(session_data_set.next().get_timestamp())
+    session_data_set.close_operation_handle()
+    assert timestamps == [1, 2, 3, 4]
+    # the query of the first node is closed, the query runs again on the owner, which serves the fetches
+    assert cluster.queries == [
+        (a, "executeQueryStatement", True),
+        (a, "closeOperation", 1),
+        (b, "executeQueryStatement", False),
+        (b, "fetchResults", 2),
+        (b, "fetchResults", 2),
+        (b, "closeOperation", 2),
+    ]
+    session.close()
+
+
+def test_query_redirection_falls_back_to_default_connection(monkeypatch):
+    cluster = FakeCluster(monkeypatch, {}, query_owner="b")
+    a, b = cluster.endpoint("a"), cluster.endpoint("b")
+    cluster.down.add(b)
+    session = cluster.session(enable_query_redirection=True)
+
+    session_data_set = session.execute_query_statement("select s_01 from root.sg.d1")
+    assert session_data_set.next().get_timestamp() == 1
+    session_data_set.close_operation_handle()
+    assert cluster.queries == [
+        (a, "executeQueryStatement", True),
+        (a, "closeOperation", 1),
+        (a, "executeQueryStatement", False),
+        (a, "closeOperation", 2),
+    ]
+    session.close()
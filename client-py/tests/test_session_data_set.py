@@ -0,0 +1,348 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import gc
+import struct
+import threading
+import time
+import types
+
+from thrift.transport import TTransport
+
+import iotdb.Session
+from iotdb.Session import Session
+from iotdb.thrift.common.ttypes import TSStatus
+from iotdb.thrift.rpc.ttypes import (
+    TSExecuteStatementResp,
+    TSFetchResultsResp,
+    TSOpenSessionResp,
+    TSQueryDataSet,
+)
+from iotdb.utils.IoTDBConstants import TSDataType
+from iotdb.utils.IoTDBRpcDataSet import IoTDBRpcDataSet
+from iotdb.utils.SessionDataSet import SessionDataSet
+
+
+def encode_value(value, data_type):
+    if data_type == "TEXT":
+        value = value.encode("utf-8")
+        return struct.pack(">i", len(value)) + value
+    return struct.pack({"INT64": ">q", "DOUBLE": ">d"}[data_type], value)
+
+
+def encode_query_data_set(times, columns, data_types):
+    """
+    serialize the columns like the server, None for null values
+    """
+    value_list = []
+    bitmap_list = []
+    for column, data_type in zip(columns, data_types):
+        bitmap = bytearray(len(times) // 8 + 1)
+        values = []
+        for i, value in enumerate(column):
+            if value is not None:
+                bitmap[i // 8] |= 0x80 >> (i % 8)
+                values.append(encode_value(value, data_type))
+        value_list.append(b"".join(values))
+        bitmap_list.append(bytes(bitmap))
+    return TSQueryDataSet(
+        time=b"".join(struct.pack(">q", t) for t in times),
+        valueList=value_list,
+        bitmapList=bitmap_list,
+    )
+
+
+class FakeClient(object):
+    def __init__(self, fetches):
+        self.fetches = list(fetches)
+        self.requests = []
+
+    def fetchResults(self, request):
+        self.requests.append(request)
+        if not self.fetches:
+            return TSFetchResultsResp(hasResultSet=False, queryDataSet=None)
+        return TSFetchResultsResp(hasResultSet=True, queryDataSet=self.fetches.pop(0))
+
+    def closeOperation(self, request):
+        return FakeStatus()
+
+
+class FakeStatus(object):
+    code = 200
+    message = ""
+
+
+def make_data_set(batches, data_types=("INT64",), fetch_size=3):
+    fetches = [
+        encode_query_data_set(times, columns, data_types) for times, columns in batches
+    ]
+    client = FakeClient(fetches[1:])
+    data_set = SessionDataSet(
+        "select * from root.d",
+        ["root.d.s{}".format(i) for i in range(len(data_types))],
+        list(data_types),
+        None,
+        1,
+        client,
+        1,
+        1,
+        fetches[0],
+        False,
+        fetch_size,
+    )
+    return data_set, client
+
+
+BATCHES = [
+    ([1, 2, 3], [[10, None, 30]]),
+    ([4, 5, 6], [[40, 50, None]]),
+    ([7], [[70]]),
+]
+
+
+def test_drain_multi_fetch():
+    data_set, client = make_data_set(BATCHES)
+    rows = []
+    while data_set.has_next():
+        rows.append(data_set.next())
+    # the last fetch reports no more rows, it must not replay the previous one
+    assert len(rows) == 7
+    assert [row.get_timestamp() for row in rows] == list(range(1, 8))
+    assert not data_set.has_next()
+    assert data_set.next() is None
+    assert len(client.requests) == 3
+
+
+def test_fetch_rows():
+    batches = [
+        (
+            list(range(10)),
+            [
+                [None if i % 3 == 0 else i for i in range(10)],
+                [None if i % 4 == 0 else "温度{}".format(i) for i in range(10)],
+                [i / 2 for i in range(10)],
+            ],
+        ),
+        ([10, 11], [[None, 11], ["", None], [5.0, None]]),
+    ]
+    data_set, _ = make_data_set(batches, ("INT64", "TEXT", "DOUBLE"))
+    # mix the row reader and the batch reader on one result set
+    first = data_set.next()
+    assert first.get_timestamp() == 0
+    rows = data_set.fetch_rows(7) + data_set.fetch_rows(100)
+    expected = []
+    for times, columns in batches:
+        expected.extend(zip(times, *columns))
+    assert rows == expected[1:]
+    assert data_set.fetch_rows(1) == []
+
+
+def many_batches(count):
+    return [([3 * i, 3 * i + 1, 3 * i + 2], [[i, None, i]]) for i in range(count)]
+
+
+def test_prefetch_thread_stops_when_data_set_is_dropped():
+    data_set, _ = make_data_set(many_batches(20))
+    data_set.set_prefetch_depth(1)
+    assert data_set.fetch_rows(4)
+    prefetch_threads = [
+        thread
+        for thread in threading.enumerate()
+        if thread.name.startswith("IoTDBRpcDataSet-prefetch-")
+    ]
+    assert prefetch_threads
+    del data_set
+    gc.collect()
+    for thread in prefetch_threads:
+        thread.join(5)
+        assert not thread.is_alive()
+
+
+def test_prefetch_thread_gives_up_on_idle_consumer(monkeypatch):
+    monkeypatch.setattr(IoTDBRpcDataSet, "PREFETCH_PUT_TIMEOUT_IN_SECONDS", 0.2)
+    data_set, client = make_data_set(many_batches(5))
+    data_set.set_prefetch_depth(1)
+    rows = data_set.fetch_rows(4)
+    # the queue is full and nobody consumes, the thread stops and keeps its response
+    time.sleep(1)
+    assert not any(
+        thread.name.startswith("IoTDBRpcDataSet-prefetch-") and thread.is_alive()
+        for thread in threading.enumerate()
+    )
+    rows += data_set.fetch_rows(100)
+    assert [row[0] for row in rows] == list(range(15))
+    data_set.close_operation_handle()
+
+
+def test_fetch_size_is_passed_to_fetch_requests():
+    data_set, client = make_data_set(many_batches(4), fetch_size=7)
+    assert data_set.get_fetch_size() == 7
+    assert len(data_set.fetch_rows(4)) == 4
+    data_set.set_fetch_size(11)
+    assert len(data_set.fetch_rows(100)) == 8
+    assert [request.fetchSize for request in client.requests] == [7, 11, 11, 11]
+
+
+def wide_batches(count, width):
+    return [
+        (
+            [3 * i, 3 * i + 1, 3 * i + 2],
+            [["x" * width * (i % 3 + 1), None, "y" * width]],
+        )
+        for i in range(count)
+    ]
+
+
+def test_adaptive_fetch_size_stays_within_bounds():
+    # a large target lets the fetch size grow, but never above max_fetch_size
+    data_set, client = make_data_set(wide_batches(10, 10), ("TEXT",), fetch_size=4)
+    data_set.set_adaptive_fetch_size(1024 * 1024, min_fetch_size=2, max_fetch_size=50)
+    assert len(data_set.fetch_rows(100)) == 30
+    fetch_sizes = [request.fetchSize for request in client.requests]
+    assert all(2 <= fetch_size <= 50 for fetch_size in fetch_sizes)
+    assert fetch_sizes[0] == 4
+    assert fetch_sizes[-1] == 50
+
+    # a target below one row shrinks the fetch size, but never below min_fetch_size
+    data_set, client = make_data_set(wide_batches(10, 1000), ("TEXT",), fetch_size=40)
+    data_set.set_adaptive_fetch_size(100, min_fetch_size=3, max_fetch_size=50)
+    assert len(data_set.fetch_rows(100)) == 30
+    fetch_sizes = [request.fetchSize for request in client.requests]
+    assert all(3 <= fetch_size <= 50 for fetch_size in fetch_sizes)
+    assert fetch_sizes[-1] == 3
+
+
+def test_adaptive_fetch_size_with_prefetching():
+    data_set, client = make_data_set(wide_batches(20, 100), ("TEXT",), fetch_size=5)
+    data_set.set_adaptive_fetch_size(4096, min_fetch_size=2, max_fetch_size=8)
+    data_set.set_prefetch_depth(2)
+    assert len(data_set.fetch_rows(1000)) == 60
+    fetch_sizes = [request.fetchSize for request in client.requests]
+    assert all(2 <= fetch_size <= 8 for fetch_size in fetch_sizes)
+    assert 2 <= data_set.get_fetch_size() <= 8
+
+
+class ConnectionClient(object):
+    """
+    a client on one connection, a request sent before the previous one is answered fails like interleaved frames
+    """
+
+    def __init__(self, batches):
+        self.fetches = [
+            encode_query_data_set(times, columns, ("INT64",))
+            for times, columns in batches
+        ]
+        self.in_flight = threading.Lock()
+        self.interleaved = 0
+        self.inserts = 0
+
+    def __rpc(self, delay=0):
+        if not self.in_flight.acquire(blocking=False):
+            self.interleaved += 1
+            raise TTransport.TTransportException(message="frames interleaved")
+        try:
+            time.sleep(delay)
+        finally:
+            self.in_flight.release()
+
+    def openSession(self, request):
+        self.__rpc()
+        return TSOpenSessionResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            serverProtocolVersion=request.client_protocol,
+            sessionId=1,
+        )
+
+    def requestStatementId(self, session_id):
+        self.__rpc()
+        return 1
+
+    def setTimeZone(self, request):
+        self.__rpc()
+        return TSStatus(Session.SUCCESS_CODE, "")
+
+    def executeQueryStatement(self, request):
+        self.__rpc()
+        return TSExecuteStatementResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            queryId=1,
+            columns=["root.d.s0"],
+            ignoreTimeStamp=False,
+            dataTypeList=["INT64"],
+            queryDataSet=self.fetches.pop(0),
+            columnNameIndexMap={"root.d.s0": 0},
+        )
+
+    def fetchResults(self, request):
+        self.__rpc(0.01)
+        if not self.fetches:
+            return TSFetchResultsResp(
+                status=TSStatus(Session.SUCCESS_CODE), hasResultSet=False
+            )
+        return TSFetchResultsResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            hasResultSet=True,
+            queryDataSet=self.fetches.pop(0),
+        )
+
+    def insertRecord(self, request):
+        self.__rpc(0.001)
+        self.inserts += 1
+        return TSStatus(Session.SUCCESS_CODE)
+
+    def closeOperation(self, request):
+        self.__rpc()
+        return TSStatus(Session.SUCCESS_CODE)
+
+
+class FakeSocket(object):
+    def __init__(self, host, port):
+        pass
+
+    def setTimeout(self, ms):
+        pass
+
+    def isOpen(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def test_session_requests_while_prefetching(monkeypatch):
+    client = ConnectionClient(many_batches(30))
+    monkeypatch.setattr(
+        iotdb.Session, "TSocket", types.SimpleNamespace(TSocket=FakeSocket)
+    )
+    monkeypatch.setattr(
+        iotdb.Session.TTransport, "TFramedTransport", lambda socket: socket
+    )
+    monkeypatch.setattr(iotdb.Session, "Client", lambda protocol: client)
+    session = Session("127.0.0.1", 6667)
+    session.open(False)
+    data_set = session.execute_query_statement("select s0 from root.d")
+    data_set.set_prefetch_depth(4)
+    rows = data_set.fetch_rows(4)
+    # the prefetch thread fetches on the connection of the session while the session inserts
+    for i in range(50):
+        session.insert_record("root.d", i, ["s0"], [TSDataType.INT64], [i])
+    rows += data_set.fetch_rows(1000)
+    data_set.close_operation_handle()
+    assert client.interleaved == 0
+    assert client.inserts == 50
+    assert [row[0] for row in rows] == list(range(90))
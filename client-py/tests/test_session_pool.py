@@ -0,0 +1,236 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from thrift.protocol import TBinaryProtocol
+from thrift.transport import TTransport
+
+import iotdb.SessionPool
+from iotdb.IoTDBContainer import IoTDBContainer
+from iotdb.Session import Session
+from iotdb.SessionPool import PoolConfig, SessionPool
+from iotdb.thrift.common.ttypes import TSStatus
+from iotdb.thrift.rpc.TSIService import Processor
+from iotdb.thrift.rpc.ttypes import TSGetTimeZoneResp, TSOpenSessionResp
+from iotdb.utils.IoTDBConstants import TSDataType
+
+
+def test_session_pool():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        pool_config = PoolConfig(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session_pool = SessionPool(pool_config, max_pool_size=3)
+        session_pool.execute_non_query_statement("set storage group to root.sg_test_01")
+
+        def insert(i):
+            return session_pool.insert_record(
+                "root.sg_test_01.d_01", i, ["s_01"], [TSDataType.INT64], [i]
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert list(executor.map(insert, range(100))) == [0] * 100
+        assert session_pool.get_current_size() <= 3
+
+        data_set = session_pool.execute_query_statement(
+            "select count(s_01) from root.sg_test_01.d_01"
+        )
+        assert data_set.next().get_fields()[0].get_long_value() == 100
+        session_pool.close_result_set(data_set)
+
+        session = session_pool.get_session()
+        assert session.is_open()
+        session_pool.put_back(session)
+
+        session_pool.close()
+        assert session_pool.get_current_size() == 0
+
+
+class FakeSession(object):
+    def __init__(self, *args):
+        self.alive = True
+        self.closed = False
+        self.health_checks = 0
+
+    def open(self, enable_rpc_compression):
+        pass
+
+    def is_open(self):
+        return not self.closed
+
+    def is_alive(self, timeout_in_ms=None):
+        assert timeout_in_ms == SessionPool.DEFAULT_HEALTH_CHECK_TIMEOUT_IN_MS
+        self.health_checks += 1
+        return self.alive
+
+    def close(self):
+        self.closed = True
+
+    def insert_tablet(self, tablet):
+        if not self.alive:
+            raise RuntimeError("connection reset")
+        return 0
+
+
+def test_session_pool_health_check(monkeypatch):
+    monkeypatch.setattr(iotdb.SessionPool, "Session", FakeSession)
+    session_pool = SessionPool(
+        PoolConfig("127.0.0.1", 6667), max_pool_size=1, health_check_idle_time_in_ms=50
+    )
+    session = session_pool.get_session()
+    session_pool.put_back(session)
+    # a recently used session is handed out without a request
+    assert session_pool.get_session() is session
+    assert session.health_checks == 0
+    session_pool.put_back(session)
+
+    time.sleep(0.1)
+    assert session_pool.get_session() is session
+    assert session.health_checks == 1
+    session.alive = False
+    session_pool.put_back(session)
+
+    # the dead idle session is closed and replaced
+    time.sleep(0.1)
+    new_session = session_pool.get_session()
+    assert new_session is not session
+    assert session.closed
+    assert session_pool.get_current_size() == 1
+    session_pool.put_back(new_session)
+
+    # a session whose call raised is closed instead of being reused
+    new_session.alive = False
+    with pytest.raises(RuntimeError):
+        session_pool.insert_tablet(None)
+    assert new_session.closed
+    assert session_pool.get_current_size() == 0
+    session_pool.close()
+
+
+class HangingHandler(object):
+    """
+    answers the rpcs of opening a session, getTimeZone never answers once hang is set, like a half-open connection
+    """
+
+    def __init__(self):
+        self.hang = False
+        self.released = threading.Event()
+
+    def openSession(self, request):
+        return TSOpenSessionResp(
+            status=TSStatus(Session.SUCCESS_CODE),
+            serverProtocolVersion=request.client_protocol,
+            sessionId=1,
+        )
+
+    def requestStatementId(self, session_id):
+        return 1
+
+    def setTimeZone(self, request):
+        return TSStatus(Session.SUCCESS_CODE, "")
+
+    def getTimeZone(self, session_id):
+        if self.hang:
+            self.released.wait(10)
+        return TSGetTimeZoneResp(TSStatus(Session.SUCCESS_CODE), "+08:00")
+
+    def closeSession(self, request):
+        return TSStatus(Session.SUCCESS_CODE)
+
+
+def serve_connection(connection, processor):
+    with connection, connection.makefile("rb") as reader:
+        while True:
+            header = reader.read(4)
+            if len(header) < 4:
+                return
+            frame = reader.read(struct.unpack(">i", header)[0])
+            out_buffer = TTransport.TMemoryBuffer()
+            processor.process(
+                TBinaryProtocol.TBinaryProtocol(TTransport.TMemoryBuffer(frame)),
+                TBinaryProtocol.TBinaryProtocol(out_buffer),
+            )
+            payload = out_buffer.getvalue()
+            try:
+                connection.sendall(struct.pack(">i", len(payload)) + payload)
+            except OSError:
+                return
+
+
+def start_server(handler):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    processor = Processor(handler)
+
+    def accept():
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=serve_connection, args=(connection, processor), daemon=True
+            ).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener
+
+
+def test_session_pool_health_check_timeout():
+    handler = HangingHandler()
+    listener = start_server(handler)
+    port = listener.getsockname()[1]
+    try:
+        session = Session("127.0.0.1", port)
+        session.open(False)
+        assert session.is_alive(1000)
+        handler.hang = True
+        start = time.monotonic()
+        assert not session.is_alive(100)
+        assert time.monotonic() - start < 1
+        # the connection is closed already, closing the session does not wait for it
+        session.close()
+        handler.hang = False
+
+        session_pool = SessionPool(
+            PoolConfig("127.0.0.1", port),
+            max_pool_size=1,
+            wait_timeout_in_ms=1000,
+            health_check_idle_time_in_ms=0,
+            health_check_timeout_in_ms=100,
+        )
+        session = session_pool.get_session()
+        session_pool.put_back(session)
+        handler.hang = True
+        start = time.monotonic()
+        new_session = session_pool.get_session()
+        assert time.monotonic() - start < 1
+        assert new_session is not session
+        assert not session.is_open()
+        assert session_pool.get_current_size() == 1
+        session_pool.put_back(new_session)
+        session_pool.close()
+    finally:
+        handler.released.set()
+        listener.close()
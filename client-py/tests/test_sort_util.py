@@ -0,0 +1,41 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from iotdb.utils.SortUtil import SortUtil
+
+
+def test_sort_index():
+    assert SortUtil.check_sorted([])
+    assert SortUtil.check_sorted([1, 1, 2])
+    assert not SortUtil.check_sorted(np.array([2, 1], np.dtype(">i8")))
+    assert SortUtil.sort_index([1, 2, 2, 3]) is None
+
+    # rows with the same timestamp keep their order
+    index = SortUtil.sort_index([3, 1, 3, 2, 1])
+    assert_array_equal(index, [1, 4, 3, 0, 2])
+    assert SortUtil.reorder(["a", "b", "c", "d", "e"], index) == [
+        "b",
+        "e",
+        "d",
+        "a",
+        "c",
+    ]
+    assert_array_equal(SortUtil.reorder(np.arange(5), index), [1, 4, 3, 0, 2])
@@ -16,7 +16,10 @@
 # under the License.
 #
 
+import struct
+
 import pandas as pd
+import pytest
 from pandas.testing import assert_frame_equal
 
 from iotdb.IoTDBContainer import IoTDBContainer
@@ -109,3 +112,125 @@ def test_nullable_tablet_insertion():
 
         session.close()
     assert_frame_equal(df_input, df_output, False)
+
+
+def test_nullable_tablet_serialization():
+    measurements_ = ["s_01", "s_02", "s_03"]
+    data_types_ = [TSDataType.INT32, TSDataType.DOUBLE, TSDataType.TEXT]
+    values_ = [
+        [1, None, "test01"],
+        [None, 2.5, None],
+        [3, 3.5, "test03"],
+    ]
+    timestamps_ = [16, 17, 18]
+    tablet_ = Tablet(
+        "root.sg_test_01.d_01", measurements_, data_types_, values_, timestamps_
+    )
+    expected_values = struct.pack(
+        ">3i3di6si0si6s?c?c?c",
+        1,
+        0,
+        3,
+        0,
+        2.5,
+        3.5,
+        6,
+        b"test01",
+        0,
+        b"",
+        6,
+        b"test03",
+        True,
+        bytes([0b010]),
+        True,
+        bytes([0b001]),
+        True,
+        bytes([0b010]),
+    )
+    assert tablet_.get_binary_timestamps() == struct.pack(">3q", 16, 17, 18)
+    assert tablet_.get_binary_values() == expected_values
+
+
+def test_tablet_serialization_rejects_lossy_values():
+    def binary_values(data_type, column):
+        return Tablet(
+            "root.sg_test_01.d_01",
+            ["s_01"],
+            [data_type],
+            [[value] for value in column],
+            list(range(len(column))),
+        ).get_binary_values()
+
+    # values that do not fit their data type raise instead of being wrapped or truncated
+    with pytest.raises(struct.error):
+        binary_values(TSDataType.INT32, [1, 2**31])
+    with pytest.raises(struct.error):
+        binary_values(TSDataType.INT64, [1, 1.5])
+    with pytest.raises(struct.error):
+        binary_values(TSDataType.INT64, [2**63])
+    with pytest.raises(struct.error):
+        binary_values(TSDataType.INT32, ["1"])
+    with pytest.raises(OverflowError):
+        binary_values(TSDataType.FLOAT, [1e39])
+
+    # values that convert without loss are packed like struct does
+    assert binary_values(
+        TSDataType.INT32, [-(2**31), 2**31 - 1, True]
+    ) == struct.pack(">3i", -(2**31), 2**31 - 1, 1)
+    assert binary_values(TSDataType.INT64, [2**63 - 1, False]) == struct.pack(
+        ">2q", 2**63 - 1, 0
+    )
+    assert binary_values(TSDataType.FLOAT, [1, 2.5, float("inf")]) == struct.pack(
+        ">3f", 1, 2.5, float("inf")
+    )
+    assert binary_values(TSDataType.DOUBLE, [1, 2**70, 0.1]) == struct.pack(
+        ">3d", 1, 2**70, 0.1
+    )
+    assert binary_values(TSDataType.BOOLEAN, [True, 0, 2]) == struct.pack(
+        ">3?", True, 0, 2
+    )
+
+
+def test_records_auto_convert_tablet():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(
+            db.get_container_host_ip(),
+            db.get_exposed_port(6667),
+            enable_records_auto_convert_tablet=True,
+        )
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.sg_test_01")
+
+        measurements_ = ["s_01", "s_02"]
+        data_types_ = [TSDataType.INT64, TSDataType.TEXT]
+        values_ = [[11, "test01"], [12, "test02"], [13, "test03"], [14, "test04"]]
+        timestamps_ = [18, 16, 17, 19]
+        session.insert_records(
+            ["root.sg_test_01.d_01"] * 4,
+            timestamps_,
+            [measurements_] * 4,
+            [data_types_] * 4,
+            values_,
+        )
+        session.insert_records_of_one_device(
+            "root.sg_test_01.d_02",
+            timestamps_,
+            [measurements_] * 4,
+            [data_types_] * 4,
+            values_,
+        )
+
+        for device in ["d_01", "d_02"]:
+            df_output = session.execute_query_statement(
+                "select s_01, s_02 from root.sg_test_01." + device
+            ).todf()
+            assert df_output["Time"].tolist() == [16, 17, 18, 19]
+            assert df_output["root.sg_test_01." + device + ".s_02"].tolist() == [
+                "test02",
+                "test03",
+                "test01",
+                "test04",
+            ]
+
+        session.close()
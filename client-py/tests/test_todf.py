@@ -217,3 +217,171 @@ def test_multi_fetch():
 
         session.close()
     assert_frame_equal(df_input, df_output)
+
+
+def test_multi_fetch_with_prefetch():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.wt1")
+
+        create_ts(session)
+
+        # insert data
+        data_nums = 990
+        data = {}
+        timestamps = np.arange(data_nums)
+        data[ts_path_lst[0]] = np.float32(np.random.rand(data_nums))
+        data[ts_path_lst[1]] = np.random.rand(data_nums)
+        data[ts_path_lst[2]] = np.random.randint(10, 100, data_nums, dtype="int32")
+        data[ts_path_lst[3]] = np.random.randint(10, 100, data_nums, dtype="int64")
+        data[ts_path_lst[4]] = np.random.choice([True, False], size=data_nums)
+        data[ts_path_lst[5]] = np.random.choice(["text1", "text2"], size=data_nums)
+
+        df_input = pd.DataFrame(data)
+
+        tablet = Tablet(
+            device_id, measurements, data_type_lst, df_input.values, timestamps
+        )
+        session.insert_tablet(tablet)
+
+        df_input.insert(0, "Time", timestamps)
+
+        session_data_set = session.execute_query_statement("SELECT ** FROM root")
+        session_data_set.set_fetch_size(100)
+        session_data_set.set_prefetch_depth(2)
+        df_output = session_data_set.todf()
+        df_output = df_output[df_input.columns.tolist()]
+
+        session.close()
+    assert_frame_equal(df_input, df_output)
+
+
+def test_iter_dataframes():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.wt1")
+
+        create_ts(session)
+
+        # insert data
+        data_nums = 990
+        data = {}
+        timestamps = np.arange(data_nums)
+        data[ts_path_lst[0]] = np.float32(np.random.rand(data_nums))
+        data[ts_path_lst[1]] = np.random.rand(data_nums)
+        data[ts_path_lst[2]] = np.random.randint(10, 100, data_nums, dtype="int32")
+        data[ts_path_lst[3]] = np.random.randint(10, 100, data_nums, dtype="int64")
+        data[ts_path_lst[4]] = np.random.choice([True, False], size=data_nums)
+        data[ts_path_lst[5]] = np.random.choice(["text1", "text2"], size=data_nums)
+
+        df_input = pd.DataFrame(data)
+
+        tablet = Tablet(
+            device_id, measurements, data_type_lst, df_input.values, timestamps
+        )
+        session.insert_tablet(tablet)
+
+        df_input.insert(0, "Time", timestamps)
+
+        session_data_set = session.execute_query_statement("SELECT ** FROM root")
+        session_data_set.set_fetch_size(100)
+        df_list = list(session_data_set.iter_dataframes(batch_rows=300))
+        df_output = pd.concat(df_list, ignore_index=True)
+        df_output = df_output[df_input.columns.tolist()]
+
+        session.close()
+    assert [len(df) for df in df_list] == [300, 300, 300, 90]
+    assert_frame_equal(df_input, df_output)
+
+
+def test_to_arrow():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.wt1")
+
+        create_ts(session)
+
+        # insert data
+        data_nums = 990
+        data = {}
+        timestamps = np.arange(data_nums)
+        data[ts_path_lst[0]] = np.float32(np.random.rand(data_nums))
+        data[ts_path_lst[1]] = np.random.rand(data_nums)
+        data[ts_path_lst[2]] = np.random.randint(10, 100, data_nums, dtype="int32")
+        data[ts_path_lst[3]] = np.random.randint(10, 100, data_nums, dtype="int64")
+        data[ts_path_lst[4]] = np.random.choice([True, False], size=data_nums)
+        data[ts_path_lst[5]] = np.random.choice(["text1", "text2"], size=data_nums)
+
+        df_input = pd.DataFrame(data)
+
+        tablet = Tablet(
+            device_id, measurements, data_type_lst, df_input.values, timestamps
+        )
+        session.insert_tablet(tablet)
+        session.insert_record(
+            device_id, data_nums, ["temperature"], [TSDataType.FLOAT], [1.0]
+        )
+
+        session_data_set = session.execute_query_statement("SELECT ** FROM root")
+        session_data_set.set_fetch_size(100)
+        df_expected = session_data_set.todf()
+        session_data_set = session.execute_query_statement("SELECT ** FROM root")
+        session_data_set.set_fetch_size(100)
+        table = session_data_set.to_arrow()
+
+        session.close()
+    assert table.num_rows == data_nums + 1
+    assert table.column_names == df_expected.columns.tolist()
+    assert table.to_pylist() == df_expected.astype(object).where(
+        df_expected.notna(), None
+    ).to_dict("records")
+
+
+def test_fetch_rows():
+    with IoTDBContainer("iotdb:dev") as db:
+        db: IoTDBContainer
+        session = Session(db.get_container_host_ip(), db.get_exposed_port(6667))
+        session.open(False)
+        session.execute_non_query_statement("set storage group to root.wt1")
+
+        create_ts(session)
+
+        # insert data
+        data_nums = 990
+        data = {}
+        timestamps = np.arange(data_nums)
+        data[ts_path_lst[0]] = np.float32(np.random.rand(data_nums))
+        data[ts_path_lst[1]] = np.random.rand(data_nums)
+        data[ts_path_lst[2]] = np.random.randint(10, 100, data_nums, dtype="int32")
+        data[ts_path_lst[3]] = np.random.randint(10, 100, data_nums, dtype="int64")
+        data[ts_path_lst[4]] = np.random.choice([True, False], size=data_nums)
+        data[ts_path_lst[5]] = np.random.choice(["text1", "text2"], size=data_nums)
+
+        df_input = pd.DataFrame(data)
+
+        tablet = Tablet(
+            device_id, measurements, data_type_lst, df_input.values, timestamps
+        )
+        session.insert_tablet(tablet)
+
+        df_input.insert(0, "Time", timestamps)
+
+        session_data_set = session.execute_query_statement("SELECT ** FROM root")
+        session_data_set.set_fetch_size(100)
+        rows = []
+        batch = session_data_set.fetch_rows(300)
+        while batch:
+            assert len(batch) <= 300
+            rows.extend(batch)
+            batch = session_data_set.fetch_rows(300)
+        df_output = pd.DataFrame(rows, columns=session_data_set.get_column_names())
+        df_output = df_output[df_input.columns.tolist()].astype(df_input.dtypes)
+
+        session.close()
+    assert_frame_equal(df_input, df_output)
@@ -0,0 +1,58 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+
+import struct
+
+from iotdb.Session import Session
+from iotdb.utils.IoTDBConstants import TSDataType
+
+
+def test_value_to_bytes():
+    data_types_ = [
+        TSDataType.BOOLEAN.value,
+        TSDataType.INT32.value,
+        TSDataType.TEXT.value,
+        TSDataType.INT64.value,
+        TSDataType.FLOAT.value,
+        TSDataType.DOUBLE.value,
+        TSDataType.TEXT.value,
+    ]
+    values_ = [True, 10, "温度", 11111, 1.25, 688.25, ""]
+    text = "温度".encode("utf-8")
+    expected = struct.pack(
+        ">B?BiBi6sBqBfBdBi",
+        0,
+        True,
+        1,
+        10,
+        5,
+        len(text),
+        text,
+        2,
+        11111,
+        3,
+        1.25,
+        4,
+        688.25,
+        5,
+        0,
+    )
+    # the second call goes through the cached plan of the signature
+    assert Session.value_to_bytes(data_types_, values_) == expected
+    assert Session.value_to_bytes(data_types_, values_) == expected
+    assert Session.value_to_bytes([], []) == b""